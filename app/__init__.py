@@ -1,9 +1,15 @@
 from flask import Flask, jsonify, request, g
 from flask_cors import CORS
 
+from .assets import init_assets
+from .concurrency import init_concurrency
 from .config import Config
-from .extensions import db, migrate, init_redis
-from .bootstrap import bootstrap_if_needed
+from .extensions import db, init_migrate, init_redis
+from .jsonprovider import init_json
+from .metrics import init_metrics
+from .profiler import init_profiler
+from .bootstrap import ensure_ready
+from .cli import register_cli
 
 
 def register_error_handlers(app: Flask):
@@ -41,22 +47,23 @@ def create_app(config_object: type[Config] | None = None):
         app,
         supports_credentials=False,
         origins=app.config.get("CORS_ALLOWED_ORIGINS") or [],
-        allow_headers=["Content-Type", "X-API-Key"],
-        expose_headers=["Content-Type"],
+        allow_headers=["Content-Type", "X-API-Key", "If-None-Match", "X-Profile", "Idempotency-Key", "X-Conversation-Token"],
+        expose_headers=["Content-Type", "ETag", "Server-Timing", "Idempotent-Replayed"],
     )
 
     # Init extensions
+    # orjson-backed jsonify; Decimal/datetime serialized natively
+    init_json(app)
+    init_concurrency(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_migrate(app)
     init_redis(app)
-
-    # Dev helper: auto create tables for SQLite
-    try:
-        if app.config.get("AUTO_CREATE_DB") and str(app.config.get("SQLALCHEMY_DATABASE_URI", "")).startswith("sqlite"):
-            with app.app_context():
-                db.create_all()
-    except Exception:
-        pass
+    # embed.js / admin page: hashed and precompressed once per worker
+    init_assets(app)
+    # request/stage timers, SQL counts; merged across workers at /metrics
+    init_metrics(app)
+    # opt-in SQL profiling (X-Profile / sampling) and slow-request log
+    init_profiler(app)
 
     # Blueprints
     from .routes.health import bp as health_bp
@@ -65,20 +72,22 @@ def create_app(config_object: type[Config] | None = None):
     from .routes.chat import bp as chat_bp
     from .routes.static import bp as static_bp
     from .routes.admin import bp as admin_bp
+    from .routes.jobs import bp as jobs_bp
 
     app.register_blueprint(health_bp)
     app.register_blueprint(products_bp, url_prefix="/v1")
     app.register_blueprint(cart_bp, url_prefix="/v1")
     app.register_blueprint(chat_bp, url_prefix="/v1")
     app.register_blueprint(admin_bp, url_prefix="/v1")
+    app.register_blueprint(jobs_bp, url_prefix="/v1")
     app.register_blueprint(static_bp)
 
     register_error_handlers(app)
 
-    # Finalize bootstrapping (first-run seeding when enabled)
-    try:
-        with app.app_context():
-            bootstrap_if_needed()
-    except Exception:
-        pass
+    register_cli(app)
+
+    # Schema/bootstrap: done once by `flask deploy`; on boot this is a single
+    # marker read (create_all only for SQLite + AUTO_CREATE_DB; never under
+    # the flask CLI)
+    ensure_ready(app)
     return app
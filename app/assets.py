@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from flask import Flask, Response, current_app, request
+
+
+@dataclass
+class Asset:
+    name: str
+    mimetype: str
+    path: str
+    mtime: float
+    digest: str
+    # encoding ("identity", "gzip", "br") -> bytes
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def versioned_path(self) -> str:
+        stem, ext = os.path.splitext(self.name)
+        return f"/{stem}.{self.digest}{ext}"
+
+    def etag(self, encoding: str) -> str:
+        return f"{self.digest}-{encoding}"
+
+
+def _brotli_compress() -> Optional[Callable[[bytes], bytes]]:
+    try:
+        import brotli  # type: ignore
+
+        return lambda b: brotli.compress(b, quality=11)
+    except Exception:
+        return None
+
+
+def _build(name: str, path: str, mimetype: str, transform: Callable[[bytes, dict], bytes] | None, assets: dict) -> Asset:
+    with open(path, "rb") as f:
+        raw = f.read()
+    if transform:
+        raw = transform(raw, assets)
+    digest = hashlib.sha256(raw).hexdigest()[:12]
+    variants = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+    br = _brotli_compress()
+    if br:
+        variants["br"] = br(raw)
+    return Asset(name=name, mimetype=mimetype, path=path, mtime=os.path.getmtime(path), digest=digest, variants=variants)
+
+
+def _inject_embed_path(raw: bytes, assets: dict) -> bytes:
+    # The admin page loads the widget through its immutable, versioned URL
+    embed = assets.get("embed.js")
+    if not embed:
+        return raw
+    tag = f"<script>window.CHATBOT_EMBED_PATH='{embed.versioned_path}';</script></head>".encode("utf-8")
+    return raw.replace(b"</head>", tag, 1)
+
+
+def _specs(app: Flask):
+    root = os.path.abspath(os.path.join(app.root_path, os.pardir))
+    # order matters: index.html references embed.js' digest
+    return [
+        ("embed.js", os.path.join(root, "public", "embed.js"), "application/javascript", None),
+        ("index.html", os.path.join(root, "index.html"), "text/html", _inject_embed_path),
+    ]
+
+
+def load_assets(app: Flask) -> dict[str, Asset]:
+    assets: dict[str, Asset] = {}
+    for name, path, mimetype, transform in _specs(app):
+        try:
+            assets[name] = _build(name, path, mimetype, transform, assets)
+        except OSError:
+            app.logger.warning("Static asset missing: %s", path)
+    return assets
+
+
+def init_assets(app: Flask) -> None:
+    app.extensions["assets"] = load_assets(app)
+
+
+def get_asset(name: str) -> Optional[Asset]:
+    app = current_app
+    assets = app.extensions.get("assets")
+    if assets is None:
+        assets = app.extensions["assets"] = load_assets(app)
+    asset = assets.get(name)
+    # Pick up edits without a restart while developing
+    if app.debug and asset and os.path.getmtime(asset.path) != asset.mtime:
+        assets = app.extensions["assets"] = load_assets(app)
+        asset = assets.get(name)
+    return asset
+
+
+def _negotiate(asset: Asset) -> str:
+    accepted = request.accept_encodings
+    for enc in ("br", "gzip"):
+        if enc in asset.variants and accepted[enc] > 0:
+            return enc
+    return "identity"
+
+
+def serve_asset(asset: Asset, cache_control: str) -> Response:
+    encoding = _negotiate(asset)
+    etags = [asset.etag(enc) for enc in asset.variants]
+    if any(request.if_none_match.contains_weak(tag) for tag in etags):
+        resp = Response(status=304)
+    else:
+        resp = Response(asset.variants[encoding], mimetype=asset.mimetype)
+        if encoding != "identity":
+            resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(asset.etag(encoding))
+    resp.headers["Cache-Control"] = cache_control
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
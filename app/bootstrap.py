@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import hashlib
+import os
 from decimal import Decimal
-from flask import current_app
+from typing import Optional
+
+from flask import Flask, current_app
 
 from .extensions import db
-from .models import Tenant, ApiKey, Product, KeywordRule, Setting
+from .models import AppMeta, Tenant, ApiKey, Product, KeywordRule, Setting
+
+
+MARKER_KEY = "schema_fingerprint"
 
 
 def _bcrypt_hash(raw: str) -> bytes:
@@ -12,22 +19,18 @@ def _bcrypt_hash(raw: str) -> bytes:
     return bcrypt.hashpw(raw.encode("utf-8"), bcrypt.gensalt())
 
 
-def bootstrap_if_needed():
-    app = current_app
-    if not app.config.get("AUTO_BOOTSTRAP", False):
-        return
+def bootstrap_if_needed(force: bool = False):
+    """Seed the first tenant, API key and settings when the database has none.
 
-    # Ensure tables exist
-    try:
-        db.create_all()
-    except Exception:
+    Runs from `flask deploy`, or from ensure_ready() at boot until the schema
+    marker is written. Expects the tables to exist.
+    """
+    app = current_app
+    if not force and not app.config.get("AUTO_BOOTSTRAP", False):
         return
 
     # If at least one tenant exists, consider bootstrapped
-    try:
-        any_tenant = db.session.query(Tenant.id).limit(1).first()
-    except Exception:
-        return
+    any_tenant = db.session.query(Tenant.id).limit(1).first()
     if any_tenant:
         return
 
@@ -76,3 +79,66 @@ def bootstrap_if_needed():
     db.session.commit()
     app.logger.info("Bootstrap completed: tenant='%s' api_key set via env SITE_API_KEY", tenant_name)
 
+
+
+def schema_fingerprint() -> str:
+    """Hash of every mapped table and column: changes whenever the models do."""
+    parts = []
+    for name, table in sorted(db.metadata.tables.items()):
+        parts.append(name + ":" + ",".join(sorted(c.name for c in table.columns)))
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def read_marker() -> Optional[str]:
+    try:
+        row = db.session.get(AppMeta, MARKER_KEY)
+        return row.value if row else None
+    except Exception:
+        # app_meta missing: schema predates the marker (or nothing exists yet)
+        db.session.rollback()
+        return None
+
+
+def write_marker(value: str) -> None:
+    row = db.session.get(AppMeta, MARKER_KEY)
+    if row is None:
+        db.session.add(AppMeta(key=MARKER_KEY, value=value))
+    else:
+        row.value = value
+    db.session.commit()
+
+
+def prepare_database(create_tables: bool, seed: bool) -> None:
+    """Create missing tables (create_all), seed the first tenant, record the marker."""
+    if create_tables:
+        db.create_all()
+    bootstrap_if_needed(force=seed)
+    write_marker(schema_fingerprint())
+
+
+def ensure_ready(app: Flask) -> None:
+    """Worker-boot check: one primary-key read once `flask deploy` has run.
+
+    Tables are only created here for SQLite with AUTO_CREATE_DB (local dev);
+    anywhere else a stale marker is logged and left to `flask deploy`, which
+    migrates first and only then seeds and writes the marker. Skipped under
+    the `flask` CLI, whose commands (deploy, db upgrade) own the schema.
+    """
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        return
+    sqlite_auto = app.config.get("AUTO_CREATE_DB") and str(app.config.get("SQLALCHEMY_DATABASE_URI", "")).startswith("sqlite")
+    if not sqlite_auto and not app.config.get("AUTO_BOOTSTRAP"):
+        return
+    with app.app_context():
+        try:
+            if read_marker() == schema_fingerprint():
+                return
+            if not sqlite_auto:
+                app.logger.warning("Schema marker is missing or stale; run `flask --app wsgi deploy`")
+                return
+            prepare_database(create_tables=True, seed=bool(app.config.get("AUTO_BOOTSTRAP")))
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Startup schema/bootstrap failed; run `flask --app wsgi deploy`")
+        finally:
+            db.session.remove()
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
 import json
+import threading
 import time
+from collections import OrderedDict
 from typing import Any, Optional
 
-from .extensions import redis_client
+from . import extensions, metrics
 
 
-_store: dict[str, tuple[float, Any]] = {}
+# per-process fallback when Redis is not configured: LRU-bounded, so keyed
+# entries that are never read again (e.g. idempotency replays) can't pile up
+_store: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+_lock = threading.Lock()
+LOCAL_MAX_ENTRIES = 10000
 
 
 def _now() -> float:
@@ -18,44 +24,85 @@ def _key(namespace: str, key: str) -> str:
     return f"cb:{namespace}:{key}"
 
 
+def _local_put(k: str, exp_ts: float, value: Any) -> None:
+    # caller holds _lock
+    _store[k] = (exp_ts, value)
+    _store.move_to_end(k)
+    while len(_store) > LOCAL_MAX_ENTRIES:
+        _store.popitem(last=False)
+
+
 def get(namespace: str, key: str) -> Optional[Any]:
+    value = _get(namespace, key)
+    metrics.inc("chatbot_cache_requests_total", namespace=namespace, result="miss" if value is None else "hit")
+    return value
+
+
+def _get(namespace: str, key: str) -> Optional[Any]:
     k = _key(namespace, key)
-    if redis_client:
+    # read at call time: init_redis() rebinds extensions.redis_client after import
+    r = extensions.redis_client
+    if r is not None:
         try:
-            raw = redis_client.get(k)
+            raw = r.get(k)
             if raw is None:
                 return None
             return json.loads(raw)
         except Exception:
             pass
     # in-memory
-    item = _store.get(k)
-    if not item:
-        return None
-    exp_ts, value = item
-    if exp_ts < _now():
-        _store.pop(k, None)
-        return None
-    return value
+    with _lock:
+        item = _store.get(k)
+        if not item:
+            return None
+        exp_ts, value = item
+        if exp_ts < _now():
+            _store.pop(k, None)
+            return None
+        _store.move_to_end(k)
+        return value
 
 
 def set(namespace: str, key: str, value: Any, ttl_seconds: int = 60) -> None:
     k = _key(namespace, key)
-    if redis_client:
+    r = extensions.redis_client
+    if r is not None:
         try:
-            redis_client.setex(k, ttl_seconds, json.dumps(value, ensure_ascii=False))
+            r.setex(k, ttl_seconds, json.dumps(value, ensure_ascii=False))
             return
         except Exception:
             pass
-    _store[k] = (_now() + ttl_seconds, value)
+    with _lock:
+        _local_put(k, _now() + ttl_seconds, value)
 
 
-def delete(namespace: str, key: str) -> None:
+def add(namespace: str, key: str, value: Any, ttl_seconds: int = 60) -> bool:
+    """Set only if absent (SET NX); True when this call stored the value.
+
+    Atomic across workers only with Redis; the fallback is per process.
+    """
     k = _key(namespace, key)
-    if redis_client:
+    r = extensions.redis_client
+    if r is not None:
         try:
-            redis_client.delete(k)
+            return bool(r.set(k, json.dumps(value, ensure_ascii=False), nx=True, ex=ttl_seconds))
         except Exception:
             pass
-    _store.pop(k, None)
+    with _lock:
+        item = _store.get(k)
+        if item and item[0] >= _now():
+            return False
+        _local_put(k, _now() + ttl_seconds, value)
+        return True
+
 
+def delete(namespace: str, key: str) -> None:
+    k = _key(namespace, key)
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            r.delete(k)
+        except Exception:
+            pass
+    with _lock:
+        _store.pop(k, None)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import os
+
+import click
+from flask import Flask, current_app
+
+from .bootstrap import prepare_database, read_marker, schema_fingerprint
+
+
+def register_cli(app: Flask) -> None:
+    @app.cli.command("deploy")
+    @click.option("--create-all", is_flag=True, help="Create tables with create_all instead of running migrations.")
+    @click.option("--seed/--no-seed", default=None, help="Seed the first tenant (default: AUTO_BOOTSTRAP).")
+    def deploy(create_all: bool, seed):
+        """Run once per release: migrate, seed the first tenant, write the boot marker.
+
+        Workers then find the marker and skip schema work on boot.
+        """
+        cfg = current_app.config
+        if seed is None:
+            seed = bool(cfg.get("AUTO_BOOTSTRAP"))
+        migrations_dir = os.path.join(os.path.dirname(current_app.root_path), "migrations")
+        if not create_all and os.path.isdir(migrations_dir):
+            from flask_migrate import upgrade
+
+            upgrade(directory=migrations_dir)
+            click.echo("migrations: upgraded to head")
+        prepare_database(create_tables=create_all, seed=seed)
+        click.echo(f"marker: {schema_fingerprint()}")
+
+    @app.cli.command("deploy-status")
+    def deploy_status():
+        """Show whether the boot marker matches the current models."""
+        marker, current = read_marker(), schema_fingerprint()
+        click.echo(f"marker:  {marker or '(none)'}")
+        click.echo(f"models:  {current}")
+        if marker != current:
+            raise SystemExit(1)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Any, Callable, TypeVar
+
+from flask import Flask
+
+T = TypeVar("T")
+
+
+def is_cooperative() -> bool:
+    """True when running under gevent with the stdlib monkey-patched
+    (gunicorn ``-k gevent`` patches before the app is imported)."""
+    try:
+        from gevent import monkey  # type: ignore
+
+        return bool(monkey.is_module_patched("socket"))
+    except Exception:
+        return False
+
+
+def patch_db_drivers() -> None:
+    # PyMySQL, redis-py and requests are pure Python and cooperate once the
+    # socket module is patched; psycopg2 is a C driver and needs a wait callback.
+    try:
+        import psycopg2  # type: ignore  # noqa: F401
+        from psycogreen.gevent import patch_psycopg  # type: ignore
+    except Exception:
+        return
+    patch_psycopg()
+
+
+def run_blocking(fn: Callable[..., T], *args: Any) -> T:
+    """Run CPU-bound or GIL-releasing work (bcrypt) off the event loop.
+
+    Under gevent the call is handed to the hub's native thread pool so other
+    greenlets keep serving; with sync/gthread workers it runs inline.
+    """
+    if is_cooperative():
+        from gevent import get_hub  # type: ignore
+
+        return get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+
+def init_concurrency(app: Flask) -> None:
+    if not is_cooperative():
+        return
+    patch_db_drivers()
+    try:
+        from gevent import get_hub  # type: ignore
+
+        get_hub().threadpool.maxsize = int(app.config.get("BLOCKING_THREADPOOL_SIZE", 8))
+    except Exception:
+        pass
+    app.logger.info("Cooperative (gevent) mode: DB drivers patched, bcrypt offloaded to thread pool")
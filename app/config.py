@@ -12,6 +12,19 @@ def _split_csv(val: str | None):
     return [x.strip() for x in val.split(",") if x.strip()]
 
 
+def _engine_options(url: str):
+    # SQLite uses its own pool classes; only size real connection pools
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
 class Config:
     ENV = os.getenv("FLASK_ENV", "production")
     DEBUG = ENV != "production"
@@ -23,6 +36,7 @@ class Config:
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///chatbot.db")
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(DATABASE_URL)
 
     # Redis
     REDIS_URL = os.getenv("REDIS_URL")
@@ -36,6 +50,127 @@ class Config:
     # API key hash algorithm
     API_KEY_HASH_ALGO = os.getenv("API_KEY_HASH_ALGO", "bcrypt")
 
+    # Verified API keys are cached (by SHA-256) to skip bcrypt on repeat requests
+    API_KEY_CACHE_TTL = int(os.getenv("API_KEY_CACHE_TTL", "300"))
+    # How long a worker may serve a cached tenant config version
+    TENANT_VERSION_TTL = int(os.getenv("TENANT_VERSION_TTL", "5"))
+
+    # POST /v1/chat/evaluate-batch: messages per call, and messages per API key
+    # per minute (charged per message on top of the per-request limit)
+    EVAL_BATCH_MAX_MESSAGES = int(os.getenv("EVAL_BATCH_MAX_MESSAGES", "10000"))
+    EVAL_BATCH_MESSAGES_PER_MINUTE = int(os.getenv("EVAL_BATCH_MESSAGES_PER_MINUTE", "20000"))
+
+    # "Also bought" suggestions from cart co-occurrence (scripts/build_cooccurrence.py)
+    ALSO_BOUGHT_LIMIT = int(os.getenv("ALSO_BOUGHT_LIMIT", "3"))
+    COOCCURRENCE_TOP_K = int(os.getenv("COOCCURRENCE_TOP_K", "20"))
+    NEIGHBORS_CACHE_TTL = int(os.getenv("NEIGHBORS_CACHE_TTL", "600"))
+
+    # Popularity ranking: buffered counters flush interval (no Redis) and ranking refresh
+    POPULARITY_FLUSH_SECONDS = int(os.getenv("POPULARITY_FLUSH_SECONDS", "30"))
+    POPULARITY_REFRESH_SECONDS = int(os.getenv("POPULARITY_REFRESH_SECONDS", "60"))
+    POPULARITY_TOP_N = int(os.getenv("POPULARITY_TOP_N", "2000"))
+
+    # Admin listings: COUNT stops here and reports {"exact": false}
+    PAGE_TOTAL_CAP = int(os.getenv("PAGE_TOTAL_CAP", "10000"))
+
+    # External catalog sync (POST /v1/admin/products/import)
+    CATALOG_SYNC_CONNECT_TIMEOUT = float(os.getenv("CATALOG_SYNC_CONNECT_TIMEOUT", "5"))
+    CATALOG_SYNC_READ_TIMEOUT = float(os.getenv("CATALOG_SYNC_READ_TIMEOUT", "30"))
+    CATALOG_SYNC_MAX_PAGES = int(os.getenv("CATALOG_SYNC_MAX_PAGES", "10000"))
+    CATALOG_SYNC_POOL_SIZE = int(os.getenv("CATALOG_SYNC_POOL_SIZE", "8"))
+
+    # Background jobs: "thread" runs them in-process (local dev), "worker" leaves
+    # them to scripts/worker.py
+    JOBS_BACKEND = os.getenv("JOBS_BACKEND", "thread")
+    JOBS_THREADS = int(os.getenv("JOBS_THREADS", "2"))
+    JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "2"))
+    JOBS_STALE_SECONDS = int(os.getenv("JOBS_STALE_SECONDS", "300"))
+
+    # Conversation history: the newest MESSAGE_TAIL_SIZE messages per conversation
+    # are cached (appended on write) for GET /v1/conversations/<id>/messages
+    MESSAGE_TAIL_SIZE = int(os.getenv("MESSAGE_TAIL_SIZE", "50"))
+    MESSAGE_TAIL_TTL = int(os.getenv("MESSAGE_TAIL_TTL", "1800"))
+
+    # Retention (scripts/retention.py, job "maintenance.retention"): conversations
+    # closed for RETENTION_CLOSED_DAYS or idle for RETENTION_DAYS are archived
+    # (RETENTION_ARCHIVE: "table" = conversation_archive, "file" = gzipped NDJSON
+    # under RETENTION_ARCHIVE_DIR, "none" = no archive) and deleted in batches.
+    # Unset, conversations are never deleted. Open carts idle for
+    # CART_ABANDON_HOURS are abandoned either way
+    RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "90"))
+    RETENTION_CLOSED_DAYS = int(os.getenv("RETENTION_CLOSED_DAYS", "30"))
+    RETENTION_ARCHIVE = os.getenv("RETENTION_ARCHIVE", "")
+    RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR") or None
+    RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+    RETENTION_PAUSE_SECONDS = float(os.getenv("RETENTION_PAUSE_SECONDS", "0.2"))
+    CART_ABANDON_HOURS = int(os.getenv("CART_ABANDON_HOURS", "72"))
+
+    # Tenant snapshots: with SNAPSHOT_DIR set, each tenant version is written
+    # once to a file that every worker mmaps (see app/services/snapshot_store.py);
+    # at most SNAPSHOT_MAX_TENANTS are kept open per worker
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR") or None
+    SNAPSHOT_MAX_TENANTS = int(os.getenv("SNAPSHOT_MAX_TENANTS", "256"))
+
+    # Warm-up: on boot (wsgi.py) preload the WARMUP_TENANTS tenants with the most
+    # messages in the last WARMUP_WINDOW_HOURS, within WARMUP_BUDGET_SECONDS;
+    # admin writes rebuild the tenant in the background
+    WARMUP_ON_BOOT = os.getenv("WARMUP_ON_BOOT", "1").lower() in ("1", "true", "yes")
+    WARMUP_ON_CHANGE = os.getenv("WARMUP_ON_CHANGE", "1").lower() in ("1", "true", "yes")
+    WARMUP_TENANTS = int(os.getenv("WARMUP_TENANTS", "20"))
+    WARMUP_WINDOW_HOURS = int(os.getenv("WARMUP_WINDOW_HOURS", "24"))
+    WARMUP_BUDGET_SECONDS = float(os.getenv("WARMUP_BUDGET_SECONDS", "10"))
+
+    # Readiness (/ready answers 503 past any of these): in-flight requests per
+    # worker (0 = no limit), share of the DB pool checked out, ping latencies.
+    # A Redis outage only fails readiness with READY_REQUIRE_REDIS
+    READY_MAX_INFLIGHT = int(os.getenv("READY_MAX_INFLIGHT", "0"))
+    READY_MAX_POOL_USAGE = float(os.getenv("READY_MAX_POOL_USAGE", "0.9"))
+    READY_MAX_DB_MS = float(os.getenv("READY_MAX_DB_MS", "500"))
+    READY_MAX_REDIS_MS = float(os.getenv("READY_MAX_REDIS_MS", "200"))
+    READY_REQUIRE_REDIS = os.getenv("READY_REQUIRE_REDIS", "0").lower() in ("1", "true", "yes")
+
+    # jsonify through orjson when installed (stdlib otherwise); both write
+    # Decimal as a number and datetimes as ISO 8601
+    JSON_FAST = os.getenv("JSON_FAST", "1").lower() in ("1", "true", "yes")
+
+    # Idempotency-Key on POST /chat/message and /cart/items: responses are kept
+    # IDEMPOTENCY_TTL seconds; a claim for an in-flight request expires after
+    # IDEMPOTENCY_LOCK_SECONDS. Shared across workers only with REDIS_URL
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+
+    # Chat analytics: counters per ANALYTICS_BUCKET_SECONDS bucket (Redis hashes
+    # expiring after ANALYTICS_RETENTION_DAYS, else buffered and flushed to
+    # analytics_rollup every ANALYTICS_FLUSH_SECONDS)
+    ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "1").lower() in ("1", "true", "yes")
+    ANALYTICS_BUCKET_SECONDS = int(os.getenv("ANALYTICS_BUCKET_SECONDS", "3600"))
+    ANALYTICS_FLUSH_SECONDS = int(os.getenv("ANALYTICS_FLUSH_SECONDS", "30"))
+    ANALYTICS_RETENTION_DAYS = int(os.getenv("ANALYTICS_RETENTION_DAYS", "90"))
+
+    # Metrics: each worker dumps its counters to METRICS_DIR/<pid>.json every
+    # METRICS_FLUSH_SECONDS; /metrics merges them. METRICS_TOKEN requires
+    # "Authorization: Bearer <token>" on /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+    METRICS_DIR = os.getenv("METRICS_DIR") or None
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+    # Query profiler: "X-Profile: <PROFILER_TOKEN>" (any value in debug when no
+    # token) or a sampled fraction of requests records every SQL statement with
+    # its call site. Requests over SLOW_REQUEST_MS are logged as JSON
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "1").lower() in ("1", "true", "yes")
+    PROFILER_TOKEN = os.getenv("PROFILER_TOKEN") or None
+    PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+    PROFILER_NPLUS1_MIN = int(os.getenv("PROFILER_NPLUS1_MIN", "3"))
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+    # gevent mode: native threads available for bcrypt and other blocking calls
+    BLOCKING_THREADPOOL_SIZE = int(os.getenv("BLOCKING_THREADPOOL_SIZE", "8"))
+
+    # Widget script caching (stable /embed.js URL; versioned URLs are immutable)
+    EMBED_MAX_AGE = int(os.getenv("EMBED_MAX_AGE", "300"))
+    EMBED_STALE_WHILE_REVALIDATE = int(os.getenv("EMBED_STALE_WHILE_REVALIDATE", "86400"))
+
     # Dev convenience: auto create tables on startup for SQLite
     AUTO_CREATE_DB = os.getenv("AUTO_CREATE_DB", "true").lower() in ("1", "true", "yes")
 
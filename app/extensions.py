@@ -1,11 +1,26 @@
 from __future__ import annotations
 
+import os
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 
 db = SQLAlchemy()
-migrate = Migrate()
+migrate = None
+
+
+def init_migrate(app: Flask):
+    """Flask-Migrate pulls in alembic; only the `flask` CLI needs it, so web
+    workers skip the import."""
+    global migrate
+    if os.environ.get("FLASK_RUN_FROM_CLI") != "true":
+        return None
+    from flask_migrate import Migrate
+
+    if migrate is None:
+        migrate = Migrate()
+    migrate.init_app(app, db)
+    return migrate
 
 redis_client = None
 
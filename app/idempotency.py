@@ -0,0 +1,85 @@
+"""`Idempotency-Key` support for write endpoints.
+
+The first request with a key claims it (cache add / SET NX) and, once the view
+returns, stores its response for IDEMPOTENCY_TTL seconds. A retry with the same
+key and body replays that response without running the view again; a retry
+while the first is still running gets 409, and reusing a key with a different
+body gets 422. Keys are scoped per tenant and endpoint. 5xx and 429 responses
+are not stored, so those requests can be retried for real.
+
+Claims and stored responses live in Redis when REDIS_URL is set. Without it
+they fall back to the per-process cache, so a retry that lands on another
+worker runs again: run with Redis whenever there is more than one worker.
+"""
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+
+from flask import current_app, g, jsonify, make_response, request
+
+from . import cache, metrics
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def _error(code: str, message: str, status: int):
+    return jsonify({"error": {"code": code, "message": message}}), status
+
+
+def _replay(stored: dict):
+    resp = current_app.response_class(stored["body"], status=stored["status"], content_type=stored["content_type"])
+    resp.headers[REPLAY_HEADER] = "true"
+    return resp
+
+
+def idempotent(scope: str):
+    """Decorate a view so requests carrying Idempotency-Key run at most once."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            raw = request.headers.get(HEADER)
+            if not raw:
+                return view(*args, **kwargs)
+            if len(raw) > MAX_KEY_LENGTH:
+                return _error("bad_request", f"{HEADER} too long", 400)
+            cfg = current_app.config
+            key = f"{g.tenant_id}:{scope}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+            fingerprint = hashlib.sha1(request.get_data()).hexdigest()
+
+            claim = {"state": "pending", "fp": fingerprint}
+            if not cache.add("idem", key, claim, ttl_seconds=cfg.get("IDEMPOTENCY_LOCK_SECONDS", 30)):
+                stored = cache.get("idem", key)
+                if stored is not None:
+                    if stored.get("fp") != fingerprint:
+                        return _error("idempotency_mismatch", f"{HEADER} was used with a different request body", 422)
+                    if stored.get("state") == "done":
+                        metrics.inc("chatbot_idempotency_total", scope=scope, result="replay")
+                        return _replay(stored)
+                    metrics.inc("chatbot_idempotency_total", scope=scope, result="in_progress")
+                    resp = make_response(_error("conflict", "A request with this key is in progress", 409))
+                    resp.headers["Retry-After"] = "1"
+                    return resp
+                # claim expired between add and get: run as a fresh request
+
+            try:
+                resp = make_response(view(*args, **kwargs))
+            except Exception:
+                cache.delete("idem", key)
+                raise
+            if resp.status_code >= 500 or resp.status_code == 429 or resp.is_streamed:
+                cache.delete("idem", key)
+                return resp
+            cache.set("idem", key, {
+                "state": "done",
+                "fp": fingerprint,
+                "status": resp.status_code,
+                "content_type": resp.content_type,
+                "body": resp.get_data(as_text=True),
+            }, ttl_seconds=cfg.get("IDEMPOTENCY_TTL", 86400))
+            metrics.inc("chatbot_idempotency_total", scope=scope, result="stored")
+            return resp
+        return wrapper
+    return decorator
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import select
+
+from . import extensions
+from .extensions import db
+from .models import Job
+
+# kind -> handler(ctx, payload) -> result dict
+_handlers: Dict[str, Callable[["JobContext", Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_sweeper_pid: Optional[int] = None
+
+QUEUE_KEY = "cb:jobs:queue"
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job(kind: str):
+    """Register a handler for a job kind."""
+    def deco(fn):
+        _handlers[kind] = fn
+        return fn
+    return deco
+
+
+def get_handler(kind: str):
+    if not _handlers:
+        from . import tasks  # noqa: F401  (registers the built-in kinds)
+    return _handlers.get(kind)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobContext:
+    """Handed to job handlers: progress reporting doubles as the cancellation check."""
+
+    def __init__(self, job_row: Job):
+        self.job_id = job_row.id
+        self.tenant_id = job_row.tenant_id
+        self._last_write = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None, force: bool = False) -> None:
+        """Record progress (at most once a second) and raise JobCancelled if asked to stop."""
+        now = time.time()
+        if not force and now - self._last_write < 1.0:
+            return
+        self._last_write = now
+        t = Job.__table__
+        values: Dict[str, Any] = {"progress_done": done, "heartbeat_at": datetime.utcnow()}
+        if total is not None:
+            values["progress_total"] = total
+        # own connection: must not commit the handler's pending session work
+        with db.engine.begin() as conn:
+            conn.execute(t.update().where(t.c.id == self.job_id).values(**values))
+            cancel = conn.execute(select(t.c.cancel_requested).where(t.c.id == self.job_id)).scalar()
+        if cancel:
+            raise JobCancelled()
+
+
+def serialize_job(j: Job) -> Dict[str, Any]:
+    return {
+        "id": j.id,
+        "kind": j.kind,
+        "status": j.status,
+        "progress": {"done": j.progress_done, "total": j.progress_total},
+        "result": j.result,
+        "error": j.error,
+        "cancel_requested": bool(j.cancel_requested),
+        "created_at": j.created_at.isoformat() if j.created_at else None,
+        "started_at": j.started_at.isoformat() if j.started_at else None,
+        "finished_at": j.finished_at.isoformat() if j.finished_at else None,
+    }
+
+
+def enqueue(tenant_id: int, kind: str, payload: Optional[Dict[str, Any]] = None) -> Job:
+    """Persist a job and hand it to the configured backend.
+
+    JOBS_BACKEND=worker: scripts/worker.py picks it up (woken via Redis when
+    available, otherwise by polling the table). JOBS_BACKEND=thread: a small
+    in-process pool runs it, for local runs without a worker.
+    """
+    if get_handler(kind) is None:
+        raise ValueError(f"unknown job kind: {kind}")
+    j = Job(tenant_id=tenant_id, kind=kind, payload=payload or {}, status='queued')
+    db.session.add(j)
+    db.session.commit()
+    if current_app.config.get("JOBS_BACKEND", "thread") == "thread":
+        _submit_local(current_app._get_current_object(), j.id)
+    elif extensions.redis_client is not None:
+        try:
+            extensions.redis_client.lpush(QUEUE_KEY, j.id)
+        except Exception:
+            pass
+    return j
+
+
+def _submit_local(app: Flask, job_id: int) -> None:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app.config.get("JOBS_THREADS", 2), thread_name_prefix="job")
+
+    def run():
+        with app.app_context():
+            if claim(job_id):
+                run_job(job_id)
+            db.session.remove()
+
+    _executor.submit(run)
+
+
+def claim(job_id: int) -> bool:
+    """Atomically move a queued job to running; False if someone else got it."""
+    t = Job.__table__
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        res = conn.execute(
+            t.update()
+            .where(t.c.id == job_id, t.c.status == 'queued')
+            .values(status='running', worker=worker_name(), started_at=now, heartbeat_at=now, attempts=t.c.attempts + 1)
+        )
+    return res.rowcount == 1
+
+
+def _finish(job_id: int, status: str, result=None, error: Optional[str] = None) -> None:
+    db.session.rollback()
+    j = db.session.get(Job, job_id)
+    if j is None:
+        return
+    j.status = status
+    j.result = result
+    j.error = error
+    j.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def run_job(job_id: int) -> None:
+    """Run a claimed job to completion inside the current app context."""
+    j = db.session.get(Job, job_id)
+    if j is None or j.status != 'running':
+        return
+    handler = get_handler(j.kind)
+    if handler is None:
+        _finish(job_id, 'failed', error=f"unknown job kind: {j.kind}")
+        return
+    ctx = JobContext(j)
+    payload = dict(j.payload or {})
+    try:
+        result = handler(ctx, payload)
+    except JobCancelled:
+        _finish(job_id, 'cancelled')
+    except Exception as e:
+        current_app.logger.error("job %s (%s) failed: %s", job_id, j.kind, traceback.format_exc())
+        _finish(job_id, 'failed', error=str(e) or e.__class__.__name__)
+    else:
+        _finish(job_id, 'succeeded', result=result or {})
+
+
+def cancel(j: Job) -> Job:
+    """Queued jobs are cancelled at once; running ones stop at their next progress()."""
+    if j.status == 'queued':
+        j.status = 'cancelled'
+        j.finished_at = datetime.utcnow()
+    elif j.status == 'running':
+        j.cancel_requested = True
+    db.session.commit()
+    return j
+
+
+def requeue_stale(max_age_seconds: int) -> int:
+    """Put jobs whose worker stopped heartbeating back in the queue.
+
+    Stale jobs that were asked to cancel are marked cancelled instead: the
+    worker that would have honoured the request is gone. Returns the number
+    requeued.
+    """
+    t = Job.__table__
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=max_age_seconds)
+    with db.engine.begin() as conn:
+        conn.execute(
+            t.update()
+            .where(t.c.status == 'running', t.c.heartbeat_at < cutoff, t.c.cancel_requested.is_(True))
+            .values(status='cancelled', worker=None, finished_at=now)
+        )
+        res = conn.execute(
+            t.update()
+            .where(t.c.status == 'running', t.c.heartbeat_at < cutoff, t.c.cancel_requested.is_(False))
+            .values(status='queued', worker=None)
+        )
+    return res.rowcount
+
+
+def next_queued_ids(limit: int = 10):
+    return [jid for (jid,) in db.session.query(Job.id).filter(Job.status == 'queued').order_by(Job.id.asc()).limit(limit)]
+
+
+def start_local_sweeper(app: Flask) -> None:
+    """JOBS_BACKEND=thread: recover jobs a crashed process left behind.
+
+    Runs requeue_stale now and every JOBS_STALE_SECONDS / 2, then hands queued
+    jobs to this process's pool (claim() keeps two processes from running the
+    same one). Called from gunicorn's post_worker_init and wsgi's __main__,
+    never at import, so CLI commands don't touch the jobs table.
+    """
+    global _sweeper_pid
+    if app.config.get("JOBS_BACKEND", "thread") != "thread" or _sweeper_pid == os.getpid():
+        return
+    _sweeper_pid = os.getpid()
+    stale = app.config.get("JOBS_STALE_SECONDS", 300)
+
+    def sweep():
+        with app.app_context():
+            try:
+                requeue_stale(stale)
+                for job_id in next_queued_ids(100):
+                    _submit_local(app, job_id)
+            except Exception:
+                app.logger.warning("job sweep failed", exc_info=True)
+            finally:
+                db.session.remove()
+
+    def loop():
+        while True:
+            sweep()
+            time.sleep(max(1.0, stale / 2))
+
+    threading.Thread(target=loop, name="job-sweep", daemon=True).start()
@@ -0,0 +1,82 @@
+"""JSON provider for `jsonify` and `request.get_json`.
+
+Uses orjson when it is installed (and JSON_FAST is on), the stdlib encoder
+otherwise. Both paths write Decimal as a JSON number and date/datetime as
+ISO 8601, so views can return model values (prices, timestamps) as they are
+instead of converting field by field. Key order and debug pretty-printing
+follow Flask's defaults.
+"""
+from __future__ import annotations
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from typing import Any
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # type: ignore
+except Exception:  # optional dependency
+    orjson = None
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def __init__(self, app: Flask) -> None:
+        super().__init__(app)
+        self.fast = orjson is not None and app.config.get("JSON_FAST", True)
+
+    def _options(self, indent: bool = False) -> int:
+        opts = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opts |= orjson.OPT_SORT_KEYS
+        if indent:
+            opts |= orjson.OPT_INDENT_2
+        return opts
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.fast and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._options()).decode("utf-8")
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if self.fast and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if not self.fast:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # bytes straight into the response, no str round trip
+        body = orjson.dumps(obj, default=_default, option=self._options(indent))
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app: Flask) -> None:
+    app.json = FastJSONProvider(app)
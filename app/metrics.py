@@ -0,0 +1,250 @@
+"""In-process metrics with a file-per-worker merge for /metrics.
+
+Each process keeps counters and histograms in plain dicts (one lock, no I/O on
+the hot path) and every METRICS_FLUSH_SECONDS writes a snapshot to
+METRICS_DIR/<pid>.json, from the request path and from a background thread,
+so an idle worker still publishes its last counts (and once more on exit). /metrics merges all snapshots (its own process live)
+and renders the Prometheus text exposition format, so any worker can answer
+for the whole gunicorn pool.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .services.counters import start_flusher
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HELP = {
+    "chatbot_request_seconds": ("histogram", "Request latency by endpoint."),
+    "chatbot_stage_seconds": ("histogram", "Latency of hot-path stages (auth, rate limit, matching, commit)."),
+    "chatbot_db_queries_per_request": ("histogram", "SQL statements executed per request."),
+    "chatbot_db_queries_total": ("counter", "SQL statements executed."),
+    "chatbot_requests_total": ("counter", "Requests by endpoint and status."),
+    "chatbot_cache_requests_total": ("counter", "Cache lookups by namespace and result."),
+    "chatbot_rate_limited_total": ("counter", "Requests rejected by the rate limiter."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+        self.hists: Dict[Tuple[str, Labels], List[float]] = {}
+        self.buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            h = self.hists.get(key)
+            if h is None:
+                self.buckets.setdefault(name, buckets)
+                h = self.hists[key] = [0.0] * (len(buckets) + 2)
+            for i, b in enumerate(buckets):
+                if value <= b:
+                    h[i] += 1
+                    break
+            else:
+                h[len(buckets)] += 1
+            h[-1] += value
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+                "hists": [[n, list(l), list(h)] for (n, l), h in self.hists.items()],
+                "buckets": {n: list(b) for n, b in self.buckets.items()},
+            }
+
+
+registry = Registry()
+_state = {"dir": None, "interval": 5.0, "last_flush": 0.0}
+_inflight = [0]
+_inflight_lock = threading.Lock()
+
+
+def inflight() -> int:
+    """Requests currently being handled by this worker."""
+    return _inflight[0]
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    registry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels) -> None:
+    registry.observe(name, value, buckets, **labels)
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("chatbot_stage_seconds", time.perf_counter() - start, stage=stage)
+
+
+def _snapshot_path(pid: Optional[int] = None) -> Optional[str]:
+    d = _state["dir"]
+    return os.path.join(d, f"{pid or os.getpid()}.json") if d else None
+
+
+def flush() -> None:
+    path = _snapshot_path()
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    _state["last_flush"] = time.time()
+
+
+def maybe_flush() -> None:
+    if time.time() - _state["last_flush"] >= _state["interval"]:
+        flush()
+
+
+def _load_snapshots() -> Iterable[dict]:
+    yield registry.snapshot()
+    d = _state["dir"]
+    if not d or not os.path.isdir(d):
+        return
+    own = f"{os.getpid()}.json"
+    for fn in os.listdir(d):
+        if not fn.endswith(".json") or fn == own:
+            continue
+        try:
+            with open(os.path.join(d, fn)) as f:
+                yield json.load(f)
+        except (OSError, ValueError):
+            continue
+
+
+def _fmt_labels(labels: Iterable[Tuple[str, str]], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+def _fmt_num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def render() -> str:
+    """Merge every worker's snapshot and render the text exposition format."""
+    counters: Dict[Tuple[str, Labels], float] = {}
+    hists: Dict[Tuple[str, Labels], List[float]] = {}
+    buckets: Dict[str, List[float]] = {}
+    for snap in _load_snapshots():
+        for n, l, v in snap.get("counters", []):
+            key = (n, tuple(tuple(x) for x in l))
+            counters[key] = counters.get(key, 0.0) + v
+        buckets.update(snap.get("buckets", {}))
+        for n, l, h in snap.get("hists", []):
+            key = (n, tuple(tuple(x) for x in l))
+            cur = hists.get(key)
+            hists[key] = list(h) if cur is None else [a + b for a, b in zip(cur, h)]
+
+    out: List[str] = []
+    names = sorted({n for n, _ in counters} | {n for n, _ in hists})
+    for name in names:
+        kind, help_text = HELP.get(name, ("counter" if any(n == name for n, _ in counters) else "histogram", name))
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (n, l), v in sorted(counters.items()):
+                if n == name:
+                    out.append(f"{name}{_fmt_labels(l)} {_fmt_num(v)}")
+            continue
+        bs = buckets.get(name, list(LATENCY_BUCKETS))
+        for (n, l), h in sorted(hists.items()):
+            if n != name:
+                continue
+            acc = 0.0
+            for i, b in enumerate(bs):
+                acc += h[i]
+                out.append(f"{name}_bucket{_fmt_labels(l, ('le', _fmt_num(b)))} {_fmt_num(acc)}")
+            acc += h[len(bs)]
+            out.append(f"{name}_bucket{_fmt_labels(l, ('le', '+Inf'))} {_fmt_num(acc)}")
+            out.append(f"{name}_sum{_fmt_labels(l)} {repr(float(h[-1]))}")
+            out.append(f"{name}_count{_fmt_labels(l)} {_fmt_num(acc)}")
+    return "\n".join(out) + "\n"
+
+
+def _on_sql(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._metrics_queries = getattr(g, "_metrics_queries", 0) + 1
+    else:
+        registry.inc("chatbot_db_queries_total", endpoint="(background)")
+
+
+def init_metrics(app: Flask) -> None:
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    d = app.config.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "chatbot_metrics")
+    try:
+        os.makedirs(d, exist_ok=True)
+        _state["dir"] = d
+    except OSError:
+        _state["dir"] = None  # per-process numbers only
+    _state["interval"] = float(app.config.get("METRICS_FLUSH_SECONDS", 5))
+    if not event.contains(Engine, "before_cursor_execute", _on_sql):
+        event.listen(Engine, "before_cursor_execute", _on_sql)
+    atexit.register(flush)
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_t0 = time.perf_counter()
+        g._metrics_queries = 0
+        with _inflight_lock:
+            _inflight[0] += 1
+        g._metrics_inflight = True
+
+    @app.teardown_request
+    def _metrics_done(exc=None):
+        if g.pop("_metrics_inflight", False):
+            with _inflight_lock:
+                _inflight[0] -= 1
+
+    @app.after_request
+    def _metrics_end(response):
+        t0 = getattr(g, "_metrics_t0", None)
+        if t0 is not None and request.endpoint not in ("health.metrics", "health.ready"):
+            endpoint = request.endpoint or "(unmatched)"
+            registry.observe("chatbot_request_seconds", time.perf_counter() - t0, endpoint=endpoint, method=request.method)
+            registry.inc("chatbot_requests_total", endpoint=endpoint, status=response.status_code)
+            q = getattr(g, "_metrics_queries", 0)
+            registry.observe("chatbot_db_queries_per_request", q, COUNT_BUCKETS, endpoint=endpoint)
+            if q:
+                registry.inc("chatbot_db_queries_total", q, endpoint=endpoint)
+        maybe_flush()
+        # idle workers still publish their last counts
+        start_flusher("metrics", flush, _state["interval"])
+        return response
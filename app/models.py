@@ -14,13 +14,18 @@ class Tenant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     status = db.Column(db.Enum('active', 'disabled', name='tenant_status'), nullable=False, default='active')
+    # Bumped on every admin write (settings, rules, products); drives ETags and cache keys
+    config_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class ApiKey(db.Model):
     __tablename__ = 'api_keys'
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        db.Index('idx_api_keys_active', 'is_active'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
@@ -35,11 +40,16 @@ class ApiKey(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'sku', name='uniq_products_tenant_sku'),
+        db.Index('idx_products_tenant_active', 'tenant_id', 'is_active', 'id'),
+        db.Index('idx_products_tenant_name', 'tenant_id', 'name'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), index=True, nullable=False)
-    sku = db.Column(db.String(64), unique=True)
+    sku = db.Column(db.String(64))
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -48,6 +58,8 @@ class Product(db.Model):
     stock = db.Column(db.Integer, nullable=False, default=0)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     tags = db.Column(db.JSON)
+    # sha256 of the catalog fields as last imported; unchanged upstream rows are skipped
+    content_hash = db.Column(db.String(64))
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -56,7 +68,12 @@ class Product(db.Model):
 
 class KeywordRule(db.Model):
     __tablename__ = 'keyword_rules'
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        db.Index('idx_rules_tenant_active_priority', 'tenant_id', 'is_active', 'priority'),
+        db.Index('idx_rules_tenant_priority', 'tenant_id', 'priority', 'id'),
+        db.Index('idx_rules_tenant_trigger', 'tenant_id', 'trigger_text'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), index=True, nullable=False)
@@ -104,7 +121,10 @@ class Conversation(db.Model):
 
 class Message(db.Model):
     __tablename__ = 'messages'
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        db.Index('idx_msgs_conv', 'conversation_id', 'created_at'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), index=True, nullable=False)
@@ -119,7 +139,10 @@ class Message(db.Model):
 
 class Cart(db.Model):
     __tablename__ = 'carts'
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        db.Index('idx_carts_tenant_status_conv', 'tenant_id', 'status', 'conversation_id'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), index=True, nullable=False)
@@ -136,7 +159,10 @@ class Cart(db.Model):
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        db.UniqueConstraint('cart_id', 'product_id', name='uniq_cart_product'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), index=True, nullable=False)
@@ -151,7 +177,10 @@ class CartItem(db.Model):
 
 class Setting(db.Model):
     __tablename__ = 'settings'
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'key', name='uniq_settings_tenant_key'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), index=True, nullable=False)
@@ -161,3 +190,133 @@ class Setting(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     tenant = db.relationship('Tenant')
+
+
+class ProductPair(db.Model):
+    """Symmetric co-occurrence count: carts containing both products (stored both ways)."""
+    __tablename__ = 'product_pairs'
+    __table_args__ = (
+        db.Index('idx_pairs_tenant_product_count', 'tenant_id', 'product_id', 'count'),
+    )
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    other_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ProductNeighbors(db.Model):
+    """Top-K co-occurring products per product, read by primary key at request time."""
+    __tablename__ = 'product_neighbors'
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    # [[other_id, count], ...] ordered by count desc
+    neighbors = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RecoState(db.Model):
+    """Per-tenant watermark: cart_items up to this id are folded into product_pairs."""
+    __tablename__ = 'reco_state'
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), primary_key=True)
+    last_cart_item_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ProductPopularity(db.Model):
+    """Popularity score (impressions + weighted cart adds); the store used when Redis is absent."""
+    __tablename__ = 'product_popularity'
+    __table_args__ = (
+        db.Index('idx_popularity_tenant_score', 'tenant_id', 'score'),
+    )
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), primary_key=True)
+    # no FK: counters outlive products; flush() skips ids that are gone
+    product_id = db.Column(db.Integer, primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ConversationArchive(db.Model):
+    """Retention archive (RETENTION_ARCHIVE=table): a deleted conversation and its messages as gzipped JSON."""
+    __tablename__ = 'conversation_archive'
+    __table_args__ = (
+        db.Index('idx_conv_archive_tenant', 'tenant_id', 'conversation_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
+    conversation_id = db.Column(db.Integer, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    payload = db.Column(db.LargeBinary(length=2**32 - 1), nullable=False)
+
+
+class AnalyticsRollup(db.Model):
+    """Time-bucketed chat counters (query text, rule hits, zero-result queries); the store used when Redis is absent."""
+    __tablename__ = 'analytics_rollup'
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), primary_key=True)
+    kind = db.Column(db.String(16), primary_key=True)  # query|rule|zero
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    key = db.Column(db.String(128), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SyncState(db.Model):
+    """Validators of one upstream catalog page, for conditional re-fetches."""
+    __tablename__ = 'sync_state'
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'url_hash', name='uniq_sync_state_tenant_url'),
+        {'sqlite_autoincrement': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
+    url_hash = db.Column(db.String(64), nullable=False)
+    url = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(255))
+    last_modified = db.Column(db.String(64))
+    # next page link seen with this page, followed when the page answers 304
+    next_url = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Job(db.Model):
+    """Background task (imports, syncs, rebuilds) claimed by a worker or a local thread."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('idx_jobs_status_id', 'status', 'id'),
+        db.Index('idx_jobs_tenant_id', 'tenant_id', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
+    kind = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.Enum('queued', 'running', 'succeeded', 'failed', 'cancelled', name='job_status'), nullable=False, default='queued')
+    payload = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(128))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+class AppMeta(db.Model):
+    """Deploy-level markers (e.g. the schema/bootstrap fingerprint checked at worker boot)."""
+    __tablename__ = 'app_meta'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
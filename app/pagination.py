@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Dict, Optional
+
+from flask import current_app, request
+from sqlalchemy import func, select
+
+from .extensions import db
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Opaque cursor -> dict of last-row sort keys; None when absent."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise CursorError("invalid cursor")
+    if not isinstance(values, dict):
+        raise CursorError("invalid cursor")
+    return values
+
+
+def page_limit(default: int = 100, maximum: int = 500) -> int:
+    try:
+        return max(1, min(int(request.args.get("limit", default)), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+def bool_arg(name: str) -> Optional[bool]:
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    return value.lower() in ("1", "true", "yes")
+
+
+def estimate_total(query, column) -> Dict[str, Any]:
+    """Count matching rows, but stop at PAGE_TOTAL_CAP instead of scanning everything.
+
+    Returns {"value": n, "exact": bool}; exact is False when the cap was hit.
+    """
+    cap = current_app.config.get("PAGE_TOTAL_CAP", 10000)
+    sub = query.order_by(None).with_entities(column).limit(cap + 1).subquery()
+    n = db.session.execute(select(func.count()).select_from(sub)).scalar() or 0
+    return {"value": min(n, cap), "exact": n <= cap}
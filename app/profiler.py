@@ -0,0 +1,139 @@
+"""Opt-in per-request SQL profiler and slow-request log.
+
+A request is profiled when it carries `X-Profile: <PROFILER_TOKEN>` (any value
+in debug mode when no token is set) or is picked by PROFILER_SAMPLE_RATE. Each
+statement is recorded with its duration and the first app/ frame that issued
+it; the same statement issued from the same line PROFILER_NPLUS1_MIN times is
+reported as an N+1 candidate.
+
+Requests slower than SLOW_REQUEST_MS are logged as one JSON line whether or
+not they were profiled (profiled ones include the statements).
+"""
+from __future__ import annotations
+
+import hmac
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_SELF = os.path.abspath(__file__)
+
+
+def _caller() -> Optional[str]:
+    """First frame inside the app package (skipping this module), as path:line func."""
+    f = sys._getframe(2)
+    while f is not None:
+        path = f.f_code.co_filename
+        if path.startswith(_APP_DIR) and path != _SELF:
+            return f"{os.path.relpath(path, os.path.dirname(_APP_DIR))}:{f.f_lineno} {f.f_code.co_name}"
+        f = f.f_back
+    return None
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and getattr(g, "_profile", None) is not None:
+        conn.info.setdefault("_profile_t0", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    prof = getattr(g, "_profile", None)
+    stack = conn.info.get("_profile_t0")
+    if prof is None or not stack:
+        return
+    prof.append({
+        "sql": " ".join(statement.split()),
+        "ms": round((time.perf_counter() - stack.pop()) * 1000, 3),
+        "at": _caller(),
+        "rows": cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None,
+    })
+
+
+def _wants_profile() -> bool:
+    cfg = current_app.config
+    hdr = request.headers.get("X-Profile")
+    if hdr:
+        token = cfg.get("PROFILER_TOKEN")
+        if token:
+            if hmac.compare_digest(hdr, token):
+                return True
+        elif current_app.debug:
+            return True
+    rate = cfg.get("PROFILER_SAMPLE_RATE", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def nplus1(statements: List[Dict[str, Any]], min_repeats: int) -> List[Dict[str, Any]]:
+    """Group statements by (sql, call site); repeats at or above min_repeats are suspects."""
+    groups: Dict[tuple, List[float]] = defaultdict(list)
+    for s in statements:
+        groups[(s["sql"], s["at"])].append(s["ms"])
+    return [
+        {"sql": sql, "at": at, "count": len(ms), "total_ms": round(sum(ms), 3)}
+        for (sql, at), ms in sorted(groups.items(), key=lambda kv: -len(kv[1]))
+        if len(ms) >= min_repeats
+    ]
+
+
+def summarize(statements: List[Dict[str, Any]], min_repeats: int) -> Dict[str, Any]:
+    return {
+        "queries": len(statements),
+        "db_ms": round(sum(s["ms"] for s in statements), 3),
+        "nplus1": nplus1(statements, min_repeats),
+        "statements": statements,
+    }
+
+
+def init_profiler(app: Flask) -> None:
+    if not app.config.get("PROFILER_ENABLED", True):
+        return
+    if not event.contains(Engine, "before_cursor_execute", _before):
+        event.listen(Engine, "before_cursor_execute", _before)
+        event.listen(Engine, "after_cursor_execute", _after)
+
+    @app.before_request
+    def _profile_start():
+        g._profile_t0 = time.perf_counter()
+        g._profile = [] if _wants_profile() else None
+
+    @app.after_request
+    def _profile_end(response):
+        t0 = getattr(g, "_profile_t0", None)
+        if t0 is None:
+            return response
+        cfg = current_app.config
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        statements = getattr(g, "_profile", None)
+        min_repeats = cfg.get("PROFILER_NPLUS1_MIN", 3)
+        summary = summarize(statements, min_repeats) if statements is not None else None
+        if summary is not None:
+            response.headers["Server-Timing"] = (
+                f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries", app;dur={elapsed_ms:.1f}'
+            )
+            if summary["nplus1"]:
+                response.headers["X-Profile-NPlus1"] = str(len(summary["nplus1"]))
+        if elapsed_ms >= cfg.get("SLOW_REQUEST_MS", 1000) or (summary and summary["nplus1"]):
+            record = {
+                "event": "slow_request" if elapsed_ms >= cfg.get("SLOW_REQUEST_MS", 1000) else "nplus1",
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "ms": round(elapsed_ms, 1),
+                "tenant_id": getattr(g, "tenant_id", None),
+                "queries": getattr(g, "_metrics_queries", None),
+            }
+            if summary is not None:
+                record.update(summary)
+            current_app.logger.warning("%s", json.dumps(record, ensure_ascii=False, default=str))
+        return response
@@ -4,7 +4,7 @@ import time
 from dataclasses import dataclass
 from flask import g, current_app
 
-from .extensions import redis_client
+from . import extensions, metrics
 
 
 @dataclass
@@ -18,7 +18,16 @@ def _key(prefix: str, api_key: str):
     return f"rl:{prefix}:{api_key}"
 
 
-def check_rate_limit(scope: str = "default", rpm: int | None = None) -> RateLimit:
+def check_rate_limit(scope: str = "default", rpm: int | None = None, cost: int = 1) -> RateLimit:
+    """Charge `cost` units against the caller's per-minute budget for `scope`."""
+    with metrics.timed("check_rate_limit"):
+        rl = _check(scope, rpm, cost)
+    if rl.remaining <= 0:
+        metrics.inc("chatbot_rate_limited_total", scope=scope)
+    return rl
+
+
+def _check(scope: str, rpm: int | None, cost: int = 1) -> RateLimit:
     api_key = getattr(g, "api_key", None)
     if not api_key:
         # if no api key, treat as strict
@@ -30,9 +39,11 @@ def check_rate_limit(scope: str = "default", rpm: int | None = None) -> RateLimi
     bucket_key = _key(scope, api_key)
     reset = now - (now % window) + window
 
+    # read at call time: init_redis may run after this module is imported
+    redis_client = extensions.redis_client
     if redis_client:
         pipe = redis_client.pipeline()
-        pipe.incr(bucket_key, 1)
+        pipe.incr(bucket_key, cost)
         pipe.expireat(bucket_key, reset)
         count, _ = pipe.execute()
         remaining = max(0, limit - int(count))
@@ -47,7 +58,7 @@ def check_rate_limit(scope: str = "default", rpm: int | None = None) -> RateLimi
     bucket = store.get(bucket_key)
     if not bucket or bucket[1] <= now:
         store[bucket_key] = [0, reset]
-    store[bucket_key][0] += 1
+    store[bucket_key][0] += cost
     count, reset_ts = store[bucket_key]
     remaining = max(0, limit - int(count))
     return RateLimit(limit=limit, remaining=remaining, reset=reset_ts)
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, current_app, jsonify, request, g
 
 from ..auth import require_api_key
 from ..extensions import db
 from ..models import KeywordRule, Setting, Product
-from ..cache import get as cache_get, set as cache_set, delete as cache_delete
+from sqlalchemy import and_, or_, text
+from ..jobs import enqueue, serialize_job
+from ..pagination import CursorError, bool_arg, decode_cursor, encode_cursor, estimate_total, page_limit
+from ..services import analytics, popularity
+from ..services.catalog_sync import reset_validators
+from ..services.settings import ALLOWED_SETTING_KEYS, tenant_settings
+from ..versions import bump_tenant_version, get_tenant_version
 from decimal import Decimal
 import json
 import typing as t
-import requests
 
 bp = Blueprint("admin", __name__)
 
@@ -20,14 +25,46 @@ def _auth():
         require_api_key()
 
 
+def _bad_cursor():
+    return jsonify({"error": {"code": "bad_request", "message": "invalid cursor"}}), 400
+
+
 # Keyword rules CRUD
 @bp.get("/keyword-rules")
 def list_rules():
-    q = db.session.query(KeywordRule).filter(
-        KeywordRule.tenant_id == g.tenant_id
-    ).order_by(KeywordRule.priority.desc(), KeywordRule.id.desc())
-    rules = [serialize_rule(r) for r in q.all()]
-    return jsonify(rules)
+    """Keyset-paginated rules, highest priority first.
+
+    Query: limit (<=500), cursor, active=0|1, locale, total=1.
+    Returns {"items", "next_cursor", "total_estimate"?}.
+    """
+    limit = page_limit()
+    try:
+        cur = decode_cursor(request.args.get("cursor"))
+    except CursorError:
+        return _bad_cursor()
+    q = db.session.query(KeywordRule).filter(KeywordRule.tenant_id == g.tenant_id)
+    active = bool_arg("active")
+    if active is not None:
+        q = q.filter(KeywordRule.is_active.is_(active))
+    locale = request.args.get("locale")
+    if locale:
+        q = q.filter(KeywordRule.locale == locale)
+    total = estimate_total(q, KeywordRule.id) if bool_arg("total") and not cur else None
+    if cur:
+        try:
+            p, last_id = int(cur["p"]), int(cur["id"])
+        except (KeyError, TypeError, ValueError):
+            return _bad_cursor()
+        q = q.filter(or_(KeywordRule.priority < p, and_(KeywordRule.priority == p, KeywordRule.id < last_id)))
+    rows = q.order_by(KeywordRule.priority.desc(), KeywordRule.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"p": rows[-1].priority, "id": rows[-1].id})
+    payload = {"items": [serialize_rule(r) for r in rows], "next_cursor": next_cursor}
+    if total is not None:
+        payload["total_estimate"] = total
+    return jsonify(payload)
 
 
 @bp.post("/keyword-rules")
@@ -38,6 +75,7 @@ def create_rule():
             tenant_id=g.tenant_id,
             trigger_text=(data.get("trigger_text") or "").strip(),
             match_type=(data.get("match_type") or "contains"),
+            locale=(data.get("locale") or None),
             priority=int(data.get("priority") or 0),
             product_ids=data.get("product_ids") or [],
             response_text=data.get("response_text"),
@@ -47,6 +85,7 @@ def create_rule():
             return jsonify({"error": {"code": "bad_request", "message": "trigger_text required"}}), 400
         db.session.add(r)
         db.session.commit()
+        bump_tenant_version(g.tenant_id)
         return jsonify(serialize_rule(r)), 201
     except Exception as e:
         db.session.rollback()
@@ -59,10 +98,13 @@ def update_rule(rule_id: int):
     if not r or r.tenant_id != g.tenant_id:
         return jsonify({"error": {"code": "not_found", "message": "rule not found"}}), 404
     data = request.get_json(silent=True) or {}
-    for field in ["trigger_text", "match_type", "priority", "product_ids", "response_text", "is_active"]:
+    for field in ["trigger_text", "match_type", "locale", "priority", "product_ids", "response_text", "is_active"]:
         if field in data:
             setattr(r, field, data[field])
+    if not r.locale:
+        r.locale = None
     db.session.commit()
+    bump_tenant_version(g.tenant_id)
     return jsonify(serialize_rule(r))
 
 
@@ -73,6 +115,7 @@ def delete_rule(rule_id: int):
         return jsonify({"error": {"code": "not_found", "message": "rule not found"}}), 404
     db.session.delete(r)
     db.session.commit()
+    bump_tenant_version(g.tenant_id)
     return jsonify({"ok": True})
 
 
@@ -81,6 +124,7 @@ def serialize_rule(r: KeywordRule):
         "id": r.id,
         "trigger_text": r.trigger_text,
         "match_type": r.match_type,
+        "locale": r.locale,
         "priority": r.priority,
         "product_ids": r.product_ids or [],
         "response_text": r.response_text,
@@ -89,24 +133,23 @@ def serialize_rule(r: KeywordRule):
 
 
 # Settings (welcome/default replies)
-ALLOWED_SETTING_KEYS = {"welcome_text", "default_reply_text", "external_products_api_url", "external_products_api_key", "suggested_queries"}
+def _settings_response(payload: dict, etag: str, status: int = 200):
+    resp = jsonify(payload) if status == 200 else current_app.response_class(status=status)
+    resp.set_etag(etag)
+    # let the browser keep a copy but always revalidate with If-None-Match
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
 
 
 @bp.get("/settings")
 def get_settings():
     try:
-        cache_key = f"{g.tenant_id}:settings"
-        cached = cache_get("settings", cache_key)
-        if cached is not None:
-            return jsonify(cached)
-        rows = (
-            db.session.query(Setting)
-            .filter(Setting.tenant_id == g.tenant_id, Setting.key.in_(ALLOWED_SETTING_KEYS))
-            .all()
-        )
-        res = {s.key: s.value for s in rows}
-        cache_set("settings", cache_key, res, ttl_seconds=60)
-        return jsonify(res)
+        version = get_tenant_version(g.tenant_id)
+        etag = f"settings-{g.tenant_id}-{version}"
+        # answered before touching the settings rows or serializing anything
+        if request.if_none_match.contains(etag):
+            return _settings_response({}, etag, status=304)
+        return _settings_response(tenant_settings(g.tenant_id, version), etag)
     except Exception:
         # If the table is missing (e.g., first boot), attempt to create it then return defaults
         try:
@@ -158,25 +201,64 @@ def update_settings():
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": {"code": "server_error", "message": str(e)}}), 500
-    # invalidate cache
-    cache_delete("settings", f"{g.tenant_id}:settings")
+    # new version -> new ETag and settings cache key
+    bump_tenant_version(g.tenant_id)
     return jsonify(updated)
 
 
 # Admin Products CRUD
+def _like_prefix(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _tag_filter(tag: str):
+    """Product.tags (JSON array) contains `tag`, in each backend's native JSON syntax."""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        return text("CAST(products.tags AS jsonb) @> CAST(:tag_json AS jsonb)").bindparams(tag_json=json.dumps([tag]))
+    if dialect == "mysql":
+        return text("JSON_CONTAINS(products.tags, :tag_json)").bindparams(tag_json=json.dumps(tag))
+    return text("EXISTS (SELECT 1 FROM json_each(products.tags) WHERE json_each.value = :tag)").bindparams(tag=tag)
+
+
 @bp.get("/admin/products")
 def admin_list_products():
-    limit = min(int(request.args.get("limit", 100)), 500)
-    offset = int(request.args.get("offset", 0))
-    q = (
-        db.session.query(Product)
-        .filter(Product.tenant_id == g.tenant_id)
-        .order_by(Product.id.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-    return jsonify([serialize_product(p) for p in q])
+    """Keyset-paginated products, newest first.
+
+    Query: limit (<=500), cursor, active=0|1, sku_prefix, tag, total=1.
+    Returns {"items", "next_cursor", "total_estimate"?}; deep pages cost the same
+    as the first because each page seeks past the last id instead of OFFSET.
+    """
+    limit = page_limit()
+    try:
+        cur = decode_cursor(request.args.get("cursor"))
+    except CursorError:
+        return _bad_cursor()
+    q = db.session.query(Product).filter(Product.tenant_id == g.tenant_id)
+    active = bool_arg("active")
+    if active is not None:
+        q = q.filter(Product.is_active.is_(active))
+    sku_prefix = (request.args.get("sku_prefix") or "").strip()
+    if sku_prefix:
+        q = q.filter(Product.sku.like(_like_prefix(sku_prefix), escape="\\"))
+    tag = (request.args.get("tag") or "").strip()
+    if tag:
+        q = q.filter(_tag_filter(tag))
+    total = estimate_total(q, Product.id) if bool_arg("total") and not cur else None
+    if cur:
+        try:
+            q = q.filter(Product.id < int(cur["id"]))
+        except (KeyError, TypeError, ValueError):
+            return _bad_cursor()
+    rows = q.order_by(Product.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"id": rows[-1].id})
+    payload = {"items": [serialize_product(p) for p in rows], "next_cursor": next_cursor}
+    if total is not None:
+        payload["total_estimate"] = total
+    return jsonify(payload)
 
 
 @bp.post("/admin/products")
@@ -199,6 +281,7 @@ def admin_create_product():
             return jsonify({"error": {"code": "bad_request", "message": "name required"}}), 400
         db.session.add(p)
         db.session.commit()
+        bump_tenant_version(g.tenant_id)
         return jsonify(serialize_product(p)), 201
     except Exception as e:
         db.session.rollback()
@@ -222,7 +305,11 @@ def admin_update_product(pid: int):
         p.is_active = bool(data["is_active"])
     if "tags" in data:
         p.tags = data["tags"]
+    # local edit: let the next catalog sync rewrite the row even if upstream is unchanged
+    p.content_hash = None
+    reset_validators(g.tenant_id)
     db.session.commit()
+    bump_tenant_version(g.tenant_id)
     return jsonify(serialize_product(p))
 
 
@@ -231,8 +318,10 @@ def admin_delete_product(pid: int):
     p = db.session.get(Product, pid)
     if not p or p.tenant_id != g.tenant_id:
         return jsonify({"error": {"code": "not_found", "message": "product not found"}}), 404
+    popularity.forget(g.tenant_id, pid)
     db.session.delete(p)
     db.session.commit()
+    bump_tenant_version(g.tenant_id)
     return jsonify({"ok": True})
 
 
@@ -242,7 +331,7 @@ def serialize_product(p: Product):
         "sku": p.sku,
         "name": p.name,
         "description": p.description,
-        "price": float(p.price),
+        "price": p.price,
         "currency": p.currency,
         "image_url": p.image_url,
         "stock": p.stock,
@@ -251,70 +340,23 @@ def serialize_product(p: Product):
     }
 
 
+def _accepted(j):
+    """202 + Location for a queued job; clients poll /v1/jobs/<id>."""
+    resp = jsonify({"ok": True, "job": serialize_job(j), "status_url": f"/v1/jobs/{j.id}"})
+    resp.status_code = 202
+    resp.headers["Location"] = f"/v1/jobs/{j.id}"
+    return resp
+
+
 @bp.post("/admin/products/import")
 def admin_import_products():
-    # Read settings
+    # Settings are re-read by the job; the body may still supply api_url/api_key
     url_row = db.session.query(Setting).filter(Setting.tenant_id==g.tenant_id, Setting.key=='external_products_api_url').first()
-    key_row = db.session.query(Setting).filter(Setting.tenant_id==g.tenant_id, Setting.key=='external_products_api_key').first()
-    api_url = (url_row.value if url_row else None) or (request.json or {}).get('api_url')
-    api_key = (key_row.value if key_row else None) or (request.json or {}).get('api_key')
-    if not api_url:
+    body = request.get_json(silent=True) or {}
+    if not ((url_row.value if url_row else None) or body.get('api_url')):
         return jsonify({"error": {"code": "bad_request", "message": "external_products_api_url not configured"}}), 400
-
-    headers = {"Accept": "application/json"}
-    if api_key:
-        headers["Authorization"] = f"Bearer {api_key}"
-    try:
-        resp = requests.get(api_url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        if not isinstance(data, list):
-            return jsonify({"error": {"code": "bad_response", "message": "expected JSON array"}}), 502
-    except Exception as e:
-        return jsonify({"error": {"code": "upstream_error", "message": str(e)}}), 502
-
-    created = 0
-    updated = 0
-    for item in data:
-        if not isinstance(item, dict):
-            continue
-        sku = item.get('sku')
-        name = (item.get('name') or '').strip()
-        if not name and not sku:
-            continue
-        q = db.session.query(Product).filter(Product.tenant_id==g.tenant_id)
-        if sku:
-            q = q.filter(Product.sku==sku)
-        else:
-            q = q.filter(Product.name==name)
-        p = q.first()
-        if not p:
-            p = Product(tenant_id=g.tenant_id)
-            created += 1
-        else:
-            updated += 1
-        p.sku = sku
-        p.name = name or p.name
-        p.description = item.get('description')
-        try:
-            p.price = Decimal(str(item.get('price') or 0))
-        except Exception:
-            p.price = Decimal('0')
-        p.currency = item.get('currency') or 'CNY'
-        p.image_url = item.get('image_url')
-        try:
-            p.stock = int(item.get('stock') or 0)
-        except Exception:
-            p.stock = 0
-        p.is_active = bool(item.get('is_active', True))
-        tags = item.get('tags')
-        if isinstance(tags, str):
-            # allow comma-separated
-            tags = [t.strip() for t in tags.split(',') if t.strip()]
-        p.tags = tags if isinstance(tags, list) else []
-        db.session.add(p)
-    db.session.commit()
-    return jsonify({"ok": True, "created": created, "updated": updated})
+    payload = {k: body[k] for k in ('api_url', 'api_key') if body.get(k)}
+    return _accepted(enqueue(g.tenant_id, "products.sync_external", payload))
 
 
 @bp.get("/admin/products/export")
@@ -337,42 +379,10 @@ def admin_export_products():
 
 @bp.post("/admin/products/import-csv")
 def admin_import_products_csv():
-    from io import StringIO
-    import csv
     raw = request.get_data(as_text=True)
     if not raw:
         return jsonify({"error": {"code": "bad_request", "message": "empty body"}}), 400
-    reader = csv.DictReader(StringIO(raw))
-    created = updated = 0
-    for row in reader:
-        sku = (row.get('sku') or '').strip() or None
-        name = (row.get('name') or '').strip()
-        if not (sku or name):
-            continue
-        q = db.session.query(Product).filter(Product.tenant_id == g.tenant_id)
-        if sku: q = q.filter(Product.sku == sku)
-        else: q = q.filter(Product.name == name)
-        p = q.first()
-        if not p:
-            p = Product(tenant_id=g.tenant_id)
-            created += 1
-        else:
-            updated += 1
-        p.sku = sku
-        p.name = name or p.name
-        p.description = row.get('description')
-        try: p.price = Decimal(str(row.get('price') or 0))
-        except Exception: p.price = Decimal('0')
-        p.currency = row.get('currency') or 'CNY'
-        p.image_url = row.get('image_url')
-        try: p.stock = int(row.get('stock') or 0)
-        except Exception: p.stock = 0
-        p.is_active = str(row.get('is_active') or '1') in ('1','true','True')
-        tags_raw = row.get('tags')
-        if tags_raw: p.tags = [t.strip() for t in tags_raw.split(',') if t.strip()]
-        db.session.add(p)
-    db.session.commit()
-    return jsonify({"ok": True, "created": created, "updated": updated})
+    return _accepted(enqueue(g.tenant_id, "products.import_csv", {"csv": raw}))
 
 
 @bp.get("/keyword-rules/export")
@@ -387,40 +397,34 @@ def export_rules():
     )
     out = StringIO()
     writer = csv.writer(out)
-    writer.writerow(["id","trigger_text","match_type","priority","product_ids","response_text","is_active"]) 
+    writer.writerow(["id","trigger_text","match_type","locale","priority","product_ids","response_text","is_active"]) 
     for r in items:
-        writer.writerow([r.id, r.trigger_text, r.match_type, r.priority, ','.join([str(x) for x in (r.product_ids or [])]), r.response_text or '', 1 if r.is_active else 0])
+        writer.writerow([r.id, r.trigger_text, r.match_type, r.locale or '', r.priority, ','.join([str(x) for x in (r.product_ids or [])]), r.response_text or '', 1 if r.is_active else 0])
     return (out.getvalue(), 200, {"Content-Type": "text/csv; charset=utf-8", "Content-Disposition": "attachment; filename=keyword_rules.csv"})
 
 
 @bp.post("/keyword-rules/import-csv")
 def import_rules_csv():
-    from io import StringIO
-    import csv
     raw = request.get_data(as_text=True)
     if not raw:
         return jsonify({"error": {"code": "bad_request", "message": "empty body"}}), 400
-    reader = csv.DictReader(StringIO(raw))
-    created = updated = 0
-    for row in reader:
-        trig = (row.get('trigger_text') or '').strip()
-        if not trig:
-            continue
-        r = db.session.query(KeywordRule).filter(KeywordRule.tenant_id == g.tenant_id, KeywordRule.trigger_text == trig).first()
-        if not r:
-            r = KeywordRule(tenant_id=g.tenant_id)
-            created += 1
-        else:
-            updated += 1
-        r.trigger_text = trig
-        r.match_type = (row.get('match_type') or 'contains')
-        try: r.priority = int(row.get('priority') or 0)
-        except Exception: r.priority = 0
-        pids = (row.get('product_ids') or '').strip()
-        r.product_ids = [int(x) for x in pids.split(',') if x.strip().isdigit()] if pids else []
-        r.response_text = row.get('response_text') or None
-        r.is_active = str(row.get('is_active') or '1') in ('1','true','True')
-        db.session.add(r)
-    db.session.commit()
-    # invalidate settings cache is unnecessary here
-    return jsonify({"ok": True, "created": created, "updated": updated})
+    return _accepted(enqueue(g.tenant_id, "rules.import_csv", {"csv": raw}))
+
+
+@bp.get("/analytics")
+def get_analytics():
+    """Pre-aggregated chat counters (see services/analytics.py).
+
+    Query: hours (default 168), kind=query,rule,zero (comma separated), top (<=200).
+    Returns {"bucket_seconds", "from", "to", "kinds": {kind: {"total", "buckets", "top"}}}.
+    """
+    max_hours = current_app.config.get("ANALYTICS_RETENTION_DAYS", 90) * 24
+    try:
+        hours = max(1, min(int(request.args.get("hours", 168)), max_hours))
+        top = max(1, min(int(request.args.get("top", 20)), 200))
+    except (TypeError, ValueError):
+        return jsonify({"error": {"code": "bad_request", "message": "invalid hours/top"}}), 400
+    kinds = [k for k in (request.args.get("kind") or ",".join(analytics.KINDS)).split(",") if k]
+    if not kinds or any(k not in analytics.KINDS for k in kinds):
+        return jsonify({"error": {"code": "bad_request", "message": "kind must be query, rule or zero"}}), 400
+    return jsonify(analytics.report(g.tenant_id, hours, kinds=kinds, top=top))
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+from datetime import datetime
 from decimal import Decimal
 from flask import Blueprint, jsonify, request, g
 
 from ..auth import require_api_key
 from ..extensions import db
+from ..idempotency import idempotent
 from ..models import Cart, CartItem, Conversation, Product
 from ..ratelimit import check_rate_limit
+from ..services import popularity
+from ..services.cooccurrence import also_bought
 
 bp = Blueprint("cart", __name__)
 
@@ -18,6 +22,7 @@ def _auth():
 
 
 @bp.post("/cart/items")
+@idempotent("cart")
 def add_item():
     rl = check_rate_limit(scope="cart", rpm=getattr(g, "rate_limit_rpm", None))
     if rl.remaining <= 0:
@@ -65,8 +70,11 @@ def add_item():
             unit_price=Decimal(product.price)
         )
         db.session.add(item)
+    # item changes don't touch the cart row; retention measures idleness from here
+    cart.updated_at = datetime.utcnow()
 
     db.session.commit()
+    popularity.record(g.tenant_id, [product.id], popularity.CART_ADD)
 
     # snapshot
     items = (
@@ -74,7 +82,8 @@ def add_item():
         .filter(CartItem.cart_id == cart.id)
         .all()
     )
-    total = sum([float(i.unit_price) * i.quantity for i in items])
+    total = sum((i.unit_price * i.quantity for i in items), Decimal(0))
+    extra = also_bought(g.tenant_id, [product.id], exclude=[i.product_id for i in items])
     return jsonify({
         "cart_id": cart.id,
         "status": cart.status,
@@ -83,10 +92,18 @@ def add_item():
                 "product_id": i.product_id,
                 "name": i.product.name,
                 "quantity": i.quantity,
-                "unit_price": float(i.unit_price),
+                "unit_price": i.unit_price,
                 "currency": i.product.currency,
             } for i in items
         ],
         "total": {"value": total, "currency": cart.currency},
+        "also_bought": [
+            {
+                "id": p.id,
+                "name": p.name,
+                "image_url": p.image_url,
+                "price": {"value": p.price, "currency": p.currency},
+            } for p in extra
+        ],
     })
 
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, Response, current_app, jsonify, request, g, stream_with_context
 
+from .. import metrics
 from ..auth import require_api_key
 from ..extensions import db
+from ..idempotency import idempotent
 from ..models import Conversation, Message
 from ..ratelimit import check_rate_limit
-from ..services.recommendation import recommend
-from ..models import Setting, Conversation
+from ..pagination import CursorError, decode_cursor, encode_cursor, page_limit
+from ..services import analytics, history, popularity
+from ..services.cooccurrence import also_bought
+from ..services.recommendation import iter_recommend, recommend
+from ..services.settings import tenant_settings
+from ..services.snapshot import get_snapshot, load_products
+from ..services.textnorm import fold
 
 bp = Blueprint("chat", __name__)
 
+FALLBACK_REPLY = "暫時沒有找到相關商品，試試輸入：藍牙耳機、耳機、充電器。"
+
 
 @bp.before_request
 def _auth():
@@ -18,73 +27,268 @@ def _auth():
         require_api_key()
 
 
+def _conversation_token(data=None):
+    token = (data or {}).get("conversation_token")
+    return token if isinstance(token, str) else request.headers.get("X-Conversation-Token")
+
+
+def _get_or_create_conversation(conversation_id, token):
+    """Continue a conversation with its token, or start one when no id is given.
+
+    Returns (conversation, None) or (None, error response). A conversation_id
+    without a token is a 400 and a wrong token a 403, rather than a silent new
+    conversation, so callers that predate tokens find out.
+    """
+    convo = None
+    try:
+        cid = int(conversation_id) if conversation_id else None
+    except (TypeError, ValueError):
+        cid = None
+    if cid:
+        if not token:
+            return None, (jsonify({"error": {"code": "conversation_token_required", "message": "conversation_token is required to continue a conversation"}}), 400)
+        if not history.check_token(g.tenant_id, cid, token):
+            return None, (jsonify({"error": {"code": "invalid_conversation_token", "message": "conversation_token does not match conversation_id"}}), 403)
+        convo = db.session.query(Conversation).filter(Conversation.id == cid, Conversation.tenant_id == g.tenant_id).first()
+    if not convo:
+        convo = Conversation(tenant_id=g.tenant_id)
+        db.session.add(convo)
+        db.session.flush()
+    return convo, None
+
+
+def _default_reply(has_products: bool) -> str:
+    # If有商品但無規則文案，用固定提示；若無商品，使用可配置的預設回覆
+    if has_products:
+        return "为你找到以下商品："
+    value = tenant_settings(g.tenant_id).get('default_reply_text')
+    return (value if isinstance(value, str) else None) or FALLBACK_REPLY
+
+
+def _product_card(p):
+    return {
+        "id": p.id,
+        "name": p.name,
+        "image_url": p.image_url,
+        "price": {"value": p.price, "currency": p.currency},
+        "tags": p.tags or [],
+        "add_to_cart": {"product_id": p.id, "default_qty": 1},
+    }
+
+
+def _read_message():
+    data = request.get_json(silent=True) or {}
+    message = (data.get("message") or "").strip()
+    return data, message
+
+
+def _read_locale(data):
+    locale = data.get("locale")
+    return locale if isinstance(locale, str) else None
+
+
 @bp.post("/chat/message")
+@idempotent("chat")
 def chat_message():
     rl = check_rate_limit(scope="chat", rpm=getattr(g, "rate_limit_rpm", None))
     if rl.remaining <= 0:
         return jsonify({"error": {"code": "rate_limited", "message": "Too many requests"}}), 429
 
-    data = request.get_json(silent=True) or {}
-    message = (data.get("message") or "").strip()
+    data, message = _read_message()
     if not message:
         return jsonify({"error": {"code": "bad_request", "message": "Message required"}}), 400
 
-    conversation_id = data.get("conversation_id")
-    convo = None
-    if conversation_id:
-        convo = db.session.query(Conversation).filter(Conversation.id == int(conversation_id), Conversation.tenant_id == g.tenant_id).first()
-    if not convo:
-        convo = Conversation(tenant_id=g.tenant_id)
-        db.session.add(convo)
-        db.session.flush()
+    convo, error = _get_or_create_conversation(data.get("conversation_id"), _conversation_token(data))
+    if error:
+        return error
 
     # store user message
     um = Message(conversation_id=convo.id, role='user', content=message)
     db.session.add(um)
 
-    resp_text, products = recommend(g.tenant_id, message, limit=5)
+    rule_ids = []
+    resp_text, products = recommend(g.tenant_id, message, limit=5, locale=_read_locale(data), rule_ids=rule_ids)
 
     messages = []
     # ensure there is at least one assistant text reply
     if not resp_text:
-        # If有商品但無規則文案，用固定提示；若無商品，使用可配置的預設回覆
-        if products:
-            resp_text = "为你找到以下商品："
-        else:
-            default_row = (
-                db.session.query(Setting).filter(Setting.tenant_id == g.tenant_id, Setting.key == 'default_reply_text').first()
-            )
-            default_reply = default_row.value if default_row and isinstance(default_row.value, str) else None
-            resp_text = default_reply or "暫時沒有找到相關商品，試試輸入：藍牙耳機、耳機、充電器。"
+        resp_text = _default_reply(bool(products))
     if resp_text:
         am = Message(conversation_id=convo.id, role='assistant', content=resp_text)
         db.session.add(am)
         messages.append({"role": "assistant", "type": "text", "content": resp_text})
 
-    db.session.commit()
+    with metrics.timed("commit"):
+        db.session.flush()
+        written = [um] + ([am] if resp_text else [])
+        tail_items = [history.serialize_message(m) for m in written]
+        db.session.commit()
+    history.append_tail(g.tenant_id, convo.id, tail_items)
+    popularity.record(g.tenant_id, [p.id for p in products], popularity.IMPRESSION)
+    analytics.record(g.tenant_id, message, rule_ids, len(products))
 
-    product_cards = [
-        {
-            "id": p.id,
-            "name": p.name,
-            "image_url": p.image_url,
-            "price": {"value": float(p.price), "currency": p.currency},
-            "tags": p.tags or [],
-            "add_to_cart": {"product_id": p.id, "default_qty": 1},
-        }
-        for p in products
-    ]
+    product_cards = [_product_card(p) for p in products]
+    extra = also_bought(g.tenant_id, [p.id for p in products])
 
     return jsonify({
         "conversation_id": convo.id,
+        "conversation_token": history.conversation_token(g.tenant_id, convo.id),
         "messages": messages,
         "products": product_cards,
+        "also_bought": [_product_card(p) for p in extra],
     })
 
 
+def _sse(event: str, data) -> str:
+    # same provider as jsonify, so Decimal prices serialize here too
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+@bp.post("/chat/message/stream")
+def chat_message_stream():
+    """Streaming variant of /chat/message (Server-Sent Events over POST).
+
+    Events, in order: `conversation` ({conversation_id, conversation_token}), `message` (assistant
+    text, as soon as a rule supplies it), one `product` per card as it
+    resolves, `also_bought` (list of cards, only when non-empty), then `done`. Persistence happens after the last card.
+    """
+    rl = check_rate_limit(scope="chat", rpm=getattr(g, "rate_limit_rpm", None))
+    if rl.remaining <= 0:
+        return jsonify({"error": {"code": "rate_limited", "message": "Too many requests"}}), 429
+
+    data, message = _read_message()
+    if not message:
+        return jsonify({"error": {"code": "bad_request", "message": "Message required"}}), 400
+
+    convo, error = _get_or_create_conversation(data.get("conversation_id"), _conversation_token(data))
+    if error:
+        return error
+    um = Message(conversation_id=convo.id, role='user', content=message)
+    db.session.add(um)
+    # commit up front so the conversation id can be sent in the first event
+    with metrics.timed("commit"):
+        db.session.flush()
+        convo_id = convo.id
+        tail_items = [history.serialize_message(um)]
+        db.session.commit()
+    tenant_id = g.tenant_id
+    history.append_tail(tenant_id, convo_id, tail_items)
+    locale = _read_locale(data)
+
+    def generate():
+        yield _sse("conversation", {"conversation_id": convo_id, "conversation_token": history.conversation_token(tenant_id, convo_id)})
+        resp_text = None
+        shown = []
+        rule_ids = []
+        try:
+            for kind, value in iter_recommend(tenant_id, message, limit=5, locale=locale):
+                if kind == "rules":
+                    rule_ids = value
+                elif kind == "text":
+                    resp_text = value
+                    yield _sse("message", {"role": "assistant", "type": "text", "content": resp_text})
+                else:
+                    shown.append(value.id)
+                    yield _sse("product", _product_card(value))
+            count = len(shown)
+            extra = also_bought(tenant_id, shown)
+            if extra:
+                yield _sse("also_bought", [_product_card(p) for p in extra])
+            if not resp_text:
+                resp_text = _default_reply(count > 0)
+                yield _sse("message", {"role": "assistant", "type": "text", "content": resp_text})
+            am = Message(conversation_id=convo_id, role='assistant', content=resp_text)
+            db.session.add(am)
+            with metrics.timed("commit"):
+                db.session.flush()
+                tail_items = [history.serialize_message(am)]
+                db.session.commit()
+            history.append_tail(tenant_id, convo_id, tail_items)
+            popularity.record(tenant_id, shown, popularity.IMPRESSION)
+            analytics.record(tenant_id, message, rule_ids, count)
+        except Exception:
+            db.session.rollback()
+            yield _sse("error", {"code": "server_error", "message": "Internal server error"})
+            return
+        yield _sse("done", {"conversation_id": convo_id, "products": count})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.post("/chat/evaluate-batch")
+def chat_evaluate_batch():
+    """Run many messages through the matcher without persisting anything.
+
+    Body: {"messages": ["...", ...] | [{"message": "...", "locale": "zh-TW"}, ...],
+    "locale": "zh-TW", "limit": 5, "include_products": true}; a per-item locale
+    overrides the batch one. All messages are matched against one snapshot
+    of the tenant's rules, synonyms and products; messages that fold to the
+    same text (case, width, Traditional/Simplified) are evaluated once and product rows are fetched in bulk at the end.
+    """
+    rl = check_rate_limit(scope="evaluate", rpm=getattr(g, "rate_limit_rpm", None))
+    if rl.remaining <= 0:
+        return jsonify({"error": {"code": "rate_limited", "message": "Too many requests"}}), 429
+
+    data = request.get_json(silent=True) or {}
+    items = data.get("messages")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": {"code": "bad_request", "message": "messages must be a non-empty array"}}), 400
+    cfg = current_app.config
+    per_minute = cfg.get("EVAL_BATCH_MESSAGES_PER_MINUTE", 20000)
+    max_messages = min(cfg.get("EVAL_BATCH_MAX_MESSAGES", 10000), per_minute)
+    if len(items) > max_messages:
+        return jsonify({"error": {"code": "bad_request", "message": f"at most {max_messages} messages per batch"}}), 400
+    # one request slot says nothing about a 10k-message batch: charge every message
+    rl = check_rate_limit(scope="evaluate_messages", rpm=per_minute, cost=len(items))
+    if rl.remaining <= 0:
+        return jsonify({"error": {"code": "rate_limited", "message": "Too many messages evaluated this minute"}}), 429
+    try:
+        limit = max(1, min(int(data.get("limit") or 5), 20))
+    except (TypeError, ValueError):
+        return jsonify({"error": {"code": "bad_request", "message": "invalid limit"}}), 400
+
+    snapshot = get_snapshot(g.tenant_id)
+    ranking = popularity.scores(g.tenant_id)
+    batch_locale = _read_locale(data)
+    memo = {}
+    results = []
+    for item in items:
+        text = item.get("message") if isinstance(item, dict) else item
+        text = (text or "").strip() if isinstance(text, str) else ""
+        locale = (_read_locale(item) if isinstance(item, dict) else None) or batch_locale
+        part = snapshot.for_locale(locale)
+        # partitions live as long as the snapshot; distinct ones never share answers
+        key = (id(part), fold(text))
+        ev = memo.get(key)
+        if ev is None:
+            ev = memo[key] = part.evaluate(text, limit=limit, ranking=ranking)
+        results.append({
+            "message": text,
+            "source": ev.source,
+            "rule_ids": ev.rule_ids,
+            "response_text": ev.response_text,
+            "product_ids": ev.product_ids,
+        })
+
+    payload = {
+        "count": len(results),
+        "unique_messages": len(memo),
+        "results": results,
+    }
+    if data.get("include_products", True):
+        all_ids = [pid for ev in memo.values() for pid in ev.product_ids]
+        rows = load_products(g.tenant_id, all_ids)
+        payload["products"] = {str(pid): _product_card(p) for pid, p in rows.items()}
+    return jsonify(payload)
+
+
 @bp.post("/chat/reset")
 def chat_reset():
-    """Close an existing conversation (if any).
+    """Close an existing conversation (if any; needs its conversation_token).
     Client should clear its local conversation state after this call.
     """
     data = request.get_json(silent=True) or {}
@@ -94,8 +298,48 @@ def chat_reset():
             cid = int(conversation_id)
         except Exception:
             return jsonify({"error": {"code": "bad_request", "message": "invalid conversation_id"}}), 400
+        if not history.check_token(g.tenant_id, cid, _conversation_token(data)):
+            return jsonify({"ok": True})
         convo = db.session.query(Conversation).filter(Conversation.id == cid, Conversation.tenant_id == g.tenant_id).first()
         if convo:
             convo.status = 'closed'
             db.session.commit()
+        history.invalidate_tail(g.tenant_id, [cid])
     return jsonify({"ok": True})
+
+
+@bp.get("/conversations/<int:conversation_id>/messages")
+def conversation_messages(conversation_id: int):
+    """Transcript, oldest first. Without `before` this is the newest page (from the
+    cached tail when possible); pass `next_cursor` back as `before` for older ones.
+
+    Requires the `X-Conversation-Token` header; a wrong token reads as 404.
+    """
+    if not history.check_token(g.tenant_id, conversation_id, request.headers.get("X-Conversation-Token")):
+        return jsonify({"error": {"code": "not_found", "message": "Conversation not found"}}), 404
+    limit = page_limit(default=20, maximum=100)
+    try:
+        before = decode_cursor(request.args.get("before"))
+    except CursorError:
+        return jsonify({"error": {"code": "bad_request", "message": "invalid cursor"}}), 400
+    if before is not None and not ("t" in before and "id" in before):
+        return jsonify({"error": {"code": "bad_request", "message": "invalid cursor"}}), 400
+
+    items = history.cached_page(g.tenant_id, conversation_id, limit) if before is None else None
+    if items is None:
+        owned = (
+            db.session.query(Conversation.id)
+            .filter(Conversation.id == conversation_id, Conversation.tenant_id == g.tenant_id)
+            .first()
+        )
+        if not owned:
+            return jsonify({"error": {"code": "not_found", "message": "Conversation not found"}}), 404
+        try:
+            items = history.page(g.tenant_id, conversation_id, limit, before)
+        except (TypeError, ValueError):
+            return jsonify({"error": {"code": "bad_request", "message": "invalid cursor"}}), 400
+
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor({"t": items[0]["created_at"], "id": items[0]["id"]})
+    return jsonify({"conversation_id": conversation_id, "items": items, "next_cursor": next_cursor})
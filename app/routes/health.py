@@ -1,9 +1,107 @@
-from flask import Blueprint, jsonify
+import hmac
+import time
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from sqlalchemy import text
+
+from .. import extensions, metrics, warmup
+from ..extensions import db
 
 bp = Blueprint("health", __name__)
 
 
 @bp.get("/health")
 def health():
-    return jsonify({"ok": True}), 200
+    return jsonify({"ok": True, "warm": warmup.state["done"]}), 200
+
+
+def _pool_stats():
+    pool = db.engine.pool
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            try:
+                stats[name] = fn()
+            except Exception:
+                pass
+    max_overflow = getattr(pool, "_max_overflow", None)
+    if "size" in stats and isinstance(max_overflow, int) and max_overflow >= 0:
+        stats["capacity"] = stats["size"] + max_overflow
+    return stats
+
+
+def _ping_db():
+    start = time.perf_counter()
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        return {"ok": False, "ms": round((time.perf_counter() - start) * 1000, 2), "error": e.__class__.__name__}
+
+
+def _ping_redis():
+    client = extensions.redis_client
+    if client is None:
+        return {"ok": not current_app.config.get("REDIS_URL"), "configured": bool(current_app.config.get("REDIS_URL"))}
+    start = time.perf_counter()
+    try:
+        client.ping()
+        return {"ok": True, "configured": True, "ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        return {"ok": False, "configured": True, "ms": round((time.perf_counter() - start) * 1000, 2), "error": e.__class__.__name__}
+
+
+@bp.get("/ready")
+def ready():
+    """Readiness for the load balancer: 503 takes this instance out of rotation.
+
+    Pool saturation and in-flight load are checked before pinging, so an
+    overloaded worker answers at once instead of queueing for a connection.
+    """
+    cfg = current_app.config
+    reasons = []
+    pool = _pool_stats()
+    inflight = max(0, metrics.inflight() - 1)  # not counting this request
+    body = {"pool": pool, "inflight": inflight, "warm": warmup.state}
+
+    max_inflight = cfg.get("READY_MAX_INFLIGHT", 0)
+    if max_inflight and inflight > max_inflight:
+        reasons.append("inflight")
+    capacity = pool.get("capacity")
+    if capacity and pool.get("checkedout", 0) >= capacity * cfg.get("READY_MAX_POOL_USAGE", 0.9):
+        reasons.append("db_pool")
+    else:
+        body["db"] = _ping_db()
+        if not body["db"]["ok"]:
+            reasons.append("db")
+        elif body["db"]["ms"] > cfg.get("READY_MAX_DB_MS", 500):
+            reasons.append("db_slow")
+    body["redis"] = _ping_redis()
+    if not body["redis"]["ok"]:
+        # the app degrades to per-process caches/limits without Redis
+        if cfg.get("READY_REQUIRE_REDIS"):
+            reasons.append("redis")
+    elif body["redis"].get("ms", 0) > cfg.get("READY_MAX_REDIS_MS", 200):
+        reasons.append("redis_slow")
+
+    body["ready"] = not reasons
+    if reasons:
+        body["reasons"] = reasons
+    resp = jsonify(body)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp, (200 if not reasons else 503)
+
 
+@bp.get("/metrics")
+def metrics_endpoint():
+    cfg = current_app.config
+    if not cfg.get("METRICS_ENABLED", True):
+        abort(404)
+    token = cfg.get("METRICS_TOKEN")
+    if token:
+        supplied = (request.headers.get("Authorization") or "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, token):
+            abort(401)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from flask import Blueprint, jsonify, request, g
+
+from ..auth import require_api_key
+from ..extensions import db
+from ..jobs import cancel, serialize_job
+from ..models import Job
+
+bp = Blueprint("jobs", __name__)
+
+
+@bp.before_request
+def _auth():
+    if request.method != 'OPTIONS':
+        require_api_key()
+
+
+def _get_job(job_id: int):
+    j = db.session.get(Job, job_id)
+    if not j or j.tenant_id != g.tenant_id:
+        return None
+    return j
+
+
+@bp.get("/jobs")
+def list_jobs():
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 100))
+    except (TypeError, ValueError):
+        limit = 20
+    q = db.session.query(Job).filter(Job.tenant_id == g.tenant_id)
+    if request.args.get("status"):
+        q = q.filter(Job.status == request.args["status"])
+    rows = q.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify({"items": [serialize_job(j) for j in rows]})
+
+
+@bp.get("/jobs/<int:job_id>")
+def get_job(job_id: int):
+    j = _get_job(job_id)
+    if not j:
+        return jsonify({"error": {"code": "not_found", "message": "job not found"}}), 404
+    return jsonify(serialize_job(j))
+
+
+@bp.post("/jobs/<int:job_id>/cancel")
+def cancel_job(job_id: int):
+    j = _get_job(job_id)
+    if not j:
+        return jsonify({"error": {"code": "not_found", "message": "job not found"}}), 404
+    return jsonify(serialize_job(cancel(j)))
@@ -49,7 +49,7 @@ def _product_payload(p: Product):
         "id": p.id,
         "name": p.name,
         "image_url": p.image_url,
-        "price": {"value": float(p.price), "currency": p.currency},
+        "price": {"value": p.price, "currency": p.currency},
         "tags": p.tags or [],
     }
 
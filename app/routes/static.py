@@ -1,20 +1,38 @@
 from __future__ import annotations
 
-import os
-from flask import Blueprint, send_from_directory, current_app
+from flask import Blueprint, abort, current_app, redirect
+
+from ..assets import get_asset, serve_asset
 
 bp = Blueprint("static_embed", __name__)
 
 
 @bp.get("/embed.js")
 def embed_js():
-    # Serve from project-level public/, not app/public
-    public_dir = os.path.abspath(os.path.join(current_app.root_path, os.pardir, "public"))
-    return send_from_directory(public_dir, "embed.js", mimetype="application/javascript")
+    # Customer sites reference this stable URL: short shared cache, then cheap 304 revalidation
+    asset = get_asset("embed.js")
+    if not asset:
+        abort(404)
+    max_age = current_app.config.get("EMBED_MAX_AGE", 300)
+    swr = current_app.config.get("EMBED_STALE_WHILE_REVALIDATE", 86400)
+    return serve_asset(asset, f"public, max-age={max_age}, stale-while-revalidate={swr}")
+
+
+@bp.get("/embed.<digest>.js")
+def embed_js_versioned(digest: str):
+    asset = get_asset("embed.js")
+    if not asset:
+        abort(404)
+    if digest != asset.digest:
+        # Superseded version: point at the current script rather than 404
+        return redirect("/embed.js", code=302)
+    return serve_asset(asset, "public, max-age=31536000, immutable")
 
 
 @bp.get("/admin")
 def admin_page():
     # Serve admin UI (index.html) from repo root so that backend+frontend can be same-origin on Render
-    root_dir = os.path.abspath(os.path.join(current_app.root_path, os.pardir))
-    return send_from_directory(root_dir, "index.html", mimetype="text/html")
+    asset = get_asset("index.html")
+    if not asset:
+        abort(404)
+    return serve_asset(asset, "no-cache")
@@ -0,0 +1,188 @@
+"""Pre-aggregated chat analytics: counters per tenant and time bucket.
+
+Three kinds are counted on the chat path:
+
+- ``query``  folded query text -> times asked
+- ``rule``   KeywordRule.id -> times matched
+- ``zero``   folded query text -> times answered without any product
+
+With Redis each (tenant, kind, bucket) is a hash `cb:an:<tenant>:<kind>:<bucket>`
+(HINCRBY, expiring after ANALYTICS_RETENTION_DAYS). Without it counts are
+buffered in-process and merged into `analytics_rollup` every
+ANALYTICS_FLUSH_SECONDS by a background thread (and at exit). Reports read one hash (or one index range) per
+bucket; nothing here reads `messages`.
+"""
+from __future__ import annotations
+
+import calendar
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from .. import extensions
+from ..extensions import db
+from ..models import AnalyticsRollup
+from .counters import add_upsert, start_flusher
+from .textnorm import fold
+
+KINDS = ("query", "rule", "zero")
+KEY_MAX = 128
+
+_lock = threading.Lock()
+# (tenant_id, kind, bucket, key) -> pending count, used when Redis is not configured
+_pending: Dict[Tuple[int, str, int, str], int] = defaultdict(int)
+
+
+def _hkey(tenant_id: int, kind: str, bucket: int) -> str:
+    return f"cb:an:{tenant_id}:{kind}:{bucket}"
+
+
+def bucket_seconds() -> int:
+    return max(60, int(current_app.config.get("ANALYTICS_BUCKET_SECONDS", 3600)))
+
+
+def bucket_of(ts: float, size: int) -> int:
+    return int(ts) // size * size
+
+
+def query_key(text: str) -> str:
+    """Fold case/width/script and collapse whitespace so variants count together."""
+    return " ".join(fold(text).split())[:KEY_MAX]
+
+
+def record(tenant_id: int, text: str, rule_ids: Iterable[int], product_count: int) -> None:
+    """Count one chat query. Never raises; analytics are best effort."""
+    cfg = current_app.config
+    if not cfg.get("ANALYTICS_ENABLED", True):
+        return
+    q = query_key(text)
+    if not q:
+        return
+    bucket = bucket_of(time.time(), bucket_seconds())
+    incs: List[Tuple[str, str]] = [("query", q)]
+    incs.extend(("rule", str(int(rid))) for rid in dict.fromkeys(rule_ids))
+    if product_count == 0:
+        incs.append(("zero", q))
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            ttl = int(cfg.get("ANALYTICS_RETENTION_DAYS", 90)) * 86400
+            pipe = r.pipeline(transaction=False)
+            for kind, key in incs:
+                pipe.hincrby(_hkey(tenant_id, kind, bucket), key, 1)
+            for kind in {kind for kind, _ in incs}:
+                pipe.expire(_hkey(tenant_id, kind, bucket), ttl)
+            pipe.execute()
+            return
+        except Exception:
+            pass
+    with _lock:
+        for kind, key in incs:
+            _pending[(tenant_id, kind, bucket, key)] += 1
+    start_flusher("analytics", flush, cfg.get("ANALYTICS_FLUSH_SECONDS", 30))
+
+
+def flush() -> int:
+    """Merge buffered counts into analytics_rollup with one upsert per chunk, in one transaction."""
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+    rows = [
+        {"tenant_id": tid, "kind": kind, "bucket_start": datetime.utcfromtimestamp(bucket), "key": key, "count": d}
+        for (tid, kind, bucket, key), d in batch.items()
+    ]
+    try:
+        # own connection: independent of whatever the request session holds
+        with db.engine.begin() as conn:
+            add_upsert(conn, AnalyticsRollup.__table__, rows, keys=("tenant_id", "kind", "bucket_start", "key"), add=("count",))
+    except Exception:
+        # keep the counts for the next attempt rather than dropping them
+        with _lock:
+            for k, d in batch.items():
+                _pending[k] += d
+        return 0
+    return len(batch)
+
+
+def _read(tenant_id: int, kind: str, buckets: List[int]) -> Dict[int, Dict[str, int]]:
+    """bucket -> {key: count} for the given buckets."""
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for b in buckets:
+                pipe.hgetall(_hkey(tenant_id, kind, b))
+            out: Dict[int, Dict[str, int]] = {}
+            for b, raw in zip(buckets, pipe.execute()):
+                if raw:
+                    out[b] = {
+                        (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()
+                    }
+            return out
+        except Exception:
+            pass
+    rows = (
+        db.session.query(AnalyticsRollup.bucket_start, AnalyticsRollup.key, AnalyticsRollup.count)
+        .filter(
+            AnalyticsRollup.tenant_id == tenant_id,
+            AnalyticsRollup.kind == kind,
+            AnalyticsRollup.bucket_start >= datetime.utcfromtimestamp(buckets[0]),
+            AnalyticsRollup.bucket_start <= datetime.utcfromtimestamp(buckets[-1]),
+        )
+    )
+    out = defaultdict(dict)
+    for start, key, count in rows:
+        out[calendar.timegm(start.utctimetuple())][key] = int(count)
+    return dict(out)
+
+
+def report(tenant_id: int, hours: int, kinds: Iterable[str] = KINDS, top: int = 20, now: Optional[float] = None) -> Dict:
+    """Per-bucket totals and the top keys of each kind over the last `hours`."""
+    size = bucket_seconds()
+    last = bucket_of(now if now is not None else time.time(), size)
+    first = bucket_of(last - hours * 3600 + size, size)
+    buckets = list(range(first, last + 1, size))
+    payload: Dict = {
+        "bucket_seconds": size,
+        "from": datetime.utcfromtimestamp(first).isoformat() + "Z",
+        "to": datetime.utcfromtimestamp(last + size).isoformat() + "Z",
+        "kinds": {},
+    }
+    for kind in kinds:
+        per_bucket = _read(tenant_id, kind, buckets)
+        totals: Dict[str, int] = defaultdict(int)
+        series = []
+        for b in buckets:
+            counts = per_bucket.get(b) or {}
+            for key, n in counts.items():
+                totals[key] += n
+            series.append({"t": datetime.utcfromtimestamp(b).isoformat() + "Z", "count": sum(counts.values())})
+        ranked = sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))[:top]
+        payload["kinds"][kind] = {
+            "total": sum(totals.values()),
+            "buckets": series,
+            "top": [
+                {"rule_id": int(k), "count": n} if kind == "rule" else {"key": k, "count": n}
+                for k, n in ranked
+            ],
+        }
+    return payload
+
+
+def prune(tenant_id: int, now: Optional[datetime] = None) -> int:
+    """Drop rollup rows older than ANALYTICS_RETENTION_DAYS (Redis hashes expire on their own)."""
+    days = int(current_app.config.get("ANALYTICS_RETENTION_DAYS", 90))
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    n = (
+        db.session.query(AnalyticsRollup)
+        .filter(AnalyticsRollup.tenant_id == tenant_id, AnalyticsRollup.bucket_start < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.session.commit()
+    return n
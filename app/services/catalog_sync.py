@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..extensions import db
+from ..models import Product, SyncState
+from ..versions import bump_tenant_version
+
+_http: Optional[requests.Session] = None
+
+
+def http_session() -> requests.Session:
+    """Process-wide session: keep-alive connections are reused across pages and syncs."""
+    global _http
+    if _http is None:
+        cfg = current_app.config
+        s = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=cfg.get("CATALOG_SYNC_POOL_SIZE", 8), max_retries=retry)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        s.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+        _http = s
+    return _http
+
+
+@dataclass
+class Page:
+    url: str
+    items: Optional[List[Any]]  # None when the upstream answered 304
+    next_url: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass
+class SyncResult:
+    pages: int = 0
+    pages_not_modified: int = 0
+    fetched: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.created + self.updated
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def _url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _get_state(tenant_id: int, url: str) -> Optional[SyncState]:
+    return (
+        db.session.query(SyncState)
+        .filter(SyncState.tenant_id == tenant_id, SyncState.url_hash == _url_hash(url))
+        .first()
+    )
+
+
+def _save_state(tenant_id: int, page: Page) -> None:
+    st = _get_state(tenant_id, page.url)
+    if st is None:
+        st = SyncState(tenant_id=tenant_id, url_hash=_url_hash(page.url), url=page.url)
+        db.session.add(st)
+    st.etag = page.etag
+    st.last_modified = page.last_modified
+    st.next_url = page.next_url
+
+
+def reset_validators(tenant_id: int) -> None:
+    """Forget the tenant's page validators (caller commits).
+
+    Called wherever a local edit clears Product.content_hash: the next sync
+    must fetch every page in full, or a 304 would skip the edited row.
+    """
+    db.session.query(SyncState).filter(SyncState.tenant_id == tenant_id).update(
+        {SyncState.etag: None, SyncState.last_modified: None}, synchronize_session=False
+    )
+
+
+def _split_body(data: Any) -> Tuple[Optional[List[Any]], Optional[str]]:
+    """Accept a bare array, or {"items"|"data"|"products": [...], "next"|"next_url"|"links.next": url}."""
+    if isinstance(data, list):
+        return data, None
+    if not isinstance(data, dict):
+        return None, None
+    items = next((data[k] for k in ("items", "data", "products") if isinstance(data.get(k), list)), None)
+    nxt = data.get("next") or data.get("next_url")
+    links = data.get("links")
+    if not nxt and isinstance(links, dict):
+        nxt = links.get("next")
+    return items, nxt if isinstance(nxt, str) else None
+
+
+def iter_pages(tenant_id: int, start_url: str, api_key: Optional[str] = None) -> Iterator[Page]:
+    """Walk an upstream catalog page by page with conditional requests.
+
+    Next pages come from the `Link: <...>; rel="next"` header or the body. A
+    page answering 304 is skipped without a body; its remembered next link keeps
+    the walk going.
+    """
+    cfg = current_app.config
+    timeout = (cfg.get("CATALOG_SYNC_CONNECT_TIMEOUT", 5), cfg.get("CATALOG_SYNC_READ_TIMEOUT", 30))
+    max_pages = cfg.get("CATALOG_SYNC_MAX_PAGES", 10000)
+    session = http_session()
+    auth = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    url: Optional[str] = start_url
+    visited = set()
+    while url and url not in visited and len(visited) < max_pages:
+        visited.add(url)
+        headers = dict(auth)
+        st = _get_state(tenant_id, url)
+        if st is not None:
+            if st.etag:
+                headers["If-None-Match"] = st.etag
+            if st.last_modified:
+                headers["If-Modified-Since"] = st.last_modified
+        resp = session.get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 304:
+            if st is not None and (st.etag or st.last_modified):
+                yield Page(url=url, items=None, next_url=st.next_url, etag=st.etag, last_modified=st.last_modified)
+                url = st.next_url
+                continue
+            # 304 to validators we don't hold (state missing or reset): nothing
+            # to fall back on, so ask again unconditionally
+            resp = session.get(url, headers=dict(auth), timeout=timeout)
+            if resp.status_code == 304:
+                raise ValueError(f"upstream answered 304 to an unconditional request: {url}")
+        resp.raise_for_status()
+        items, body_next = _split_body(resp.json())
+        if items is None:
+            raise ValueError("expected a JSON array or an object with an items array")
+        nxt = (resp.links.get("next") or {}).get("url") or body_next
+        nxt = urljoin(url, nxt) if nxt else None
+        yield Page(
+            url=url,
+            items=items,
+            next_url=nxt,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+        )
+        url = nxt
+
+
+def _clean(item: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(item, dict):
+        return None
+    sku = item.get('sku') or None
+    name = (item.get('name') or '').strip()
+    if not name and not sku:
+        return None
+    try:
+        price = str(Decimal(str(item.get('price') or 0)).quantize(Decimal('0.01')))
+    except Exception:
+        price = '0.00'
+    try:
+        stock = int(item.get('stock') or 0)
+    except Exception:
+        stock = 0
+    tags = item.get('tags')
+    if isinstance(tags, str):
+        # allow comma-separated
+        tags = [t.strip() for t in tags.split(',') if t.strip()]
+    return {
+        "sku": str(sku) if sku is not None else None,
+        "name": name or str(sku),
+        "description": item.get('description'),
+        "price": price,
+        "currency": item.get('currency') or 'CNY',
+        "image_url": item.get('image_url'),
+        "stock": stock,
+        "is_active": bool(item.get('is_active', True)),
+        "tags": tags if isinstance(tags, list) else [],
+    }
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(row, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _existing(tenant_id: int, rows: List[Dict[str, Any]]) -> Tuple[Dict[str, Product], Dict[str, Product]]:
+    skus = list({r["sku"] for r in rows if r["sku"]})
+    names = list({r["name"] for r in rows if not r["sku"]})
+    by_sku: Dict[str, Product] = {}
+    by_name: Dict[str, Product] = {}
+    for i in range(0, len(skus), 500):
+        for p in db.session.query(Product).filter(Product.tenant_id == tenant_id, Product.sku.in_(skus[i:i + 500])):
+            by_sku[p.sku] = p
+    for i in range(0, len(names), 500):
+        for p in db.session.query(Product).filter(Product.tenant_id == tenant_id, Product.name.in_(names[i:i + 500])):
+            by_name.setdefault(p.name, p)
+    return by_sku, by_name
+
+
+def upsert_items(tenant_id: int, items: List[Any], result: SyncResult) -> None:
+    """Insert new products and rewrite only those whose content hash changed (2 lookups per page)."""
+    rows = []
+    for item in items:
+        row = _clean(item)
+        if row is None:
+            result.skipped += 1
+        else:
+            rows.append(row)
+    by_sku, by_name = _existing(tenant_id, rows)
+    for row in rows:
+        h = content_hash(row)
+        p = by_sku.get(row["sku"]) if row["sku"] else by_name.get(row["name"])
+        if p is not None and p.content_hash == h:
+            result.unchanged += 1
+            continue
+        if p is None:
+            p = Product(tenant_id=tenant_id)
+            db.session.add(p)
+            result.created += 1
+            # duplicates later in the same page update this row instead of inserting again
+            if row["sku"]:
+                by_sku[row["sku"]] = p
+            else:
+                by_name[row["name"]] = p
+        else:
+            result.updated += 1
+        for k, v in row.items():
+            setattr(p, k, Decimal(v) if k == "price" else v)
+        p.content_hash = h
+
+
+def sync_catalog(
+    tenant_id: int,
+    api_url: str,
+    api_key: Optional[str] = None,
+    on_page: Optional[Callable[[SyncResult], None]] = None,
+) -> SyncResult:
+    """Pull the upstream catalog into `products`, committing page by page.
+
+    A page's validators are saved in the same transaction as its rows, so a
+    failed run resumes with conditional requests for the pages already applied.
+    The tenant version is bumped whenever a committed page changed rows, also
+    when the run fails or is cancelled part way: the resumed run sees those
+    pages as 304 and would otherwise never publish them.
+    """
+    result = SyncResult()
+    published = 0  # result.changed as of the last committed page
+    try:
+        for page in iter_pages(tenant_id, api_url, api_key):
+            result.pages += 1
+            if page.items is None:
+                result.pages_not_modified += 1
+            else:
+                result.fetched += len(page.items)
+                upsert_items(tenant_id, page.items, result)
+                _save_state(tenant_id, page)
+                db.session.commit()
+                published = result.changed
+            if on_page:
+                on_page(result)
+    finally:
+        if published:
+            db.session.rollback()  # a half-applied page, if the run stopped in one
+            bump_tenant_version(tenant_id)
+    return result
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from itertools import permutations
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from ..cache import get as cache_get, set as cache_set, delete as cache_delete
+from ..extensions import db
+from ..models import Cart, CartItem, Product, ProductNeighbors, ProductPair, RecoState, Tenant
+from .recommendation import fetch_products_by_ids
+
+# Carts larger than this are bulk orders, not baskets; they would add O(n^2) noise.
+MAX_BASKET = 50
+
+
+def _chunks(items: List, size: int = 500) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _pair_deltas(tenant_id: int, watermark: int, batch_size: int) -> Tuple[Dict[int, Counter], int, int]:
+    """Sparse increment of the co-occurrence matrix from cart items past the watermark.
+
+    For every cart touched since the last run, pairs among all of its items minus
+    pairs among the items already counted: C += B_all^T B_all - B_old^T B_old,
+    restricted to the affected carts.
+    Returns ({product: Counter(other: +n)}, new watermark, items consumed).
+    """
+    new_rows = (
+        db.session.query(CartItem.id, CartItem.cart_id)
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .filter(Cart.tenant_id == tenant_id, CartItem.id > watermark)
+        .order_by(CartItem.id.asc())
+        .limit(batch_size)
+        .all()
+    )
+    if not new_rows:
+        return {}, watermark, 0
+    high = new_rows[-1][0]
+    cart_ids = sorted({cid for _, cid in new_rows})
+
+    baskets: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for chunk in _chunks(cart_ids):
+        rows = (
+            db.session.query(CartItem.id, CartItem.cart_id, CartItem.product_id)
+            .filter(CartItem.cart_id.in_(chunk), CartItem.id <= high)
+            .all()
+        )
+        for item_id, cid, pid in rows:
+            baskets[cid].append((item_id, pid))
+
+    deltas: Dict[int, Counter] = defaultdict(Counter)
+    for items in baskets.values():
+        if len(items) < 2 or len(items) > MAX_BASKET:
+            continue
+        old = {pid for item_id, pid in items if item_id <= watermark}
+        for a, b in permutations({pid for _, pid in items}, 2):
+            if a in old and b in old:
+                continue
+            deltas[a][b] += 1
+    return deltas, high, len(new_rows)
+
+
+def _apply_deltas(tenant_id: int, deltas: Dict[int, Counter]) -> None:
+    for pid, others in deltas.items():
+        existing = {
+            p.other_id: p
+            for p in db.session.query(ProductPair).filter(
+                ProductPair.tenant_id == tenant_id,
+                ProductPair.product_id == pid,
+                ProductPair.other_id.in_(list(others)),
+            )
+        }
+        for oid, n in others.items():
+            row = existing.get(oid)
+            if row:
+                row.count += n
+            else:
+                db.session.add(ProductPair(tenant_id=tenant_id, product_id=pid, other_id=oid, count=n))
+    db.session.flush()
+
+
+def _refresh_neighbors(tenant_id: int, product_ids: Iterable[int], top_k: int) -> None:
+    for pid in product_ids:
+        top = (
+            db.session.query(ProductPair.other_id, ProductPair.count)
+            .filter(ProductPair.tenant_id == tenant_id, ProductPair.product_id == pid)
+            .order_by(ProductPair.count.desc(), ProductPair.other_id.asc())
+            .limit(top_k)
+            .all()
+        )
+        row = db.session.get(ProductNeighbors, (tenant_id, pid))
+        if row is None:
+            row = ProductNeighbors(tenant_id=tenant_id, product_id=pid)
+            db.session.add(row)
+        row.neighbors = [[oid, cnt] for oid, cnt in top]
+
+
+def update_tenant(
+    tenant_id: int, batch_size: int = 5000, top_k: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Fold cart items added since the last run into product_pairs and neighbor lists.
+
+    Only carts with new items are read and only products in those carts get their
+    top-K recomputed. Each batch commits with its watermark, so an interrupted
+    run resumes where it stopped; `progress(consumed)` is called after every
+    batch commit (job heartbeat). Returns the number of cart items consumed.
+    """
+    top_k = top_k or current_app.config.get("COOCCURRENCE_TOP_K", 20)
+    state = db.session.get(RecoState, tenant_id)
+    if state is None:
+        state = RecoState(tenant_id=tenant_id, last_cart_item_id=0)
+        db.session.add(state)
+        db.session.flush()
+
+    consumed = 0
+    while True:
+        watermark = state.last_cart_item_id
+        deltas, high, n = _pair_deltas(tenant_id, watermark, batch_size)
+        if not n:
+            break
+        consumed += n
+        _apply_deltas(tenant_id, deltas)
+        _refresh_neighbors(tenant_id, deltas.keys(), top_k)
+        state.last_cart_item_id = high
+        db.session.commit()
+        for pid in deltas:
+            cache_delete("neighbors", f"{tenant_id}:{pid}")
+        if progress:
+            progress(consumed)
+    db.session.commit()
+    return consumed
+
+
+def rebuild_tenant(tenant_id: int, batch_size: int = 5000, progress: Optional[Callable[[int], None]] = None) -> int:
+    """Drop a tenant's counts and replay every cart item (e.g. after changing MAX_BASKET)."""
+    db.session.query(ProductPair).filter(ProductPair.tenant_id == tenant_id).delete(synchronize_session=False)
+    db.session.query(ProductNeighbors).filter(ProductNeighbors.tenant_id == tenant_id).delete(synchronize_session=False)
+    db.session.query(RecoState).filter(RecoState.tenant_id == tenant_id).delete(synchronize_session=False)
+    db.session.commit()
+    if progress:
+        progress(0)
+    return update_tenant(tenant_id, batch_size=batch_size, progress=progress)
+
+
+def update_all(batch_size: int = 5000, rebuild: bool = False) -> Dict[int, int]:
+    run = rebuild_tenant if rebuild else update_tenant
+    return {tid: run(tid, batch_size=batch_size) for (tid,) in db.session.query(Tenant.id).all()}
+
+
+def neighbors_of(tenant_id: int, product_id: int) -> List[List[int]]:
+    key = f"{tenant_id}:{product_id}"
+    cached = cache_get("neighbors", key)
+    if cached is not None:
+        return cached
+    row = db.session.get(ProductNeighbors, (tenant_id, product_id))
+    value = row.neighbors if row and isinstance(row.neighbors, list) else []
+    cache_set("neighbors", key, value, ttl_seconds=current_app.config.get("NEIGHBORS_CACHE_TTL", 600))
+    return value
+
+
+def also_bought(tenant_id: int, product_ids: List[int], limit: Optional[int] = None, exclude: Iterable[int] = ()) -> List[Product]:
+    """Products most often carted together with `product_ids`, best first.
+
+    One primary-key (or cache) lookup per seed product; scores are summed across seeds.
+    """
+    limit = current_app.config.get("ALSO_BOUGHT_LIMIT", 3) if limit is None else limit
+    if limit <= 0 or not product_ids:
+        return []
+    skip = set(product_ids) | set(exclude)
+    scores: Counter = Counter()
+    for pid in dict.fromkeys(product_ids):
+        for oid, cnt in neighbors_of(tenant_id, pid):
+            if oid not in skip:
+                scores[oid] += cnt
+    if not scores:
+        return []
+    ranked = [oid for oid, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0]))]
+    # over-fetch a little so inactive products don't leave the list short
+    return fetch_products_by_ids(tenant_id, ranked[: limit * 2], limit=limit * 2)[:limit]
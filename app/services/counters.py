@@ -0,0 +1,102 @@
+"""Helpers for counters buffered in-process and merged into a table.
+
+`start_flusher` runs a module's `flush` from a daemon thread every few seconds
+and once at interpreter exit, so buffered counts reach the database (or, for
+metrics, the per-worker snapshot file) even when no further request arrives.
+It is started lazily from the first buffered `record()` (or request) in each
+process, since threads do not survive gunicorn's fork.
+
+`add_upsert` merges a batch of deltas with one multi-row
+`INSERT .. ON CONFLICT/ON DUPLICATE KEY UPDATE col = col + new` per chunk, and
+falls back to UPDATE-then-INSERT per row on backends without an upsert.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from flask import current_app
+from sqlalchemy import Table, and_
+from sqlalchemy.engine import Connection
+
+CHUNK = 500
+
+_lock = threading.Lock()
+# flusher name -> pid that started it
+_started: Dict[str, int] = {}
+
+
+def start_flusher(name: str, flush: Callable[[], object], interval: float) -> None:
+    """Call `flush` every `interval` seconds and at exit; once per process and name.
+
+    Cheap to call on every request once started (one dict lookup).
+    """
+    pid = os.getpid()
+    if _started.get(name) == pid:
+        return
+    with _lock:
+        if _started.get(name) == pid:
+            return
+        _started[name] = pid
+    app = current_app._get_current_object()
+    interval = max(1.0, float(interval))
+
+    def run_once() -> None:
+        try:
+            with app.app_context():
+                flush()
+        except Exception:
+            app.logger.warning("%s flush failed", name, exc_info=True)
+
+    def loop() -> None:
+        while True:
+            time.sleep(interval)
+            run_once()
+
+    threading.Thread(target=loop, name=f"{name}-flush", daemon=True).start()
+    atexit.register(run_once)
+
+
+def add_upsert(
+    conn: Connection,
+    table: Table,
+    rows: List[dict],
+    keys: Sequence[str],
+    add: Sequence[str],
+    extra: Optional[dict] = None,
+) -> None:
+    """Insert `rows`, adding the `add` columns onto rows whose `keys` already exist.
+
+    `extra` holds further SET values for existing rows (e.g. updated_at). Keys
+    must be unique within `rows`, which a dict-keyed batch guarantees.
+    """
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        for i in range(0, len(rows), CHUNK):
+            stmt = insert(table).values(rows[i:i + CHUNK])
+            values = {c: table.c[c] + stmt.excluded[c] for c in add}
+            values.update(extra or {})
+            conn.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=values))
+        return
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        for i in range(0, len(rows), CHUNK):
+            stmt = insert(table).values(rows[i:i + CHUNK])
+            values = {c: table.c[c] + stmt.inserted[c] for c in add}
+            values.update(extra or {})
+            conn.execute(stmt.on_duplicate_key_update(values))
+        return
+    for row in rows:
+        where = and_(*(table.c[k] == row[k] for k in keys))
+        values = {c: table.c[c] + row[c] for c in add}
+        values.update(extra or {})
+        if conn.execute(table.update().where(where).values(values)).rowcount == 0:
+            conn.execute(table.insert().values(row))
@@ -0,0 +1,189 @@
+"""Conversation transcripts: keyset pages from `messages` plus a cached tail.
+
+The last MESSAGE_TAIL_SIZE messages of a conversation are kept in a small
+cache (a Redis list when configured, otherwise a bounded per-process dict)
+that chat writes append to, so reopening the widget usually reads no rows.
+Older pages seek on idx_msgs_conv (conversation_id, created_at) with id as
+the tie-breaker.
+
+Conversation ids are sequential and the widget key is public, so reading a
+transcript (or continuing / resetting a conversation) also needs the
+conversation token handed out when the conversation was created: an HMAC of
+tenant and id under SECRET_KEY, nothing stored.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from .. import extensions
+from ..extensions import db
+from ..models import Message
+
+_local: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+_local_lock = threading.Lock()
+_LOCAL_MAX = 10000
+
+
+def serialize_message(m: Message) -> Dict[str, Any]:
+    return {
+        "id": m.id,
+        "role": m.role,
+        "type": m.content_type or 'text',
+        "content": m.content,
+        "created_at": m.created_at.isoformat() if m.created_at else None,
+    }
+
+
+def conversation_token(tenant_id: int, conversation_id: int) -> str:
+    secret = str(current_app.config.get("SECRET_KEY") or "").encode("utf-8")
+    msg = f"conversation:{tenant_id}:{conversation_id}".encode("utf-8")
+    return hmac.new(secret, msg, hashlib.sha256).hexdigest()[:32]
+
+
+def check_token(tenant_id: int, conversation_id: int, token: Any) -> bool:
+    return isinstance(token, str) and hmac.compare_digest(token, conversation_token(tenant_id, conversation_id))
+
+
+def _key(tenant_id: int, conversation_id: int) -> str:
+    return f"cb:msgtail:{tenant_id}:{conversation_id}"
+
+
+def _tail_size() -> int:
+    return current_app.config.get("MESSAGE_TAIL_SIZE", 50)
+
+
+def _tail_ttl() -> int:
+    return current_app.config.get("MESSAGE_TAIL_TTL", 1800)
+
+
+def get_tail(tenant_id: int, conversation_id: int) -> Optional[List[Dict[str, Any]]]:
+    key = _key(tenant_id, conversation_id)
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            raw = r.lrange(key, 0, -1)
+            if raw:
+                return [json.loads(x) for x in raw]
+            return None
+        except Exception:
+            pass
+    with _local_lock:
+        item = _local.get(key)
+        if item is None or item[0] < time.time():
+            _local.pop(key, None)
+            return None
+        _local.move_to_end(key)
+        return list(item[1])
+
+
+def store_tail(tenant_id: int, conversation_id: int, items: List[Dict[str, Any]]) -> None:
+    key = _key(tenant_id, conversation_id)
+    items = items[-_tail_size():]
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.delete(key)
+            if items:
+                pipe.rpush(key, *[json.dumps(x, ensure_ascii=False) for x in items])
+                pipe.expire(key, _tail_ttl())
+            pipe.execute()
+            return
+        except Exception:
+            pass
+    with _local_lock:
+        _local[key] = (time.time() + _tail_ttl(), list(items))
+        _local.move_to_end(key)
+        while len(_local) > _LOCAL_MAX:
+            _local.popitem(last=False)
+
+
+def append_tail(tenant_id: int, conversation_id: int, items: List[Dict[str, Any]]) -> None:
+    """Push freshly written (serialized) messages onto a cached tail. A missing
+    tail stays missing; the next read loads it from the table."""
+    if not items:
+        return
+    key = _key(tenant_id, conversation_id)
+    size = _tail_size()
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.rpushx(key, *[json.dumps(x, ensure_ascii=False) for x in items])
+            pipe.ltrim(key, -size, -1)
+            pipe.execute()
+            return
+        except Exception:
+            pass
+    with _local_lock:
+        item = _local.get(key)
+        if item is not None:
+            _local[key] = (item[0], (item[1] + items)[-size:])
+
+
+def invalidate_tail(tenant_id: int, conversation_ids: List[int]) -> None:
+    """Drop cached tails (reset / deleted conversations). Other workers' local
+    tails only age out after MESSAGE_TAIL_TTL; Redis tails go immediately."""
+    keys = [_key(tenant_id, cid) for cid in conversation_ids]
+    if not keys:
+        return
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            r.delete(*keys)
+        except Exception:
+            pass
+    with _local_lock:
+        for key in keys:
+            _local.pop(key, None)
+
+
+def _cursor_filter(before: Dict[str, Any]):
+    t = datetime.fromisoformat(before["t"])
+    mid = int(before["id"])
+    return or_(Message.created_at < t, and_(Message.created_at == t, Message.id < mid))
+
+
+def load_page(conversation_id: int, limit: int, before: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Up to `limit` messages older than `before` (or the newest), oldest first."""
+    q = db.session.query(Message).filter(Message.conversation_id == conversation_id)
+    if before:
+        q = q.filter(_cursor_filter(before))
+    rows = q.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit).all()
+    return [serialize_message(m) for m in reversed(rows)]
+
+
+def page(tenant_id: int, conversation_id: int, limit: int, before: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Newest page comes from the tail cache when it is large enough."""
+    if before is None and limit <= _tail_size():
+        tail = get_tail(tenant_id, conversation_id)
+        if tail is None:
+            tail = load_page(conversation_id, _tail_size())
+            store_tail(tenant_id, conversation_id, tail)
+        return tail[-limit:]
+    return load_page(conversation_id, limit, before)
+
+
+def cached_page(tenant_id: int, conversation_id: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+    """Newest page straight from the tail, or None if the tail can't answer it.
+
+    A tail shorter than MESSAGE_TAIL_SIZE was never trimmed, so it is the whole
+    conversation. Tails are keyed by tenant and only written after an ownership
+    check, so a hit needs no lookup in `conversations`.
+    """
+    tail = get_tail(tenant_id, conversation_id)
+    if tail is None:
+        return None
+    if limit <= len(tail) or len(tail) < _tail_size():
+        return tail[-limit:]
+    return None
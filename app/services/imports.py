@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import csv
+from decimal import Decimal
+from io import StringIO
+from typing import Callable, Dict, Optional
+
+from ..extensions import db
+from ..models import KeywordRule, Product
+from .catalog_sync import reset_validators
+
+Progress = Optional[Callable[[int], None]]
+
+# rows per flush/progress tick; keeps the session small on large files
+BATCH = 500
+
+
+def import_products_csv(tenant_id: int, raw: str, progress: Progress = None) -> Dict[str, int]:
+    reader = csv.DictReader(StringIO(raw))
+    created = updated = 0
+    for n, row in enumerate(reader, 1):
+        sku = (row.get('sku') or '').strip() or None
+        name = (row.get('name') or '').strip()
+        if not (sku or name):
+            continue
+        q = db.session.query(Product).filter(Product.tenant_id == tenant_id)
+        if sku: q = q.filter(Product.sku == sku)
+        else: q = q.filter(Product.name == name)
+        p = q.first()
+        if not p:
+            p = Product(tenant_id=tenant_id)
+            created += 1
+        else:
+            updated += 1
+        p.sku = sku
+        p.name = name or p.name
+        p.description = row.get('description')
+        try: p.price = Decimal(str(row.get('price') or 0))
+        except Exception: p.price = Decimal('0')
+        p.currency = row.get('currency') or 'CNY'
+        p.image_url = row.get('image_url')
+        try: p.stock = int(row.get('stock') or 0)
+        except Exception: p.stock = 0
+        p.is_active = str(row.get('is_active') or '1') in ('1','true','True')
+        tags_raw = row.get('tags')
+        if tags_raw: p.tags = [t.strip() for t in tags_raw.split(',') if t.strip()]
+        p.content_hash = None
+        db.session.add(p)
+        if n % BATCH == 0:
+            db.session.flush()
+            if progress:
+                progress(n)
+    # rows now differ from what the catalog sync last wrote
+    reset_validators(tenant_id)
+    db.session.commit()
+    return {"created": created, "updated": updated}
+
+
+def import_rules_csv(tenant_id: int, raw: str, progress: Progress = None) -> Dict[str, int]:
+    reader = csv.DictReader(StringIO(raw))
+    created = updated = 0
+    for n, row in enumerate(reader, 1):
+        trig = (row.get('trigger_text') or '').strip()
+        if not trig:
+            continue
+        locale = (row.get('locale') or '').strip() or None
+        q = db.session.query(KeywordRule).filter(KeywordRule.tenant_id == tenant_id, KeywordRule.trigger_text == trig)
+        q = q.filter(KeywordRule.locale == locale) if locale else q.filter(KeywordRule.locale.is_(None))
+        r = q.first()
+        if not r:
+            r = KeywordRule(tenant_id=tenant_id, locale=locale)
+            created += 1
+        else:
+            updated += 1
+        r.trigger_text = trig
+        r.match_type = (row.get('match_type') or 'contains')
+        try: r.priority = int(row.get('priority') or 0)
+        except Exception: r.priority = 0
+        pids = (row.get('product_ids') or '').strip()
+        r.product_ids = [int(x) for x in pids.split(',') if x.strip().isdigit()] if pids else []
+        r.response_text = row.get('response_text') or None
+        r.is_active = str(row.get('is_active') or '1') in ('1','true','True')
+        db.session.add(r)
+        if n % BATCH == 0:
+            db.session.flush()
+            if progress:
+                progress(n)
+    db.session.commit()
+    return {"created": created, "updated": updated}
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from .. import extensions
+from ..extensions import db
+from ..models import Product, ProductPopularity
+from .counters import add_upsert, start_flusher
+
+# Event weights: a cart add says much more than being shown in a reply.
+IMPRESSION = 1.0
+CART_ADD = 5.0
+
+_lock = threading.Lock()
+# (tenant_id, product_id) -> pending score delta, used when Redis is not configured
+_pending: Dict[Tuple[int, int], float] = defaultdict(float)
+# tenant_id -> (expires_at, {product_id: score})
+_ranks: Dict[int, Tuple[float, Dict[int, float]]] = {}
+
+
+def _zkey(tenant_id: int) -> str:
+    return f"cb:pop:{tenant_id}"
+
+
+def record(tenant_id: int, product_ids: Iterable[int], weight: float = IMPRESSION) -> None:
+    """Count impressions / cart adds. Never raises; popularity is best effort."""
+    ids = [int(pid) for pid in product_ids]
+    if not ids:
+        return
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for pid in ids:
+                pipe.zincrby(_zkey(tenant_id), weight, pid)
+            pipe.execute()
+            return
+        except Exception:
+            pass
+    with _lock:
+        for pid in ids:
+            _pending[(tenant_id, pid)] += weight
+    start_flusher("popularity", flush, current_app.config.get("POPULARITY_FLUSH_SECONDS", 30))
+
+
+def forget(tenant_id: int, product_id: int) -> None:
+    """Drop a deleted product's score (Redis and table) so it stops taking a top-N slot.
+
+    The table delete joins the caller's session and commits with it.
+    """
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            r.zrem(_zkey(tenant_id), product_id)
+        except Exception:
+            pass
+    db.session.query(ProductPopularity).filter(
+        ProductPopularity.tenant_id == tenant_id, ProductPopularity.product_id == product_id,
+    ).delete(synchronize_session=False)
+
+
+def _existing(conn, keys: Iterable[Tuple[int, int]], chunk: int = 500) -> set:
+    """The (tenant_id, product_id) pairs among `keys` whose product still exists."""
+    ids = list({pid for _, pid in keys})
+    found = set()
+    for i in range(0, len(ids), chunk):
+        rows = conn.execute(select(Product.tenant_id, Product.id).where(Product.id.in_(ids[i:i + chunk])))
+        found.update((int(tid), int(pid)) for tid, pid in rows)
+    return found
+
+
+def flush() -> int:
+    """Write buffered deltas to product_popularity with one upsert per chunk, in one transaction.
+
+    Counts for products that no longer exist (or belong to another tenant) are
+    dropped. A failed write is retried on the next flush only when it may be
+    transient; an integrity error would fail again, so that batch is dropped.
+    """
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+    now = datetime.utcnow()
+    try:
+        # own connection: independent of whatever the request session holds
+        with db.engine.begin() as conn:
+            live = _existing(conn, batch)
+            rows = [
+                {"tenant_id": tid, "product_id": pid, "score": d, "updated_at": now}
+                for (tid, pid), d in batch.items() if (tid, pid) in live
+            ]
+            if rows:
+                add_upsert(
+                    conn, ProductPopularity.__table__, rows,
+                    keys=("tenant_id", "product_id"), add=("score",), extra={"updated_at": func.now()},
+                )
+    except IntegrityError:
+        current_app.logger.warning("popularity flush dropped %s counts", len(batch), exc_info=True)
+        return 0
+    except Exception:
+        # keep the counts for the next attempt rather than dropping them
+        with _lock:
+            for k, d in batch.items():
+                _pending[k] += d
+        return 0
+    return len(rows)
+
+
+def _load(tenant_id: int, top_n: int) -> Dict[int, float]:
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            return {int(m): float(s) for m, s in r.zrevrange(_zkey(tenant_id), 0, top_n - 1, withscores=True)}
+        except Exception:
+            pass
+    rows = db.session.execute(
+        select(ProductPopularity.product_id, ProductPopularity.score)
+        .where(ProductPopularity.tenant_id == tenant_id)
+        .order_by(ProductPopularity.score.desc())
+        .limit(top_n)
+    )
+    return {int(pid): float(score) for pid, score in rows}
+
+
+def scores(tenant_id: int) -> Dict[int, float]:
+    """Top-N scores for a tenant, best first, refreshed at most every POPULARITY_REFRESH_SECONDS.
+
+    Ranking on the request path is a dict lookup; the load runs once per refresh.
+    """
+    now = time.time()
+    cached = _ranks.get(tenant_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    cfg = current_app.config
+    try:
+        value = _load(tenant_id, cfg.get("POPULARITY_TOP_N", 2000))
+    except Exception:
+        value = cached[1] if cached else {}
+    _ranks[tenant_id] = (now + cfg.get("POPULARITY_REFRESH_SECONDS", 60), value)
+    return value
+
+
+def rank(product_ids: List[int], table: Dict[int, float]) -> List[int]:
+    """Most popular first; ties (including unscored products) keep their input order."""
+    if not table:
+        return list(product_ids)
+    return sorted(product_ids, key=lambda pid: -table.get(pid, 0.0))
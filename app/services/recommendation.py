@@ -1,90 +1,41 @@
 from __future__ import annotations
 
-import re
-from typing import List, Tuple
-from difflib import SequenceMatcher
-
-from sqlalchemy import or_, select
+from typing import Iterator, List, Optional, Tuple
 
+from .. import metrics
 from ..extensions import db
-from ..models import KeywordRule, Product, Synonym
+from ..models import Product
+from . import popularity, textnorm
+from .snapshot import CompiledRule, get_snapshot
 
 
 def normalize(text: str) -> str:
-    return text.strip().lower()
+    return textnorm.normalize(text)
 
 
-def expand_terms(tenant_id: int, text: str) -> List[str]:
-    base = [text]
-    # Pull synonyms where term appears in text
-    syns = (
-        db.session.query(Synonym)
-        .filter(Synonym.tenant_id == tenant_id)
-        .all()
-    )
-    terms = set(base)
-    for s in syns:
-        t = s.term.lower()
-        if t in text:
-            for alt in (s.synonyms or []):
-                if isinstance(alt, str) and alt:
-                    terms.add(alt.lower())
-    return list(terms)
+def expand_terms(tenant_id: int, text: str, locale: Optional[str] = None) -> List[str]:
+    # synonyms were normalized when the snapshot was built
+    with metrics.timed("expand_terms"):
+        return get_snapshot(tenant_id).for_locale(locale).expand_terms(normalize(text))
 
 
-def match_rules(tenant_id: int, text: str) -> List[KeywordRule]:
-    text_norm = normalize(text)
-    rules = (
-        db.session.query(KeywordRule)
-        .filter(KeywordRule.tenant_id == tenant_id, KeywordRule.is_active.is_(True))
-        .order_by(KeywordRule.priority.desc())
-        .all()
-    )
-    matched: List[KeywordRule] = []
-    for r in rules:
-        trig = (r.trigger_text or "").lower()
-        if not trig:
-            continue
-        if r.match_type == 'exact' and text_norm == trig:
-            matched.append(r)
-        elif r.match_type == 'prefix' and text_norm.startswith(trig):
-            matched.append(r)
-        elif r.match_type == 'contains' and trig in text_norm:
-            matched.append(r)
-        elif r.match_type == 'regex':
-            try:
-                if re.search(trig, text_norm):
-                    matched.append(r)
-            except re.error:
-                continue
-    return matched
+def match_rules(tenant_id: int, text: str, locale: Optional[str] = None) -> List[CompiledRule]:
+    with metrics.timed("match_rules"):
+        return get_snapshot(tenant_id).for_locale(locale).match_rules(normalize(text), textnorm.fold(text))
 
 
-def fuzzy_rules(tenant_id: int, text: str, threshold: float = 0.72) -> List[KeywordRule]:
-    rules = (
-        db.session.query(KeywordRule)
-        .filter(KeywordRule.tenant_id == tenant_id, KeywordRule.is_active.is_(True))
-        .all()
-    )
-    cand: List[Tuple[float, KeywordRule]] = []
-    for r in rules:
-        trig = (r.trigger_text or "").lower()
-        if not trig:
-            continue
-        score = SequenceMatcher(None, text, trig).ratio()
-        if score >= threshold:
-            cand.append((score, r))
-    cand.sort(key=lambda x: (x[0], x[1].priority), reverse=True)
-    return [r for _, r in cand[:5]]
+def fuzzy_rules(tenant_id: int, text: str, threshold: float = 0.72, locale: Optional[str] = None) -> List[CompiledRule]:
+    with metrics.timed("fuzzy_rules"):
+        return get_snapshot(tenant_id).for_locale(locale).fuzzy_rules(normalize(text), threshold=threshold)
 
 
 def fetch_products_by_ids(tenant_id: int, ids: List[int], limit: int = 5) -> List[Product]:
     if not ids:
         return []
+    # no SQL LIMIT: it would keep an arbitrary subset of `ids`, not the first ones
     q = (
         db.session.query(Product)
         .filter(Product.tenant_id == tenant_id, Product.is_active.is_(True), Product.id.in_(ids))
-        .limit(limit)
     )
     # maintain input order
     found = {p.id: p for p in q}
@@ -93,47 +44,65 @@ def fetch_products_by_ids(tenant_id: int, ids: List[int], limit: int = 5) -> Lis
 
 
 def fallback_search(tenant_id: int, terms: List[str], limit: int = 5) -> List[Product]:
-    if not terms:
-        return []
-    like_clauses = [Product.name.ilike(f"%{t}%") for t in terms if t]
-    q = (
-        db.session.query(Product)
-        .filter(Product.tenant_id == tenant_id, Product.is_active.is_(True))
-        .filter(or_(*like_clauses))
-        .limit(limit)
-        .all()
-    )
-    return q
+    with metrics.timed("fallback_search"):
+        ids = get_snapshot(tenant_id).search_products(terms, limit=limit, ranking=popularity.scores(tenant_id))
+        return fetch_products_by_ids(tenant_id, ids, limit=limit)
+
 
+def iter_recommend(tenant_id: int, text: str, limit: int = 5, locale: Optional[str] = None) -> Iterator[Tuple[str, object]]:
+    """Yield ("rules", [rule ids]) once matching is done, ("text", str) as soon
+    as a matched rule supplies copy, then ("product", Product) one by one as
+    each rule's products resolve.
 
-def recommend(tenant_id: int, text: str, limit: int = 5) -> Tuple[str | None, List[Product]]:
+    Streaming clients render pieces as they arrive; `recommend` collects them.
+    With a locale, only that locale's rules/synonyms plus locale-less ones apply.
+    Within each rule, and in the fallback, products are ordered by popularity.
+    """
+    snap = get_snapshot(tenant_id).for_locale(locale)
     text_norm = normalize(text)
-    terms = expand_terms(tenant_id, text_norm)
-    rules = match_rules(tenant_id, text_norm)
+    with metrics.timed("match_rules"):
+        rules = snap.match_rules(text_norm, textnorm.fold(text))
     if not rules:
-        rules = fuzzy_rules(tenant_id, text_norm)
+        with metrics.timed("fuzzy_rules"):
+            rules = snap.fuzzy_rules(text_norm)
+    yield "rules", [r.id for r in rules]
 
+    response_text = next((r.response_text for r in rules if r.response_text), None)
+    if response_text:
+        yield "text", response_text
+
+    pop = popularity.scores(tenant_id)
+    seen = set()
+    for r in rules:
+        for p in fetch_products_by_ids(tenant_id, popularity.rank(r.product_ids, pop), limit=limit):
+            if p.id in seen:
+                continue
+            seen.add(p.id)
+            yield "product", p
+            if len(seen) >= limit:
+                return
+
+    if not seen:
+        with metrics.timed("expand_terms"):
+            terms = snap.expand_terms(text_norm)
+        with metrics.timed("fallback_search"):
+            ids = snap.search_products(terms, limit=limit, ranking=pop)
+            products = fetch_products_by_ids(tenant_id, ids, limit=limit)
+        for p in products:
+            yield "product", p
+
+
+def recommend(
+    tenant_id: int, text: str, limit: int = 5, locale: Optional[str] = None, rule_ids: Optional[List[int]] = None,
+) -> Tuple[str | None, List[Product]]:
+    """Collect `iter_recommend`; matched rule ids are appended to `rule_ids` when given."""
     response_text = None
     products: List[Product] = []
-    for r in rules:
-        if r.response_text and not response_text:
-            response_text = r.response_text
-        ids = []
-        if isinstance(r.product_ids, list):
-            ids = [int(x) for x in r.product_ids if isinstance(x, (int, str)) and str(x).isdigit()]
-        products.extend(fetch_products_by_ids(tenant_id, ids, limit=limit))
-        if len(products) >= limit:
-            break
-    # de-dup
-    seen = set()
-    deduped: List[Product] = []
-    for p in products:
-        if p.id in seen:
-            continue
-        seen.add(p.id)
-        deduped.append(p)
-    products = deduped[:limit]
-
-    if not products:
-        products = fallback_search(tenant_id, terms, limit=limit)
+    for kind, value in iter_recommend(tenant_id, text, limit=limit, locale=locale):
+        if kind == "text":
+            response_text = value  # type: ignore[assignment]
+        elif kind == "product":
+            products.append(value)  # type: ignore[arg-type]
+        elif rule_ids is not None:
+            rule_ids.extend(value)  # type: ignore[arg-type]
     return response_text, products
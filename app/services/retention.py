@@ -0,0 +1,219 @@
+"""Keep the hot chat tables small.
+
+- Conversations closed for RETENTION_CLOSED_DAYS, or without a message for
+  RETENTION_DAYS, are archived with their messages and then deleted,
+  RETENTION_BATCH_SIZE conversations per transaction with
+  RETENTION_PAUSE_SECONDS between batches. RETENTION_ARCHIVE picks the target:
+  `table` (conversation_archive, in the same transaction as the delete),
+  `file` (gzipped NDJSON under RETENTION_ARCHIVE_DIR) or `none` (delete
+  without archive). Unset, conversations are never deleted.
+- Open carts without a new item for CART_ABANDON_HOURS become `abandoned`.
+- Analytics rollup rows older than ANALYTICS_RETENTION_DAYS are dropped.
+
+A file batch is flushed and fsynced before its rows are deleted, so a crash
+can at worst archive a conversation twice, never lose it. A file is only as
+durable as the disk under RETENTION_ARCHIVE_DIR; `table` needs no extra storage.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import and_, exists, or_
+
+from ..extensions import db
+from ..models import Cart, CartItem, Conversation, ConversationArchive, Message
+from . import analytics, history
+
+
+@dataclass
+class RetentionResult:
+    conversations: int = 0
+    messages: int = 0
+    carts_abandoned: int = 0
+    analytics_rows: int = 0
+    archive: Optional[str] = None
+    skipped: Optional[str] = None  # why conversations were left in place
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt else None
+
+
+def expired_conversation_ids(tenant_id: int, limit: int, now: Optional[datetime] = None) -> List[int]:
+    cfg = current_app.config
+    now = now or datetime.utcnow()
+    idle_cutoff = now - timedelta(days=cfg.get("RETENTION_DAYS", 90))
+    closed_cutoff = now - timedelta(days=cfg.get("RETENTION_CLOSED_DAYS", 30))
+    recent_message = exists().where(and_(Message.conversation_id == Conversation.id, Message.created_at >= idle_cutoff))
+    rows = (
+        db.session.query(Conversation.id)
+        .filter(Conversation.tenant_id == tenant_id)
+        .filter(or_(
+            and_(Conversation.status == 'closed', Conversation.updated_at < closed_cutoff),
+            and_(Conversation.updated_at < idle_cutoff, ~recent_message),
+        ))
+        .order_by(Conversation.id.asc())
+        .limit(limit)
+        .all()
+    )
+    return [cid for (cid,) in rows]
+
+
+ARCHIVE_MODES = ("table", "file", "none")
+
+
+def archive_mode() -> Optional[str]:
+    """Configured archive target, or None when deleting is not enabled."""
+    mode = (current_app.config.get("RETENTION_ARCHIVE") or "").strip().lower()
+    if mode not in ARCHIVE_MODES:
+        return None
+    if mode == "file" and not current_app.config.get("RETENTION_ARCHIVE_DIR"):
+        return None
+    return mode
+
+
+def _archive_records(ids: List[int]):
+    """(conversation, record dict, message count) for each id, oldest first."""
+    convos = db.session.query(Conversation).filter(Conversation.id.in_(ids)).order_by(Conversation.id.asc()).all()
+    msgs: Dict[int, List[dict]] = {cid: [] for cid in ids}
+    for m in (
+        db.session.query(Message)
+        .filter(Message.conversation_id.in_(ids))
+        .order_by(Message.conversation_id.asc(), Message.created_at.asc(), Message.id.asc())
+    ):
+        msgs[m.conversation_id].append({
+            "id": m.id,
+            "role": m.role,
+            "content": m.content,
+            "content_type": m.content_type,
+            "metadata": m.meta,
+            "created_at": _iso(m.created_at),
+        })
+    for c in convos:
+        yield c, {
+            "id": c.id,
+            "tenant_id": c.tenant_id,
+            "external_user_id": c.external_user_id,
+            "status": c.status,
+            "created_at": _iso(c.created_at),
+            "updated_at": _iso(c.updated_at),
+            "messages": msgs.get(c.id, []),
+        }, len(msgs.get(c.id, []))
+
+
+def _to_table(tenant_id: int, ids: List[int]) -> int:
+    """Insert archive rows in the caller's transaction; returns messages archived."""
+    total = 0
+    for c, record, n in _archive_records(ids):
+        db.session.add(ConversationArchive(
+            tenant_id=tenant_id,
+            conversation_id=c.id,
+            message_count=n,
+            created_at=c.created_at,
+            updated_at=c.updated_at,
+            payload=gzip.compress(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8")),
+        ))
+        total += n
+    return total
+
+
+def _delete(ids: List[int]) -> None:
+    db.session.query(Message).filter(Message.conversation_id.in_(ids)).delete(synchronize_session=False)
+    # carts outlive their conversation (co-occurrence still reads them)
+    db.session.query(Cart).filter(Cart.conversation_id.in_(ids)).update({Cart.conversation_id: None}, synchronize_session=False)
+    db.session.query(Conversation).filter(Conversation.id.in_(ids)).delete(synchronize_session=False)
+
+
+def archive_conversations(tenant_id: int, result: RetentionResult, progress: Optional[Callable[[int], None]] = None) -> None:
+    cfg = current_app.config
+    mode = archive_mode()
+    if mode is None:
+        result.skipped = "RETENTION_ARCHIVE not set (table|file|none); conversations kept"
+        return
+    batch = cfg.get("RETENTION_BATCH_SIZE", 500)
+    pause = cfg.get("RETENTION_PAUSE_SECONDS", 0.2)
+    directory = cfg.get("RETENTION_ARCHIVE_DIR") if mode == "file" else None
+    if mode == "table":
+        result.archive = "table:conversation_archive"
+    out = None
+    try:
+        while True:
+            ids = expired_conversation_ids(tenant_id, batch)
+            if not ids:
+                break
+            if directory:
+                if out is None:
+                    tenant_dir = os.path.join(directory, str(tenant_id))
+                    os.makedirs(tenant_dir, exist_ok=True)
+                    result.archive = os.path.join(tenant_dir, f"conversations-{datetime.utcnow():%Y%m%dT%H%M%S}.ndjson.gz")
+                    out = gzip.open(result.archive, "at", encoding="utf-8")
+                for _, record, n in _archive_records(ids):
+                    out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    result.messages += n
+                out.flush()
+                os.fsync(out.fileobj.fileno())
+            elif mode == "table":
+                result.messages += _to_table(tenant_id, ids)
+            else:
+                result.messages += db.session.query(Message).filter(Message.conversation_id.in_(ids)).count()
+            _delete(ids)
+            db.session.commit()
+            # after the commit, so a concurrent read can't re-cache deleted rows
+            history.invalidate_tail(tenant_id, ids)
+            result.conversations += len(ids)
+            if progress:
+                progress(result.conversations)
+            if len(ids) < batch:
+                break
+            time.sleep(pause)
+    finally:
+        if out is not None:
+            out.close()
+
+
+def abandon_idle_carts(tenant_id: int, result: RetentionResult) -> None:
+    """Mark open carts abandoned once neither the cart nor any item changed for CART_ABANDON_HOURS.
+
+    Cart writes touch Cart.updated_at (quantity changes included); the item
+    check also covers rows written before that.
+    """
+    cfg = current_app.config
+    cutoff = datetime.utcnow() - timedelta(hours=cfg.get("CART_ABANDON_HOURS", 72))
+    batch = cfg.get("RETENTION_BATCH_SIZE", 500)
+    recent_item = exists().where(and_(CartItem.cart_id == Cart.id, CartItem.created_at >= cutoff))
+    while True:
+        ids = [
+            cid for (cid,) in
+            db.session.query(Cart.id)
+            .filter(Cart.tenant_id == tenant_id, Cart.status == 'open', Cart.updated_at < cutoff, ~recent_item)
+            .order_by(Cart.id.asc())
+            .limit(batch)
+        ]
+        if not ids:
+            break
+        db.session.query(Cart).filter(Cart.id.in_(ids), Cart.status == 'open').update(
+            {Cart.status: 'abandoned'}, synchronize_session=False
+        )
+        db.session.commit()
+        result.carts_abandoned += len(ids)
+        if len(ids) < batch:
+            break
+        time.sleep(cfg.get("RETENTION_PAUSE_SECONDS", 0.2))
+
+
+def run_retention(tenant_id: int, progress: Optional[Callable[[int], None]] = None) -> RetentionResult:
+    result = RetentionResult()
+    abandon_idle_carts(tenant_id, result)
+    archive_conversations(tenant_id, result, progress=progress)
+    result.analytics_rows = analytics.prune(tenant_id)
+    return result
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from ..cache import get as cache_get, set as cache_set
+from ..extensions import db
+from ..models import Setting
+from ..versions import get_tenant_version
+
+ALLOWED_SETTING_KEYS = {"welcome_text", "default_reply_text", "external_products_api_url", "external_products_api_key", "suggested_queries"}
+
+
+def tenant_settings(tenant_id: int, version: Optional[int] = None) -> Dict[str, Any]:
+    """A tenant's settings, cached per config version (a settings write bumps it)."""
+    if version is None:
+        version = get_tenant_version(tenant_id)
+    cache_key = f"{tenant_id}:settings:{version}"
+    cached = cache_get("settings", cache_key)
+    if cached is not None:
+        return cached
+    rows = (
+        db.session.query(Setting)
+        .filter(Setting.tenant_id == tenant_id, Setting.key.in_(ALLOWED_SETTING_KEYS))
+        .all()
+    )
+    res = {s.key: s.value for s in rows}
+    cache_set("settings", cache_key, res, ttl_seconds=60)
+    return res
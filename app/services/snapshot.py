@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterator, List, Optional, Pattern, Set, Tuple
+
+from flask import current_app
+
+from ..extensions import db
+from ..models import KeywordRule, Product, Synonym
+from ..versions import get_tenant_version
+from .textnorm import fold, normalize
+
+
+@dataclass
+class CompiledRule:
+    """Read-only view of an active KeywordRule with its trigger normalized once."""
+    id: int
+    trigger_text: str
+    match_type: str
+    priority: int
+    product_ids: List[int]
+    response_text: Optional[str]
+    pattern: Optional[Pattern] = None
+    locale: Optional[str] = None
+
+    def matches(self, text_norm: str, text_fold: Optional[str] = None) -> bool:
+        if self.match_type == 'exact':
+            return text_norm == self.trigger_text
+        if self.match_type == 'prefix':
+            return text_norm.startswith(self.trigger_text)
+        if self.match_type == 'contains':
+            return self.trigger_text in text_norm
+        if self.match_type == 'regex':
+            # regexes see the folded text with punctuation intact
+            return bool(self.pattern and self.pattern.search(text_fold if text_fold is not None else text_norm))
+        return False
+
+
+def rule_product_ids(r) -> List[int]:
+    if not isinstance(r.product_ids, list):
+        return []
+    return [int(x) for x in r.product_ids if isinstance(x, (int, str)) and str(x).isdigit()]
+
+
+def locale_key(locale: Optional[str]) -> Optional[str]:
+    """'zh_TW' / 'zh-tw ' -> 'zh-tw'; blank -> None."""
+    if not isinstance(locale, str):
+        return None
+    key = locale.strip().replace('_', '-').lower()[:10]
+    return key or None
+
+
+def locale_chain(locale: Optional[str]) -> Tuple[Optional[str], ...]:
+    """Partitions a message in `locale` is matched against, most specific first."""
+    key = locale_key(locale)
+    if key is None:
+        return ()
+    lang = key.split('-', 1)[0]
+    return (key, lang, None) if lang != key else (key, None)
+
+
+def compile_rule(r: KeywordRule) -> Optional[CompiledRule]:
+    raw = r.trigger_text or ""
+    pattern = None
+    if r.match_type == 'regex':
+        trig = fold(raw)
+        try:
+            pattern = re.compile(trig)
+        except re.error:
+            return None
+    else:
+        trig = normalize(raw)
+    if not trig:
+        return None
+    return CompiledRule(
+        id=r.id,
+        trigger_text=trig,
+        match_type=r.match_type,
+        priority=r.priority or 0,
+        product_ids=rule_product_ids(r),
+        response_text=r.response_text,
+        pattern=pattern,
+        locale=locale_key(r.locale),
+    )
+
+
+@dataclass
+class Evaluation:
+    response_text: Optional[str]
+    rule_ids: List[int]
+    product_ids: List[int]
+    source: str  # "rule" | "fuzzy" | "fallback" | "none"
+
+
+class ProductIndex(ABC):
+    """Active product ids (ascending) and their normalized names."""
+
+    @abstractmethod
+    def __contains__(self, pid: int) -> bool:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def search(self, terms: List[str], limit: Optional[int] = None) -> List[int]:
+        """Ids whose name contains any term, in id order; stops at limit when given."""
+
+    @abstractmethod
+    def name(self, pid: int) -> Optional[str]:
+        """Normalized name of an active product; None when it is not in the index."""
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[int, str]]:
+        ...
+
+
+class ListProductIndex(ProductIndex):
+    def __init__(self, rows: List[Tuple[int, str]]):
+        self.rows = rows
+        self.names = dict(rows)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self.names
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def search(self, terms: List[str], limit: Optional[int] = None) -> List[int]:
+        found: List[int] = []
+        for pid, name in self.rows:
+            if any(t in name for t in terms):
+                found.append(pid)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def name(self, pid: int) -> Optional[str]:
+        return self.names.get(pid)
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        return iter(self.rows)
+
+
+@dataclass
+class TenantSnapshot:
+    """Everything `recommend` needs to match a message, loaded in three queries.
+
+    Matching against a snapshot touches no database; only the final product
+    rows need fetching, which callers can batch across many messages.
+    """
+    tenant_id: int
+    rules: List[CompiledRule]
+    # (locale, term, alts); locale None applies everywhere
+    synonyms: List[Tuple[Optional[str], str, List[str]]]
+    # active products only: ids and normalized names (in memory or mmapped)
+    products: "ProductIndex"
+    version: int = 0
+    locale: Optional[str] = None
+    _partitions: Dict[Optional[str], "TenantSnapshot"] = field(default_factory=dict, repr=False)
+    # locales used by any rule or synonym (None included), computed on first use
+    _locales: Optional[Set[Optional[str]]] = field(default=None, repr=False)
+
+    def for_locale(self, locale: Optional[str]) -> "TenantSnapshot":
+        """Narrow rules and synonyms to a locale, its language and locale-less entries.
+
+        No locale means no narrowing. Partitions are keyed by the most specific
+        locale in the chain that some rule or synonym uses (a locale nobody
+        configured gets the locale-less partition), so their number is bounded
+        by the tenant's data rather than by what clients send. They share the
+        product index and are built once per snapshot.
+        """
+        chain = locale_chain(locale)
+        if not chain:
+            return self
+        if self._locales is None:
+            self._locales = {r.locale for r in self.rules} | {s[0] for s in self.synonyms}
+        key = next((loc for loc in chain if loc in self._locales), None)
+        if key is None and not self._locales - {None}:
+            return self  # nothing is localized: the partition would be the whole snapshot
+        part = self._partitions.get(key)
+        if part is None:
+            allowed = set(chain[chain.index(key):])
+            part = TenantSnapshot(
+                tenant_id=self.tenant_id,
+                rules=[r for r in self.rules if r.locale in allowed],
+                synonyms=[s for s in self.synonyms if s[0] in allowed],
+                products=self.products,
+                version=self.version,
+                locale=key,
+            )
+            self._partitions[key] = part
+        return part
+
+    def expand_terms(self, text: str) -> List[str]:
+        terms = {text}
+        for _, term, alts in self.synonyms:
+            if term in text:
+                terms.update(alts)
+        return list(terms)
+
+    def match_rules(self, text_norm: str, text_fold: Optional[str] = None) -> List[CompiledRule]:
+        return [r for r in self.rules if r.matches(text_norm, text_fold)]
+
+    def fuzzy_rules(self, text_norm: str, threshold: float = 0.72) -> List[CompiledRule]:
+        cand: List[Tuple[float, CompiledRule]] = []
+        for r in self.rules:
+            score = SequenceMatcher(None, text_norm, r.trigger_text).ratio()
+            if score >= threshold:
+                cand.append((score, r))
+        cand.sort(key=lambda x: (x[0], x[1].priority), reverse=True)
+        return [r for _, r in cand[:5]]
+
+    def search_products(self, terms: List[str], limit: int = 5, ranking: Optional[Dict[int, float]] = None) -> List[int]:
+        """Active products whose name contains any term; most popular first when ranked.
+
+        `ranking` is popularity's top-N table, best first. Its ids are checked in
+        that order until `limit` match; only when fewer do, the rest come from an
+        id-order scan capped at `limit` more hits, so no call ranks every match.
+        """
+        terms = [t for t in terms if t]
+        if not terms:
+            return []
+        if not ranking:
+            return self.products.search(terms, limit)
+        found: List[int] = []
+        for pid in ranking:
+            name = self.products.name(pid)
+            if name is not None and any(t in name for t in terms):
+                found.append(pid)
+                if len(found) >= limit:
+                    return found
+        # every ranked match is in `found`; the remainder are unscored, in id order
+        seen = set(found)
+        found.extend(pid for pid in self.products.search(terms, limit + len(found)) if pid not in seen)
+        return found[:limit]
+
+    def evaluate(self, text: str, limit: int = 5, ranking: Optional[Dict[int, float]] = None) -> Evaluation:
+        """Same decision sequence as `iter_recommend`, returning ids only."""
+        text_norm = normalize(text)
+        source = "rule"
+        rules = self.match_rules(text_norm, fold(text))
+        if not rules:
+            rules = self.fuzzy_rules(text_norm)
+            source = "fuzzy"
+        response_text = next((r.response_text for r in rules if r.response_text), None)
+
+        product_ids: List[int] = []
+        seen = set()
+        for r in rules:
+            ids = sorted(r.product_ids, key=lambda pid: -ranking.get(pid, 0.0)) if ranking else r.product_ids
+            for pid in ids:
+                if pid in seen or pid not in self.products:
+                    continue
+                seen.add(pid)
+                product_ids.append(pid)
+            if len(product_ids) >= limit:
+                break
+        product_ids = product_ids[:limit]
+
+        if not product_ids:
+            product_ids = self.search_products(self.expand_terms(text_norm), limit=limit, ranking=ranking)
+            source = "fallback" if product_ids else ("none" if not rules else source)
+        return Evaluation(
+            response_text=response_text,
+            rule_ids=[r.id for r in rules],
+            product_ids=product_ids,
+            source=source,
+        )
+
+
+def build_snapshot(tenant_id: int, version: int = 0) -> TenantSnapshot:
+    """Load and normalize a tenant's matching data; all text folding happens here, once."""
+    rules = (
+        db.session.query(KeywordRule)
+        .filter(KeywordRule.tenant_id == tenant_id, KeywordRule.is_active.is_(True))
+        .order_by(KeywordRule.priority.desc())
+        .all()
+    )
+    compiled = [c for c in (compile_rule(r) for r in rules) if c is not None]
+
+    synonyms: List[Tuple[Optional[str], str, List[str]]] = []
+    for s in db.session.query(Synonym).filter(Synonym.tenant_id == tenant_id).all():
+        term = normalize(s.term or "")
+        alts = [a for a in (normalize(x) for x in (s.synonyms or []) if isinstance(x, str)) if a]
+        if term and alts:
+            synonyms.append((locale_key(s.locale), term, alts))
+
+    rows = (
+        db.session.query(Product.id, Product.name)
+        .filter(Product.tenant_id == tenant_id, Product.is_active.is_(True))
+        .order_by(Product.id.asc())
+        .all()
+    )
+    return TenantSnapshot(
+        tenant_id=tenant_id,
+        rules=compiled,
+        synonyms=synonyms,
+        products=ListProductIndex([(pid, normalize(name or "")) for pid, name in rows]),
+        version=version,
+    )
+
+
+# Per-process snapshots, rebuilt when the tenant's config version moves. Bounded
+# (least recently used tenants are dropped) so memory stays flat as tenants grow.
+# Request threads and the re-warm thread share it, hence the lock.
+_snapshots: "OrderedDict[int, TenantSnapshot]" = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def _load_or_build(tenant_id: int, version: int) -> TenantSnapshot:
+    directory = current_app.config.get("SNAPSHOT_DIR")
+    if not directory:
+        return build_snapshot(tenant_id, version=version)
+    from . import snapshot_store
+
+    if not snapshot_store.SUPPORTED:
+        return build_snapshot(tenant_id, version=version)
+    path = snapshot_store.snapshot_path(directory, tenant_id, version)
+    snap = snapshot_store.open_snapshot(path)
+    if snap is None:
+        # first worker to need this version publishes it for the others
+        try:
+            snap = snapshot_store.open_snapshot(snapshot_store.write_snapshot(build_snapshot(tenant_id, version=version), directory))
+        except OSError:
+            snap = None
+    return snap or build_snapshot(tenant_id, version=version)
+
+
+def get_snapshot(tenant_id: int) -> TenantSnapshot:
+    version = get_tenant_version(tenant_id)
+    with _snapshots_lock:
+        snap = _snapshots.get(tenant_id)
+        if snap is not None and snap.version == version:
+            _snapshots.move_to_end(tenant_id)
+            return snap
+    # built outside the lock so other tenants are served meanwhile
+    snap = _load_or_build(tenant_id, version)
+    limit = current_app.config.get("SNAPSHOT_MAX_TENANTS", 256)
+    with _snapshots_lock:
+        current = _snapshots.get(tenant_id)
+        if current is not None and current.version > snap.version:
+            snap = current  # a concurrent build already saw a newer version
+        _snapshots[tenant_id] = snap
+        _snapshots.move_to_end(tenant_id)
+        while len(_snapshots) > max(1, limit):
+            _snapshots.popitem(last=False)
+    return snap
+
+
+def load_products(tenant_id: int, ids: List[int], chunk: int = 500) -> Dict[int, Product]:
+    """Fetch product rows for many ids with one IN query per chunk."""
+    out: Dict[int, Product] = {}
+    unique = list(dict.fromkeys(ids))
+    for i in range(0, len(unique), chunk):
+        batch = unique[i:i + chunk]
+        for p in db.session.query(Product).filter(Product.tenant_id == tenant_id, Product.id.in_(batch)):
+            out[p.id] = p
+    return out
@@ -0,0 +1,178 @@
+"""Tenant snapshots as read-only files shared by every worker on a host.
+
+One file per tenant version, `<SNAPSHOT_DIR>/<tenant_id>-<version>.snap`:
+
+    header   struct HEADER (magic, tenant, version, counts, section offsets)
+    ids      int64[n]      active product ids, ascending
+    offsets  int64[n + 1]  start of each name in the blob
+    blob     utf-8         normalized names, each followed by NUL
+    meta     json          compiled rules and synonyms (small; decoded per worker)
+
+Workers mmap the file, so the product ids and names (the bulk of a snapshot)
+live once in the page cache instead of once per worker; lookups are bisects
+and `mmap.find` over the blob. Files are written to a temp name and renamed,
+so a reader sees either the old version or the complete new one; a worker that
+still maps a replaced file keeps reading it until it moves on.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+from .snapshot import CompiledRule, ProductIndex, TenantSnapshot
+
+MAGIC = b"CBSNAP1\0"
+HEADER = struct.Struct("<8s9q")  # magic, tenant, version, n, ids_off, offs_off, blob_off, blob_len, meta_off, meta_len
+# sections are written in native order and cast back in place
+SUPPORTED = sys.byteorder == "little"
+
+
+def snapshot_path(directory: str, tenant_id: int, version: int) -> str:
+    return os.path.join(directory, f"{tenant_id}-{version}.snap")
+
+
+class MappedProductIndex(ProductIndex):
+    def __init__(self, mm: mmap.mmap, n: int, ids_off: int, offs_off: int, blob_off: int, blob_len: int):
+        self._mm = mm
+        view = memoryview(mm)
+        self.ids = view[ids_off:ids_off + 8 * n].cast("q")
+        self.offsets = view[offs_off:offs_off + 8 * (n + 1)].cast("q")
+        self.blob_off = blob_off
+        self.blob_end = blob_off + blob_len
+
+    def __contains__(self, pid: int) -> bool:
+        i = bisect_left(self.ids, pid)
+        return i < len(self.ids) and self.ids[i] == pid
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _hits(self, term: bytes, limit: Optional[int]) -> List[int]:
+        """Row indexes whose name contains term, ascending (the blob is in id order)."""
+        out: List[int] = []
+        mm, offsets = self._mm, self.offsets
+        pos = mm.find(term, self.blob_off, self.blob_end)
+        while pos != -1:
+            row = bisect_right(offsets, pos - self.blob_off) - 1
+            out.append(row)
+            if limit is not None and len(out) >= limit:
+                break
+            pos = mm.find(term, self.blob_off + offsets[row + 1], self.blob_end)
+        return out
+
+    def search(self, terms: List[str], limit: Optional[int] = None) -> List[int]:
+        rows = set()
+        for t in terms:
+            rows.update(self._hits(t.encode("utf-8"), limit))
+        ordered = sorted(rows)
+        if limit is not None:
+            ordered = ordered[:limit]
+        return [self.ids[r] for r in ordered]
+
+    def _name_at(self, i: int) -> str:
+        start, end = self.blob_off + self.offsets[i], self.blob_off + self.offsets[i + 1] - 1
+        return self._mm[start:end].decode("utf-8")
+
+    def name(self, pid: int) -> Optional[str]:
+        i = bisect_left(self.ids, pid)
+        if i < len(self.ids) and self.ids[i] == pid:
+            return self._name_at(i)
+        return None
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        for i in range(len(self.ids)):
+            yield self.ids[i], self._name_at(i)
+
+
+def write_snapshot(snap: TenantSnapshot, directory: str) -> str:
+    """Serialize a snapshot and atomically publish it; returns the file path."""
+    os.makedirs(directory, exist_ok=True)
+    rows = list(snap.products.items())
+    ids = array("q", (pid for pid, _ in rows))
+    offsets = array("q")
+    blob = bytearray()
+    for _, name in rows:
+        offsets.append(len(blob))
+        blob += name.encode("utf-8") + b"\0"
+    offsets.append(len(blob))
+    meta = json.dumps({
+        "rules": [
+            [r.id, r.trigger_text, r.match_type, r.priority, r.product_ids, r.response_text, r.locale]
+            for r in snap.rules
+        ],
+        "synonyms": [[loc, term, alts] for loc, term, alts in snap.synonyms],
+    }, ensure_ascii=False).encode("utf-8")
+
+    ids_off = HEADER.size
+    offs_off = ids_off + 8 * len(ids)
+    blob_off = offs_off + 8 * len(offsets)
+    meta_off = blob_off + len(blob)
+    header = HEADER.pack(MAGIC, snap.tenant_id, snap.version, len(ids), ids_off, offs_off, blob_off, len(blob), meta_off, len(meta))
+
+    path = snapshot_path(directory, snap.tenant_id, snap.version)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(ids.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+        f.write(meta)
+    os.replace(tmp, path)
+    prune(directory, snap.tenant_id, keep=snap.version)
+    return path
+
+
+def prune(directory: str, tenant_id: int, keep: int) -> None:
+    """Remove older versions of a tenant (open mappings stay valid until dropped)."""
+    for p in glob.glob(os.path.join(directory, f"{tenant_id}-*.snap")):
+        try:
+            v = int(os.path.basename(p).split("-", 1)[1][:-5])
+        except ValueError:
+            continue
+        if v < keep:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+
+def open_snapshot(path: str) -> Optional[TenantSnapshot]:
+    """Map a snapshot file read-only; None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < HEADER.size:
+        return None
+    magic, tenant_id, version, n, ids_off, offs_off, blob_off, blob_len, meta_off, meta_len = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or meta_off + meta_len > len(mm):
+        return None
+    meta = json.loads(mm[meta_off:meta_off + meta_len])
+    rules = []
+    for rid, trig, match_type, priority, product_ids, response_text, locale in meta["rules"]:
+        pattern = None
+        if match_type == 'regex':
+            try:
+                pattern = re.compile(trig)  # stored folded, as compile_rule left it
+            except re.error:
+                continue
+        rules.append(CompiledRule(
+            id=rid, trigger_text=trig, match_type=match_type, priority=priority,
+            product_ids=product_ids, response_text=response_text, pattern=pattern, locale=locale,
+        ))
+    return TenantSnapshot(
+        tenant_id=tenant_id,
+        rules=rules,
+        synonyms=[(loc, term, alts) for loc, term, alts in meta["synonyms"]],
+        products=MappedProductIndex(mm, n, ids_off, offs_off, blob_off, blob_len),
+        version=version,
+    )
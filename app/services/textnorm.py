@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+# Traditional -> Simplified folding for characters common in product names and
+# shopping queries. One-way and lossy on purpose: triggers, synonyms, product
+# names and messages are all folded the same way, so 藍牙耳機 and 蓝牙耳机 meet.
+_T2S_PAIRS = (
+    "藍蓝 機机 電电 線线 無无 條条 頻频 視视 聽听 話话 響响 聲声 筆笔 記记 腦脑 鍵键 盤盘 標标 螢萤 顯显 錶表 鐘钟 導导 車车 "
+    "輛辆 門门 開开 關关 閉闭 燈灯 燒烧 熱热 風风 調调 節节 溫温 濕湿 淨净 潔洁 髮发 發发 頭头 臉脸 膚肤 護护 養养 藥药 醫医 "
+    "療疗 體体 質质 產产 價价 錢钱 貨货 買买 賣卖 購购 訂订 單单 費费 運运 郵邮 遞递 換换 優优 傳传 輸输 連连 網网 絡络 號号 "
+    "碼码 數数 據据 庫库 儲储 裝装 備备 廠厂 鑰钥 鎖锁 鏡镜 鋼钢 鐵铁 銀银 銅铜 鋁铝 錫锡 針针 釘钉 鍋锅 壺壶 飲饮 飯饭 麵面 "
+    "餅饼 鹽盐 醬酱 蘋苹 檸柠 蔥葱 薑姜 蘿萝 蔔卜 雞鸡 鴨鸭 魚鱼 蝦虾 褲裤 襪袜 夾夹 帶带 鏈链 環环 項项 織织 紡纺 綿绵 絲丝 "
+    "紗纱 絨绒 纖纤 維维 紅红 綠绿 黃黄 長长 寬宽 輕轻 軟软 舊旧 貴贵 實实 際际 個个 們们 這这 裡里 麼么 為为 從从 來来 對对 "
+    "與与 應应 該该 還还 沒没 會会 說说 請请 問问 讓让 給给 現现 時时 間间 後后 當当 點点 種种 樣样 嗎吗 適适 歡欢 愛爱 選选 "
+    "擇择 薦荐 尋寻 詢询 顧顾 戶户 員员 幫帮 務务 態态 結结 帳帐 賬账 貼贴 紙纸 張张 書书 冊册 畫画 圖图 攝摄 錄录 樂乐 動动 "
+    "遊游 戲戏 競竞 賽赛 練练 習习 學学 課课 題题 試试 驗验 證证 準准 確确 認认 識识 國国 華华 灣湾 臺台 東东 廣广 場场 區区 "
+    "縣县 鎮镇 鄉乡 園园 館馆 廳厅 樓楼 層层 廚厨 廁厕 簾帘 牆墙 櫃柜 櫥橱 墊垫 爐炉 乾干 濾滤 氣气 壓压 極极 級级 專专 業业 "
+    "經经 濟济 營营 銷销 額额 總总 計计 劃划 設设 組组 隻只 雙双 籃篮 簍篓 捲卷 軸轴 輪轮 齒齿 繩绳 纜缆 蓋盖 殼壳 鉗钳 錘锤 "
+    "鑽钻 補补 險险 擔担 憑凭 報报 減减 滿满 贈赠 禮礼 獎奖 勵励 積积 團团 搶抢 預预 約约 閱阅 讀读 寫写 講讲 語语 詞词 彙汇 "
+    "譯译 轉转 變变 靜静 穩稳 壞坏 損损 傷伤 斷断 續续 繼继 紀纪 歷历 曆历 陽阳 陰阴 雲云 霧雾 颱台 涼凉 鬧闹 趕赶 緊紧 鬆松 "
+    "圓圆 邊边 側侧 頂顶 內内 兒儿 嬰婴 婦妇 媽妈 爺爷 孫孙 親亲 屬属 寵宠 貓猫 鳥鸟 龜龟 飼饲 妝妆 潤润 彈弹 緻致 細细 濃浓 "
+    "純纯 鮮鲜 錯错 誤误 編编 輯辑 啟启 載载 刪删 複复 製制 遷迁 離离 進进 過过 達达 靈灵 聰聪 兩两 萬万 億亿 幾几 塊块 訊讯 "
+    "衛卫 遙遥 觸触 擊击 聯联 繫系 統统 韌韧 檔档 資资 隊队 簫箫 隱隐 麥麦 揚扬 憶忆 隨随 驅驱 攜携 漢汉 騎骑 賓宾 飛飞 廈厦 "
+    "僅仅 貸贷 幣币 匯汇 歲岁 齡龄 壽寿 麗丽 豐丰 饋馈 贏赢 頁页 顆颗 鈕钮 鉤钩 鍊链 鐲镯 墜坠 飾饰 寶宝 錦锦 緞缎 紋纹 繡绣 "
+    "縫缝 紉纫 襯衬 襖袄 氈毡 綁绑 彎弯 摺折 疊叠 擺摆 揀拣 撿捡 棄弃 簡简 雜杂 亂乱 齊齐 頓顿 餵喂 嚐尝 廢废 蠟蜡 燭烛 於于 "
+    "讚赞 評评 論论 贊赞 貝贝 賀贺 貿贸 賠赔 償偿 債债 負负 責责 貢贡 獻献 參参 舉举 辦办 處处 術术 藝艺 韓韩 義义 歐欧 蘇苏 "
+    "鬥斗 閃闪 閒闲 閑闲 闆板 闊阔 闖闯 鬍胡 鬚须 鬱郁 鋪铺 鏟铲 鑄铸 鑑鉴 鑒鉴 釣钓 鈴铃 鉛铅 鋸锯 鍍镀 鍛锻 鎢钨 鏽锈 鐳镭 "
+    "鋰锂 鎳镍 鉑铂 鈦钛 鋅锌 錳锰 鉻铬 鈣钙 鎂镁 鈉钠 鉀钾 矽硅 緩缓 綜综 緒绪 縮缩 績绩 繪绘 繳缴 纏缠 紐纽 紛纷 終终 絕绝 "
+    "綱纲 縱纵 繞绕 蠶蚕 螞蚂 蟻蚁 蠅蝇 蟲虫 鵝鹅 鴿鸽 鷹鹰 鶴鹤 黨党 龍龙 龐庞 鹹咸 鳳凤 鳴鸣 鴻鸿 驚惊 驢驴 騰腾 駕驾 馬马 "
+    "駛驶 驟骤 髒脏 魯鲁 鯊鲨 鯨鲸 鰻鳗 鱈鳕 鮭鲑 鱷鳄 黴霉 鼴鼹 齣出 齋斋 龕龛 "
+)
+_T2S = str.maketrans({p[0]: p[1] for p in _T2S_PAIRS.split()})
+
+# Letters, digits, marks and whitespace survive; punctuation and symbols go
+_KEEP_CATEGORIES = ("L", "N", "M", "Z")
+_WS = re.compile(r"\s+")
+
+
+def fold(text: str) -> str:
+    """Width, case and script folding without touching punctuation (regex triggers)."""
+    # NFKC maps full-width ASCII (ＡＢＣ１２３) and compatibility forms to plain ones
+    return unicodedata.normalize("NFKC", text).casefold().translate(_T2S)
+
+
+def _strip_punct(text: str) -> str:
+    return "".join(ch for ch in text if unicodedata.category(ch)[0] in _KEEP_CATEGORIES)
+
+
+def normalize(text: str) -> str:
+    """Canonical form used for matching: folded, punctuation removed, spaces collapsed."""
+    if not text:
+        return ""
+    return _WS.sub(" ", _strip_punct(fold(text))).strip()
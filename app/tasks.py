@@ -0,0 +1,58 @@
+"""Built-in job kinds. Each handler runs in a worker (or local thread) with an app context."""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from .extensions import db
+from .jobs import JobContext, job
+from .models import Setting
+from .services import cooccurrence
+from .services.catalog_sync import sync_catalog
+from .services.imports import import_products_csv, import_rules_csv
+from .services.retention import run_retention
+from .versions import bump_tenant_version
+
+
+def _setting(tenant_id: int, key: str):
+    row = db.session.query(Setting).filter(Setting.tenant_id == tenant_id, Setting.key == key).first()
+    return row.value if row else None
+
+
+@job("products.sync_external")
+def sync_external(ctx: JobContext, payload: Dict[str, Any]):
+    api_url = _setting(ctx.tenant_id, 'external_products_api_url') or payload.get('api_url')
+    api_key = _setting(ctx.tenant_id, 'external_products_api_key') or payload.get('api_key')
+    if not api_url:
+        raise ValueError("external_products_api_url not configured")
+    # sync_catalog bumps the tenant version itself, also for partial runs
+    result = sync_catalog(ctx.tenant_id, api_url, api_key, on_page=lambda r: ctx.progress(r.fetched))
+    return result.to_dict()
+
+
+@job("products.import_csv")
+def products_csv(ctx: JobContext, payload: Dict[str, Any]):
+    raw = payload.get('csv') or ''
+    ctx.progress(0, total=max(raw.count('\n') - 1, 0), force=True)
+    result = import_products_csv(ctx.tenant_id, raw, progress=ctx.progress)
+    bump_tenant_version(ctx.tenant_id)
+    return result
+
+
+@job("rules.import_csv")
+def rules_csv(ctx: JobContext, payload: Dict[str, Any]):
+    raw = payload.get('csv') or ''
+    ctx.progress(0, total=max(raw.count('\n') - 1, 0), force=True)
+    result = import_rules_csv(ctx.tenant_id, raw, progress=ctx.progress)
+    bump_tenant_version(ctx.tenant_id)
+    return result
+
+
+@job("reco.cooccurrence")
+def build_cooccurrence(ctx: JobContext, payload: Dict[str, Any]):
+    run = cooccurrence.rebuild_tenant if payload.get('rebuild') else cooccurrence.update_tenant
+    return {"cart_items": run(ctx.tenant_id, progress=ctx.progress)}
+
+
+@job("maintenance.retention")
+def retention(ctx: JobContext, payload: Dict[str, Any]):
+    return run_retention(ctx.tenant_id, progress=ctx.progress).to_dict()
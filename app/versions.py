@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from flask import current_app
+
+from .cache import get as cache_get, set as cache_set, delete as cache_delete
+from .extensions import db
+from .models import Tenant
+
+
+def get_tenant_version(tenant_id: int) -> int:
+    """Current config version of a tenant.
+
+    Cached briefly so hot paths (settings ETag, snapshots) skip the DB; with
+    Redis the bump below is visible to every worker immediately, with the
+    in-memory cache other workers catch up within TENANT_VERSION_TTL.
+    """
+    key = str(tenant_id)
+    cached = cache_get("tenant_version", key)
+    if cached is not None:
+        return int(cached)
+    version = db.session.query(Tenant.config_version).filter(Tenant.id == tenant_id).scalar() or 0
+    cache_set("tenant_version", key, int(version), ttl_seconds=current_app.config.get("TENANT_VERSION_TTL", 5))
+    return int(version)
+
+
+def bump_tenant_version(tenant_id: int) -> int:
+    """Increment the tenant's config version after an admin write has been committed."""
+    db.session.query(Tenant).filter(Tenant.id == tenant_id).update(
+        {Tenant.config_version: Tenant.config_version + 1}, synchronize_session=False
+    )
+    db.session.commit()
+    cache_delete("tenant_version", str(tenant_id))
+    version = get_tenant_version(tenant_id)
+    from .warmup import rewarm_later
+
+    rewarm_later(tenant_id)
+    return version
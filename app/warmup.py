@@ -0,0 +1,114 @@
+"""Preload the busiest tenants' lookups so a fresh worker serves its first
+messages warm, and rebuild a tenant in the background after admin writes.
+
+Warmed per tenant: config version, rule/synonym/product snapshot (published
+to SNAPSHOT_DIR when set), settings, popularity scores. API keys can only be
+verified with the raw key, so only SITE_API_KEY is pre-authenticated.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import func
+
+from .extensions import db
+from .models import Conversation, Message
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: set = set()
+_lock = threading.Lock()
+state: Dict[str, Any] = {"done": False, "running": False, "tenants": 0, "seconds": 0.0, "skipped": 0}
+
+
+def active_tenants(limit: int, window_hours: int) -> List[int]:
+    """Tenants ranked by message volume over the last window_hours."""
+    since = datetime.utcnow() - timedelta(hours=window_hours)
+    rows = (
+        db.session.query(Conversation.tenant_id, func.count(Message.id).label("n"))
+        .join(Message, Message.conversation_id == Conversation.id)
+        .filter(Message.created_at >= since)
+        .group_by(Conversation.tenant_id)
+        .order_by(func.count(Message.id).desc())
+        .limit(limit)
+        .all()
+    )
+    return [tid for tid, _ in rows]
+
+
+def warm_tenant(tenant_id: int) -> None:
+    from .services import popularity
+    from .services.settings import tenant_settings
+    from .services.snapshot import get_snapshot
+    from .versions import get_tenant_version
+
+    version = get_tenant_version(tenant_id)
+    get_snapshot(tenant_id)
+    tenant_settings(tenant_id, version)
+    popularity.scores(tenant_id)
+
+
+def warm_up(app: Flask) -> Dict[str, Any]:
+    """Warm the top WARMUP_TENANTS tenants, stopping once WARMUP_BUDGET_SECONDS is spent."""
+    cfg = app.config
+    started = time.monotonic()
+    budget = float(cfg.get("WARMUP_BUDGET_SECONDS", 10))
+    warmed = skipped = 0
+    state["running"] = True
+    with app.app_context():
+        try:
+            site_key = cfg.get("SITE_API_KEY")
+            if site_key:
+                from .auth import authenticate
+
+                authenticate(site_key)
+            tenant_ids = active_tenants(cfg.get("WARMUP_TENANTS", 20), cfg.get("WARMUP_WINDOW_HOURS", 24))
+            for i, tid in enumerate(tenant_ids):
+                if time.monotonic() - started >= budget:
+                    skipped = len(tenant_ids) - i
+                    break
+                try:
+                    warm_tenant(tid)
+                    warmed += 1
+                except Exception:
+                    db.session.rollback()
+                    app.logger.warning("warm-up failed for tenant %s", tid, exc_info=True)
+        except Exception:
+            app.logger.warning("warm-up aborted", exc_info=True)
+        finally:
+            db.session.remove()
+    state.update(done=True, running=False, tenants=warmed, skipped=skipped, seconds=round(time.monotonic() - started, 3))
+    app.logger.info("Warm-up: %s tenants in %.2fs (%s skipped over budget)", warmed, state["seconds"], skipped)
+    return state
+
+
+def rewarm_later(tenant_id: int) -> None:
+    """Rebuild a tenant's snapshot off the request thread after its version moved."""
+    global _executor
+    if not current_app.config.get("WARMUP_ON_CHANGE", True):
+        return
+    with _lock:
+        if tenant_id in _pending:
+            return
+        _pending.add(tenant_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rewarm")
+    app = current_app._get_current_object()
+
+    def run():
+        with _lock:
+            _pending.discard(tenant_id)
+        with app.app_context():
+            try:
+                warm_tenant(tenant_id)
+            except Exception:
+                db.session.rollback()
+                app.logger.warning("re-warm failed for tenant %s", tenant_id, exc_info=True)
+            finally:
+                db.session.remove()
+
+    _executor.submit(run)
@@ -0,0 +1,68 @@
+"""Compare two benchmark reports.
+
+Usage:
+    python -m benchmarks.compare base.json head.json [--threshold 0.15]
+
+Prints p50/p95 per microbenchmark and load endpoint with the relative change.
+Exit code 1 when any p50 got slower by more than the threshold (default 15%).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+
+def _rows(report: Dict) -> Iterator[Tuple[str, Dict]]:
+    for name, stats in sorted((report.get("micro") or {}).items()):
+        yield f"micro {name}", stats
+    for name, stats in sorted(((report.get("load") or {}).get("endpoints") or {}).items()):
+        yield f"load  {name}", stats
+
+
+def _delta(a, b) -> str:
+    if not a or b is None:
+        return "n/a"
+    return f"{(b - a) / a * 100:+.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="compare two benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args(argv)
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+
+    print(f"base {base.get('commit')}  head {head.get('commit')}")
+    if base.get("params") != head.get("params"):
+        print("warning: runs used different parameters", file=sys.stderr)
+    print(f"{'benchmark':40} {'p50 base':>10} {'p50 head':>10} {'Δp50':>8} {'p95 base':>10} {'p95 head':>10} {'Δp95':>8}")
+    head_rows = dict(_rows(head))
+    regressions = []
+    for name, b in _rows(base):
+        h = head_rows.get(name)
+        if h is None:
+            continue
+        print(
+            f"{name:40} {b.get('p50_us', 0):>10.1f} {h.get('p50_us', 0):>10.1f} {_delta(b.get('p50_us'), h.get('p50_us')):>8} "
+            f"{b.get('p95_us', 0):>10.1f} {h.get('p95_us', 0):>10.1f} {_delta(b.get('p95_us'), h.get('p95_us')):>8}"
+        )
+        if b.get("p50_us") and h.get("p50_us", 0) > b["p50_us"] * (1 + args.threshold):
+            regressions.append(name)
+    bl, hl = base.get("load") or {}, head.get("load") or {}
+    if bl and hl:
+        print(f"{'load rps':40} {bl.get('rps', 0):>10} {hl.get('rps', 0):>10} {_delta(bl.get('rps'), hl.get('rps')):>8}")
+        if hl.get("errors"):
+            print(f"head load errors: {hl['errors']}", file=sys.stderr)
+    if regressions:
+        print(f"slower than {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""End-to-end load: a fixed mix of chat / chat stream / cart / product requests from N threads.
+
+Targets either the Flask test client (in-process, no network) or a running
+server (`--url http://127.0.0.1:5001`, e.g. gunicorn -c gunicorn.conf.py wsgi:app).
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from flask import Flask
+
+from .micro import summarize
+from .seed import Seeded
+
+# (weight, name)
+MIX = [(55, "chat"), (15, "chat_stream"), (15, "cart"), (15, "product")]
+
+
+def _status(status: int, body: bytes) -> int:
+    """SSE failures arrive as an `error` event inside a 200; count them as 500s."""
+    if status == 200 and b"event: error" in body:
+        return 500
+    return status
+
+
+def _plan(seeded: Seeded, rng: random.Random) -> Tuple[str, str, str, Optional[dict]]:
+    tid = rng.choice(seeded.tenant_ids)
+    key = rng.choice(seeded.api_keys[tid])
+    kind = rng.choices([m[1] for m in MIX], weights=[m[0] for m in MIX])[0]
+    if kind == "chat":
+        return kind, key, "/v1/chat/message", {"message": rng.choice(seeded.messages)}
+    if kind == "chat_stream":
+        return kind, key, "/v1/chat/message/stream", {"message": rng.choice(seeded.messages)}
+    pid = rng.choice(seeded.product_ids[tid])
+    if kind == "cart":
+        return kind, key, "/v1/cart/items", {"product_id": pid, "quantity": 1}
+    return kind, key, f"/v1/products/{pid}", None
+
+
+class _TestClientTarget:
+    def __init__(self, app: Flask):
+        self.app = app
+        self.origin = "http://localhost"
+
+    def session(self):
+        client = self.app.test_client()
+
+        def send(key: str, path: str, body: Optional[dict]) -> int:
+            headers = {"X-API-Key": key, "Origin": self.origin}
+            if body is None:
+                return client.get(path, headers=headers).status_code
+            resp = client.post(path, json=body, headers=headers)
+            return _status(resp.status_code, resp.get_data())
+        return send
+
+
+class _HttpTarget:
+    def __init__(self, url: str):
+        u = urlparse(url)
+        self.host, self.port = u.hostname, u.port or 80
+        self.origin = f"{u.scheme}://{u.netloc}"
+
+    def session(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)  # keep-alive per thread
+
+        def send(key: str, path: str, body: Optional[dict]) -> int:
+            headers = {"X-API-Key": key, "Origin": self.origin}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body).encode("utf-8")
+                headers["Content-Type"] = "application/json"
+            conn.request("GET" if body is None else "POST", path, body=payload, headers=headers)
+            resp = conn.getresponse()
+            return _status(resp.status, resp.read())
+        return send
+
+
+def run(seeded: Seeded, app: Optional[Flask] = None, url: Optional[str] = None,
+        threads: int = 4, duration: float = 10.0, seed: int = 42) -> Dict:
+    target = _HttpTarget(url) if url else _TestClientTarget(app)
+    samples: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(idx: int):
+        rng = random.Random(seed + idx)
+        send = target.session()
+        local: List[Tuple[str, float, int]] = []
+        while time.perf_counter() < deadline:
+            kind, key, path, body = _plan(seeded, rng)
+            t0 = time.perf_counter_ns()
+            try:
+                status = send(key, path, body)
+            except Exception:
+                status = 0
+            local.append((kind, (time.perf_counter_ns() - t0) / 1000, status))
+        with lock:
+            for kind, us, status in local:
+                samples[kind].append(us)
+                statuses[kind][status] += 1
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    total = 0
+    for kind, us in samples.items():
+        us.sort()
+        total += len(us)
+        endpoints[kind] = dict(summarize(us), statuses={str(k): v for k, v in sorted(statuses[kind].items())})
+    errors = sum(v for st in statuses.values() for k, v in st.items() if k == 0 or k >= 500)
+    return {
+        "target": url or "test_client",
+        "threads": threads,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+        "endpoints": endpoints,
+    }
@@ -0,0 +1,133 @@
+"""Microbenchmarks for the per-request hot paths, run inside an app context."""
+from __future__ import annotations
+
+import gc
+import statistics
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+from flask import Flask, g
+from flask.json.provider import DefaultJSONProvider
+
+from app import cache
+from app.auth import authenticate, find_api_key
+from app.extensions import db
+from app.jsonprovider import FastJSONProvider
+from app.models import Product
+from app.ratelimit import check_rate_limit
+from app.routes.admin import serialize_product
+from app.routes.chat import _product_card
+from app.services import snapshot
+from app.services.recommendation import recommend
+
+from .seed import Seeded
+
+
+def timeit(fn: Callable[[int], object], n: int, warmup: int = 10) -> Dict[str, float]:
+    """Call fn(i) n times; per-call latency percentiles in microseconds."""
+    for i in range(warmup):
+        fn(i)
+    samples: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(n):
+            t0 = time.perf_counter_ns()
+            fn(i)
+            samples.append((time.perf_counter_ns() - t0) / 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    return summarize(samples)
+
+
+def summarize(samples_us: List[float]) -> Dict[str, float]:
+    n = len(samples_us)
+    if not n:
+        return {"n": 0}
+    total = sum(samples_us)
+    pick = lambda q: samples_us[min(n - 1, int(q * n))]
+    return {
+        "n": n,
+        "mean_us": round(total / n, 2),
+        "p50_us": round(pick(0.50), 2),
+        "p95_us": round(pick(0.95), 2),
+        "p99_us": round(pick(0.99), 2),
+        "stdev_us": round(statistics.pstdev(samples_us), 2),
+        "ops_per_s": round(n / (total / 1e6), 1) if total else 0.0,
+    }
+
+
+def run(app: Flask, seeded: Seeded, n: int = 500) -> Dict[str, Dict[str, float]]:
+    tid = seeded.tenant_ids[0]
+    raw_key = seeded.api_keys[tid][-1]  # last key: worst case for the bcrypt scan
+    msgs = seeded.messages
+    results: Dict[str, Dict[str, float]] = {}
+
+    with app.app_context():
+        def cold(i):
+            snapshot._snapshots.pop(tid, None)
+            recommend(tid, msgs[i % len(msgs)])
+
+        results["recommend.cold_snapshot"] = timeit(cold, max(5, n // 50), warmup=1)
+        results["recommend.warm"] = timeit(lambda i: recommend(tid, msgs[i % len(msgs)]), n)
+        # bcrypt per candidate key: keep the count small
+        results["auth.find_api_key"] = timeit(lambda i: find_api_key(raw_key), max(3, n // 100), warmup=1)
+        results["auth.authenticate_cached"] = timeit(lambda i: authenticate(raw_key), n)
+
+        results["cache.set"] = timeit(lambda i: cache.set("bench", str(i % 1000), {"i": i, "v": "x" * 64}, 60), n)
+        results["cache.get_hit"] = timeit(lambda i: cache.get("bench", str(i % 1000)), n)
+        results["cache.get_miss"] = timeit(lambda i: cache.get("bench", f"missing{i}"), n)
+
+    results.update(json_payloads(app, tid, n))
+
+    with app.test_request_context("/v1/chat/message", method="POST"):
+        g.api_key = raw_key
+        g.rate_limit_rpm = 10**9
+        results["ratelimit.check"] = timeit(lambda i: check_rate_limit(scope="bench"), n)
+    return results
+
+
+
+def _floats(obj):
+    """Copy of a payload with Decimals as floats (the old per-field conversion)."""
+    if isinstance(obj, dict):
+        return {k: _floats(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_floats(v) for v in obj]
+    return float(obj) if isinstance(obj, Decimal) else obj
+
+
+def json_payloads(app: Flask, tenant_id: int, n: int = 500) -> Dict[str, Dict[str, float]]:
+    """jsonify cost of an admin product page (500 rows) and a chat reply, per provider.
+
+    The stdlib provider gets prices already converted to float, as the routes
+    produced them before FastJSONProvider.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    with app.app_context():
+        rows = (
+            db.session.query(Product)
+            .filter(Product.tenant_id == tenant_id)
+            .order_by(Product.id.desc())
+            .limit(500)
+            .all()
+        )
+        cards = [_product_card(p) for p in rows[:5]]
+        payloads = {
+            "admin_products_500": ({"items": [serialize_product(p) for p in rows], "next_cursor": None}, max(20, n // 5)),
+            "chat_reply": ({
+                "conversation_id": 1,
+                "messages": [{"role": "assistant", "type": "text", "content": "为你找到以下商品："}],
+                "products": cards,
+                "also_bought": cards[:3],
+            }, n),
+        }
+        providers = {"stdlib": DefaultJSONProvider(app), "fast": FastJSONProvider(app)}
+        for pname, provider in providers.items():
+            for name, (payload, count) in payloads.items():
+                body = _floats(payload) if pname == "stdlib" else payload
+                results[f"json.{name}.{pname}"] = timeit(lambda i: provider.response(body), count)
+    return results
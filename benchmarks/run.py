@@ -0,0 +1,109 @@
+"""Run the benchmark suite and write a JSON report.
+
+Usage:
+    python -m benchmarks.run --out bench.json                       # temp SQLite, test client
+    python -m benchmarks.run --products 20000 --rules 2000 --out big.json
+    python -m benchmarks.run --url http://127.0.0.1:5001 --skip-micro  # against gunicorn
+    python -m benchmarks.compare base.json bench.json
+
+Against --url the server must use the same DATABASE_URL, since the seeded API
+keys are only known to this process. Each run seeds fresh tenants, so reuse of
+a database is fine but grows it.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, fields
+from typing import Optional
+
+from app import create_app
+from app.config import Config, _engine_options
+from app.extensions import db
+
+from . import load, micro
+from .seed import SeedParams, seed
+
+
+def bench_app(database_url: Optional[str] = None):
+    url = database_url or os.getenv("DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp(prefix='chatbot-bench-')}/bench.db"
+
+    class BenchConfig(Config):
+        ENV = "production"
+        DEBUG = False
+        TESTING = False
+        DATABASE_URL = url
+        SQLALCHEMY_DATABASE_URI = url
+        SQLALCHEMY_ENGINE_OPTIONS = _engine_options(url) or {"connect_args": {"timeout": 30}}
+        AUTO_BOOTSTRAP = False
+        AUTO_CREATE_DB = True
+        JOBS_BACKEND = "worker"  # no stray background threads during timing
+
+    return create_app(BenchConfig)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "") if out.returncode == 0 else None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="chatbot hot-path benchmarks")
+    for f in fields(SeedParams):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=int, default=f.default)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--iterations", type=int, default=500, help="calls per microbenchmark")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--url", default=None, help="load a running server instead of the test client")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--out", default=None, help="report path (default: stdout)")
+    args = parser.parse_args(argv)
+
+    params = SeedParams(**{f.name: getattr(args, f.name) for f in fields(SeedParams)})
+    app = bench_app(args.database_url)
+    t0 = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        seeded = seed(params)
+    seed_seconds = time.perf_counter() - t0
+
+    report = {
+        "schema": 1,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "database": app.config["SQLALCHEMY_DATABASE_URI"].split("://", 1)[0],
+        "params": dict(asdict(params), iterations=args.iterations, threads=args.threads, duration=args.duration),
+        "seed_seconds": round(seed_seconds, 2),
+        "micro": {},
+        "load": None,
+    }
+    if not args.skip_micro:
+        report["micro"] = micro.run(app, seeded, n=args.iterations)
+    if not args.skip_load:
+        report["load"] = load.run(seeded, app=app, url=args.url, threads=args.threads, duration=args.duration, seed=params.seed)
+
+    out = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+        print(f"wrote {args.out}", file=sys.stderr)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
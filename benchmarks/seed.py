@@ -0,0 +1,140 @@
+"""Deterministic synthetic tenants for benchmarks (same shape as scripts/init_sqlite.py).
+
+Usage:
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed --tenants 2 --products 5000 --rules 500
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from typing import Dict, List
+
+import bcrypt
+
+from app.extensions import db
+from app.models import ApiKey, KeywordRule, Product, Setting, Synonym, Tenant
+
+CATEGORIES = [
+    ("蓝牙耳机", "藍牙耳機"), ("耳机", "耳機"), ("充电器", "充電器"), ("数据线", "數據線"),
+    ("移动电源", "行動電源"), ("手机壳", "手機殼"), ("键盘", "鍵盤"), ("鼠标", "滑鼠"),
+    ("音箱", "音箱"), ("智能手表", "智慧手錶"), ("显示器", "顯示器"), ("路由器", "路由器"),
+]
+ADJECTIVES = ["无线", "快充", "降噪", "轻薄", "旗舰", "入门", "运动", "商务", "迷你", "专业"]
+
+
+@dataclass
+class SeedParams:
+    tenants: int = 1
+    products: int = 2000
+    rules: int = 200
+    synonyms: int = 50
+    keys: int = 3
+    bcrypt_rounds: int = 4
+    seed: int = 42
+
+
+@dataclass
+class Seeded:
+    params: Dict
+    tenant_ids: List[int] = field(default_factory=list)
+    # raw API keys, keyed by tenant id (only known at seed time)
+    api_keys: Dict[int, List[str]] = field(default_factory=dict)
+    product_ids: Dict[int, List[int]] = field(default_factory=dict)
+    messages: List[str] = field(default_factory=list)
+
+
+def sample_messages(rng: random.Random, n: int = 200) -> List[str]:
+    """Chat inputs mixing exact triggers, traditional-script variants, fuzzy misses and no-hits."""
+    out = []
+    for _ in range(n):
+        simp, trad = rng.choice(CATEGORIES)
+        kind = rng.random()
+        if kind < 0.4:
+            out.append(f"想买{rng.choice(ADJECTIVES)}{simp}")
+        elif kind < 0.6:
+            out.append(f"有沒有{trad}推薦？")
+        elif kind < 0.8:
+            out.append(simp[:-1] + "吗")
+        else:
+            out.append(f"随便看看 {rng.randint(1, 9999)}")
+    return out
+
+
+def seed(params: SeedParams) -> Seeded:
+    """Create params.tenants tenants with products, rules, synonyms and keys; returns what callers need."""
+    rng = random.Random(params.seed)
+    result = Seeded(params=asdict(params))
+    for t in range(params.tenants):
+        tenant = Tenant(name=f"bench-{params.seed}-{t}")
+        db.session.add(tenant)
+        db.session.flush()
+        result.tenant_ids.append(tenant.id)
+
+        raw_keys = []
+        for k in range(params.keys):
+            raw = f"bench_{tenant.id}_{k}_{rng.getrandbits(48):012x}"
+            key_hash = bcrypt.hashpw(raw.encode("utf-8"), bcrypt.gensalt(rounds=params.bcrypt_rounds))
+            db.session.add(ApiKey(tenant_id=tenant.id, key_hash=key_hash, label=f"bench{k}", rate_limit_rpm=10**9, is_active=True))
+            raw_keys.append(raw)
+        result.api_keys[tenant.id] = raw_keys
+
+        products = []
+        for i in range(params.products):
+            simp, trad = CATEGORIES[i % len(CATEGORIES)]
+            products.append(Product(
+                tenant_id=tenant.id,
+                sku=f"B{t}-{i:07d}",
+                name=f"{rng.choice(ADJECTIVES)}{simp} {i}",
+                price=Decimal(rng.randint(900, 99900)) / 100,
+                currency="CNY",
+                stock=rng.randint(0, 500),
+                is_active=rng.random() > 0.05,
+                tags=[simp, trad],
+            ))
+        db.session.add_all(products)
+        db.session.flush()
+        ids = [p.id for p in products]
+        result.product_ids[tenant.id] = ids
+
+        for r in range(params.rules):
+            simp, trad = CATEGORIES[r % len(CATEGORIES)]
+            trigger = simp if r < len(CATEGORIES) else f"{rng.choice(ADJECTIVES)}{simp}{r}"
+            db.session.add(KeywordRule(
+                tenant_id=tenant.id,
+                trigger_text=trigger,
+                match_type=rng.choice(["contains", "contains", "contains", "prefix", "exact"]),
+                priority=rng.randint(0, 100),
+                product_ids=rng.sample(ids, min(len(ids), rng.randint(1, 8))),
+                response_text=f"为你推荐以下{simp}：",
+                is_active=True,
+            ))
+        for s in range(params.synonyms):
+            simp, trad = CATEGORIES[s % len(CATEGORIES)]
+            term = trad if s < len(CATEGORIES) else f"{trad}{s}"
+            db.session.add(Synonym(tenant_id=tenant.id, term=term, synonyms=[simp]))
+        db.session.add(Setting(tenant_id=tenant.id, key="default_reply_text", value="暫時沒有找到相關商品。"))
+        db.session.commit()
+
+    result.messages = sample_messages(rng)
+    return result
+
+
+def main():
+    from .run import bench_app
+
+    parser = argparse.ArgumentParser(description="seed synthetic benchmark tenants")
+    for name, default in asdict(SeedParams()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    args = parser.parse_args()
+    app = bench_app()
+    with app.app_context():
+        db.create_all()
+        seeded = seed(SeedParams(**vars(args)))
+    for tid in seeded.tenant_ids:
+        print(f"tenant {tid}: {len(seeded.product_ids[tid])} products, keys: {', '.join(seeded.api_keys[tid])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ CREATE TABLE IF NOT EXISTS tenants (
   id            BIGINT PRIMARY KEY AUTO_INCREMENT,
   name          VARCHAR(120) NOT NULL,
   status        ENUM('active','disabled') NOT NULL DEFAULT 'active',
+  config_version INT NOT NULL DEFAULT 1, -- bumped on admin writes (ETags, caches)
   created_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 ) ENGINE=InnoDB;
@@ -22,6 +23,7 @@ CREATE TABLE IF NOT EXISTS api_keys (
   rate_limit_rpm  INT NOT NULL DEFAULT 60,
   is_active       BOOLEAN NOT NULL DEFAULT TRUE,
   created_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_api_keys_active (is_active),
   FOREIGN KEY (tenant_id) REFERENCES tenants(id)
 ) ENGINE=InnoDB;
 
@@ -29,7 +31,7 @@ CREATE TABLE IF NOT EXISTS api_keys (
 CREATE TABLE IF NOT EXISTS products (
   id          BIGINT PRIMARY KEY AUTO_INCREMENT,
   tenant_id   BIGINT NOT NULL,
-  sku         VARCHAR(64) UNIQUE,
+  sku         VARCHAR(64) NULL,
   name        VARCHAR(255) NOT NULL,
   description TEXT NULL,
   price       DECIMAL(10,2) NOT NULL,
@@ -38,9 +40,13 @@ CREATE TABLE IF NOT EXISTS products (
   stock       INT NOT NULL DEFAULT 0,
   is_active   BOOLEAN NOT NULL DEFAULT TRUE,
   tags        JSON NULL,
+  content_hash CHAR(64) NULL,
   created_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   INDEX idx_products_tenant (tenant_id),
+  UNIQUE KEY uniq_products_tenant_sku (tenant_id, sku),
+  INDEX idx_products_tenant_active (tenant_id, is_active, id),
+  INDEX idx_products_tenant_name (tenant_id, name),
   FULLTEXT INDEX ftx_products_name_desc (name, description),
   FOREIGN KEY (tenant_id) REFERENCES tenants(id)
 ) ENGINE=InnoDB;
@@ -60,6 +66,9 @@ CREATE TABLE IF NOT EXISTS keyword_rules (
   updated_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   INDEX idx_rules_tenant (tenant_id),
   INDEX idx_rules_trigger (trigger_text),
+  INDEX idx_rules_tenant_active_priority (tenant_id, is_active, priority),
+  INDEX idx_rules_tenant_priority (tenant_id, priority, id),
+  INDEX idx_rules_tenant_trigger (tenant_id, trigger_text),
   FOREIGN KEY (tenant_id) REFERENCES tenants(id)
 ) ENGINE=InnoDB;
 
@@ -113,6 +122,7 @@ CREATE TABLE IF NOT EXISTS carts (
   created_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   INDEX idx_carts_tenant (tenant_id),
+  INDEX idx_carts_tenant_status_conv (tenant_id, status, conversation_id),
   FOREIGN KEY (tenant_id) REFERENCES tenants(id),
   FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
@@ -130,6 +140,125 @@ CREATE TABLE IF NOT EXISTS cart_items (
   FOREIGN KEY (product_id) REFERENCES products(id)
 ) ENGINE=InnoDB;
 
--- Helpful indices for product lookup by tag/name
-CREATE INDEX IF NOT EXISTS idx_products_active ON products(is_active);
+-- Settings (per-tenant key/value)
+CREATE TABLE IF NOT EXISTS settings (
+  id          BIGINT PRIMARY KEY AUTO_INCREMENT,
+  tenant_id   BIGINT NOT NULL,
+  `key`       VARCHAR(64) NOT NULL,
+  value       JSON NULL,
+  created_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY uniq_settings_tenant_key (tenant_id, `key`),
+  FOREIGN KEY (tenant_id) REFERENCES tenants(id)
+) ENGINE=InnoDB;
+
+-- Cart co-occurrence ("also bought"), maintained by scripts/build_cooccurrence.py
+CREATE TABLE IF NOT EXISTS product_pairs (
+  tenant_id   BIGINT NOT NULL,
+  product_id  BIGINT NOT NULL,
+  other_id    BIGINT NOT NULL,
+  count       INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (tenant_id, product_id, other_id),
+  INDEX idx_pairs_tenant_product_count (tenant_id, product_id, count)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS product_neighbors (
+  tenant_id   BIGINT NOT NULL,
+  product_id  BIGINT NOT NULL,
+  neighbors   JSON NOT NULL,
+  updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (tenant_id, product_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS reco_state (
+  tenant_id          BIGINT PRIMARY KEY,
+  last_cart_item_id  BIGINT NOT NULL DEFAULT 0,
+  updated_at         TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Popularity scores (used when Redis is not configured)
+CREATE TABLE IF NOT EXISTS product_popularity (
+  tenant_id   BIGINT NOT NULL,
+  product_id  BIGINT NOT NULL,
+  score       DOUBLE NOT NULL DEFAULT 0,
+  updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (tenant_id, product_id),
+  INDEX idx_popularity_tenant_score (tenant_id, score)
+) ENGINE=InnoDB;
+
+-- External catalog sync: per-page validators (ETag / Last-Modified)
+CREATE TABLE IF NOT EXISTS sync_state (
+  id             BIGINT PRIMARY KEY AUTO_INCREMENT,
+  tenant_id      BIGINT NOT NULL,
+  url_hash       CHAR(64) NOT NULL,
+  url            TEXT NOT NULL,
+  etag           VARCHAR(255) NULL,
+  last_modified  VARCHAR(64) NULL,
+  next_url       TEXT NULL,
+  updated_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY uniq_sync_state_tenant_url (tenant_id, url_hash),
+  FOREIGN KEY (tenant_id) REFERENCES tenants(id)
+) ENGINE=InnoDB;
+
+-- Background jobs (imports, syncs, rebuilds); see app/jobs.py and scripts/worker.py
+CREATE TABLE IF NOT EXISTS jobs (
+  id                BIGINT PRIMARY KEY AUTO_INCREMENT,
+  tenant_id         BIGINT NOT NULL,
+  kind              VARCHAR(64) NOT NULL,
+  status            ENUM('queued','running','succeeded','failed','cancelled') NOT NULL DEFAULT 'queued',
+  payload           JSON NULL,
+  result            JSON NULL,
+  error             TEXT NULL,
+  progress_done     INT NOT NULL DEFAULT 0,
+  progress_total    INT NULL,
+  cancel_requested  BOOLEAN NOT NULL DEFAULT FALSE,
+  attempts          INT NOT NULL DEFAULT 0,
+  worker            VARCHAR(128) NULL,
+  created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at        TIMESTAMP NULL,
+  heartbeat_at      TIMESTAMP NULL,
+  finished_at       TIMESTAMP NULL,
+  INDEX idx_jobs_status_id (status, id),
+  INDEX idx_jobs_tenant_id (tenant_id, id),
+  FOREIGN KEY (tenant_id) REFERENCES tenants(id)
+) ENGINE=InnoDB;
+
+-- Deploy markers: `flask deploy` records the schema fingerprint here so
+-- workers skip create_all/bootstrap on boot (see app/bootstrap.py)
+CREATE TABLE IF NOT EXISTS app_meta (
+  `key`       VARCHAR(64) PRIMARY KEY,
+  value       VARCHAR(255) NOT NULL,
+  updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Retention archive (RETENTION_ARCHIVE=table): one row per deleted
+-- conversation, payload = gzipped JSON of the conversation and its messages
+CREATE TABLE IF NOT EXISTS conversation_archive (
+  id               BIGINT PRIMARY KEY AUTO_INCREMENT,
+  tenant_id        BIGINT NOT NULL,
+  conversation_id  BIGINT NOT NULL,
+  message_count    INT NOT NULL DEFAULT 0,
+  created_at       TIMESTAMP NULL,
+  updated_at       TIMESTAMP NULL,
+  archived_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  payload          LONGBLOB NOT NULL,
+  INDEX idx_conv_archive_tenant (tenant_id, conversation_id),
+  FOREIGN KEY (tenant_id) REFERENCES tenants(id)
+) ENGINE=InnoDB;
+
+-- Chat analytics rollup: counters per tenant/kind/hour bucket (used when
+-- Redis is not configured; see app/services/analytics.py)
+CREATE TABLE IF NOT EXISTS analytics_rollup (
+  tenant_id     BIGINT NOT NULL,
+  kind          VARCHAR(16) NOT NULL,
+  bucket_start  DATETIME NOT NULL,
+  `key`         VARCHAR(128) NOT NULL,
+  count         INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (tenant_id, kind, bucket_start, `key`)
+) ENGINE=InnoDB;
+
+-- Hot query shapes are covered by the composite indexes above; see
+-- migrations/versions/0002_composite_indexes.py and scripts/check_query_plans.py.
+-- Databases created from this file can adopt migrations with:
+--   flask db stamp 0010_conversation_archive
 
@@ -0,0 +1,49 @@
+# Gunicorn settings, overridable per environment.
+#
+# Default is the threaded worker (2 workers x 4 threads, as before).
+# GUNICORN_WORKER_CLASS=gevent switches to cooperative workers: each worker
+# multiplexes up to GUNICORN_WORKER_CONNECTIONS requests while they wait on
+# the DB, Redis or upstream HTTP (see app/concurrency.py).
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "500"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+
+
+def post_worker_init(worker):
+    # warm the busiest tenants before this worker accepts connections
+    # (see app/warmup.py) and, with JOBS_BACKEND=thread, start the stale-job
+    # sweep (see app/jobs.py); a hook, so CLI imports of wsgi skip both
+    from wsgi import app
+    from app.jobs import start_local_sweeper
+    from app.warmup import warm_up
+
+    if app.config.get("WARMUP_ON_BOOT"):
+        warm_up(app)
+    start_local_sweeper(app)
+
+
+def worker_exit(server, worker):
+    # publish this worker's last metric counts before it goes (see app/metrics.py)
+    from app import metrics
+
+    metrics.flush()
+
+
+def on_starting(server):
+    # drop per-worker metric snapshots from a previous run (see app/metrics.py)
+    import glob
+    import tempfile
+
+    d = os.getenv("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "chatbot_metrics")
+    for path in glob.glob(os.path.join(d, "*.json")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
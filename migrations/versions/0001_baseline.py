@@ -0,0 +1,162 @@
+"""baseline schema (tables as created by db.create_all before migrations)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+Existing databases provisioned through ``db.create_all()`` or ``db/schema.sql``
+should be stamped at this revision (``flask db stamp 0001_baseline``) and then
+upgraded; fresh databases can run ``flask db upgrade`` from scratch.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tenants',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('status', sa.Enum('active', 'disabled', name='tenant_status'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_table(
+        'api_keys',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('key_hash', sa.LargeBinary(length=128), nullable=False),
+        sa.Column('label', sa.String(length=120)),
+        sa.Column('rate_limit_rpm', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_table(
+        'products',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('sku', sa.String(length=64), unique=True),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('price', sa.Numeric(10, 2), nullable=False),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('image_url', sa.String(length=512)),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('tags', sa.JSON()),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_products_tenant_id', 'products', ['tenant_id'])
+    op.create_table(
+        'keyword_rules',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('trigger_text', sa.String(length=255), nullable=False),
+        sa.Column('match_type', sa.Enum('exact', 'prefix', 'contains', 'regex', name='match_type'), nullable=False),
+        sa.Column('locale', sa.String(length=10)),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('product_ids', sa.JSON()),
+        sa.Column('response_text', sa.String(length=500)),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_keyword_rules_tenant_id', 'keyword_rules', ['tenant_id'])
+    op.create_index('ix_keyword_rules_trigger_text', 'keyword_rules', ['trigger_text'])
+    op.create_table(
+        'synonyms',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('term', sa.String(length=255), nullable=False),
+        sa.Column('synonyms', sa.JSON(), nullable=False),
+        sa.Column('locale', sa.String(length=10)),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_synonyms_tenant_id', 'synonyms', ['tenant_id'])
+    op.create_index('ix_synonyms_term', 'synonyms', ['term'])
+    op.create_table(
+        'conversations',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('external_user_id', sa.String(length=120)),
+        sa.Column('session_token', sa.String(length=120)),
+        sa.Column('status', sa.Enum('open', 'closed', name='conv_status'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_conversations_tenant_id', 'conversations', ['tenant_id'])
+    op.create_table(
+        'messages',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('conversation_id', sa.Integer(), sa.ForeignKey('conversations.id'), nullable=False),
+        sa.Column('role', sa.Enum('user', 'assistant', 'system', name='msg_role'), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('content_type', sa.Enum('text', 'json', name='msg_type'), nullable=False),
+        sa.Column('metadata', sa.JSON()),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_messages_conversation_id', 'messages', ['conversation_id'])
+    op.create_table(
+        'carts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('conversation_id', sa.Integer(), sa.ForeignKey('conversations.id')),
+        sa.Column('external_user_id', sa.String(length=120)),
+        sa.Column('status', sa.Enum('open', 'checked_out', 'abandoned', name='cart_status'), nullable=False),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_carts_tenant_id', 'carts', ['tenant_id'])
+    op.create_table(
+        'cart_items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('cart_id', sa.Integer(), sa.ForeignKey('carts.id'), nullable=False),
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('unit_price', sa.Numeric(10, 2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_cart_items_cart_id', 'cart_items', ['cart_id'])
+    op.create_table(
+        'settings',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.JSON()),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_settings_tenant_id', 'settings', ['tenant_id'])
+
+
+def downgrade():
+    op.drop_table('settings')
+    op.drop_table('cart_items')
+    op.drop_table('carts')
+    op.drop_table('messages')
+    op.drop_table('conversations')
+    op.drop_table('synonyms')
+    op.drop_table('keyword_rules')
+    op.drop_table('products')
+    op.drop_table('api_keys')
+    op.drop_table('tenants')
@@ -0,0 +1,118 @@
+"""composite indexes for hot query shapes; per-tenant sku uniqueness
+
+Revision ID: 0002_composite_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-19 09:30:00
+
+Every index below backs a query in ``app/routes`` or
+``app/services/recommendation.py``; ``scripts/check_query_plans.py`` runs
+EXPLAIN over the same query shapes and fails on a full scan.
+
+``products.sku`` was unique across *all* tenants, so two shops could not
+share a SKU. It becomes unique per tenant, which also gives import upserts
+their ``(tenant_id, sku)`` lookup index.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_composite_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, unique)
+INDEXES = [
+    # fallback_search / fetch_products_by_ids / admin listing with active filter
+    ('idx_products_tenant_active', 'products', ['tenant_id', 'is_active', 'id'], False),
+    # JSON/CSV import lookups when no sku is given
+    ('idx_products_tenant_name', 'products', ['tenant_id', 'name'], False),
+    # match_rules / fuzzy_rules: active rules of a tenant by priority
+    ('idx_rules_tenant_active_priority', 'keyword_rules', ['tenant_id', 'is_active', 'priority'], False),
+    # list_rules / export ordering
+    ('idx_rules_tenant_priority', 'keyword_rules', ['tenant_id', 'priority', 'id'], False),
+    # CSV rule import upsert by trigger
+    ('idx_rules_tenant_trigger', 'keyword_rules', ['tenant_id', 'trigger_text'], False),
+    # find_api_key scans active keys only
+    ('idx_api_keys_active', 'api_keys', ['is_active'], False),
+    # add_item: open cart of a conversation
+    ('idx_carts_tenant_status_conv', 'carts', ['tenant_id', 'status', 'conversation_id'], False),
+    # add_item: existing line for (cart, product); mirrors db/schema.sql
+    ('uniq_cart_product', 'cart_items', ['cart_id', 'product_id'], True),
+    # transcript reads; mirrors db/schema.sql
+    ('idx_msgs_conv', 'messages', ['conversation_id', 'created_at'], False),
+    # settings lookups by key
+    ('uniq_settings_tenant_key', 'settings', ['tenant_id', 'key'], True),
+]
+
+
+def _existing_indexes(bind, table):
+    insp = sa.inspect(bind)
+    names = {ix['name'] for ix in insp.get_indexes(table)}
+    names.update(uc['name'] for uc in insp.get_unique_constraints(table) if uc.get('name'))
+    return names
+
+
+def _global_sku_unique_name(bind):
+    insp = sa.inspect(bind)
+    for uc in insp.get_unique_constraints('products'):
+        if uc['column_names'] == ['sku']:
+            return uc.get('name')
+    for ix in insp.get_indexes('products'):
+        if ix.get('unique') and ix['column_names'] == ['sku']:
+            return ix['name']
+    return None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # sku: global unique -> unique per tenant
+    if bind.dialect.name == 'sqlite':
+        # SQLite cannot drop constraints in place; batch mode recreates the
+        # table. The naming convention names the anonymous UNIQUE(sku).
+        with op.batch_alter_table(
+            'products',
+            recreate='always',
+            naming_convention={'uq': 'uq_%(table_name)s_%(column_0_name)s'},
+        ) as batch_op:
+            batch_op.drop_constraint('uq_products_sku', type_='unique')
+            batch_op.create_unique_constraint('uniq_products_tenant_sku', ['tenant_id', 'sku'])
+    else:
+        name = _global_sku_unique_name(bind)
+        if name:
+            if bind.dialect.name == 'mysql':
+                op.drop_index(name, table_name='products')
+            else:
+                op.drop_constraint(name, 'products', type_='unique')
+        op.create_unique_constraint('uniq_products_tenant_sku', 'products', ['tenant_id', 'sku'])
+
+    # Some of these already exist on databases created from db/schema.sql
+    seen: dict[str, set] = {}
+    for name, table, cols, unique in INDEXES:
+        if table not in seen:
+            seen[table] = _existing_indexes(bind, table)
+        if name in seen[table]:
+            continue
+        op.create_index(name, table, cols, unique=unique)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for name, table, _cols, _unique in reversed(INDEXES):
+        if name in _existing_indexes(bind, table):
+            op.drop_index(name, table_name=table)
+
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('products', recreate='always') as batch_op:
+            batch_op.drop_constraint('uniq_products_tenant_sku', type_='unique')
+            batch_op.create_unique_constraint('uq_products_sku', ['sku'])
+    else:
+        if bind.dialect.name == 'mysql':
+            op.drop_index('uniq_products_tenant_sku', table_name='products')
+        else:
+            op.drop_constraint('uniq_products_tenant_sku', 'products', type_='unique')
+        op.create_unique_constraint('uq_products_sku', 'products', ['sku'])
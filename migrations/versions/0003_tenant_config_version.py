@@ -0,0 +1,26 @@
+"""tenants.config_version: bumped on every admin write
+
+Revision ID: 0003_tenant_config_version
+Revises: 0002_composite_indexes
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_tenant_config_version'
+down_revision = '0002_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tenants') as batch_op:
+        batch_op.add_column(sa.Column('config_version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('tenants') as batch_op:
+        batch_op.drop_column('config_version')
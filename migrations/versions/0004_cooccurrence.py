@@ -0,0 +1,47 @@
+"""product_pairs, product_neighbors, reco_state for "also bought"
+
+Revision ID: 0004_cooccurrence
+Revises: 0003_tenant_config_version
+Create Date: 2026-10-19 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_cooccurrence'
+down_revision = '0003_tenant_config_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'product_pairs',
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), primary_key=True),
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), primary_key=True),
+        sa.Column('other_id', sa.Integer(), sa.ForeignKey('products.id'), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('idx_pairs_tenant_product_count', 'product_pairs', ['tenant_id', 'product_id', 'count'])
+    op.create_table(
+        'product_neighbors',
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), primary_key=True),
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), primary_key=True),
+        sa.Column('neighbors', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        'reco_state',
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), primary_key=True),
+        sa.Column('last_cart_item_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('reco_state')
+    op.drop_table('product_neighbors')
+    op.drop_index('idx_pairs_tenant_product_count', table_name='product_pairs')
+    op.drop_table('product_pairs')
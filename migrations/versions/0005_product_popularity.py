@@ -0,0 +1,32 @@
+"""product_popularity: flushed impression / cart-add counters
+
+Revision ID: 0005_product_popularity
+Revises: 0004_cooccurrence
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_product_popularity'
+down_revision = '0004_cooccurrence'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'product_popularity',
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), primary_key=True),
+        sa.Column('product_id', sa.Integer(), primary_key=True),
+        sa.Column('score', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('idx_popularity_tenant_score', 'product_popularity', ['tenant_id', 'score'])
+
+
+def downgrade():
+    op.drop_index('idx_popularity_tenant_score', table_name='product_popularity')
+    op.drop_table('product_popularity')
@@ -0,0 +1,40 @@
+"""products.content_hash and sync_state for incremental catalog sync
+
+Revision ID: 0006_catalog_sync
+Revises: 0005_product_popularity
+Create Date: 2026-10-19 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_catalog_sync'
+down_revision = '0005_product_popularity'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_table(
+        'sync_state',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('url_hash', sa.String(length=64), nullable=False),
+        sa.Column('url', sa.Text(), nullable=False),
+        sa.Column('etag', sa.String(length=255), nullable=True),
+        sa.Column('last_modified', sa.String(length=64), nullable=True),
+        sa.Column('next_url', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('tenant_id', 'url_hash', name='uniq_sync_state_tenant_url'),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade():
+    op.drop_table('sync_state')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('content_hash')
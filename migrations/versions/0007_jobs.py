@@ -0,0 +1,48 @@
+"""jobs table for the background job runner
+
+Revision ID: 0007_jobs
+Revises: 0006_catalog_sync
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_jobs'
+down_revision = '0006_catalog_sync'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('kind', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.Enum('queued', 'running', 'succeeded', 'failed', 'cancelled', name='job_status'),
+                  nullable=False, server_default='queued'),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('progress_done', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('progress_total', sa.Integer(), nullable=True),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('worker', sa.String(length=128), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('idx_jobs_status_id', 'jobs', ['status', 'id'])
+    op.create_index('idx_jobs_tenant_id', 'jobs', ['tenant_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_jobs_tenant_id', table_name='jobs')
+    op.drop_index('idx_jobs_status_id', table_name='jobs')
+    op.drop_table('jobs')
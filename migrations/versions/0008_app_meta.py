@@ -0,0 +1,29 @@
+"""app_meta: deploy markers so workers skip schema/bootstrap work on boot
+
+Revision ID: 0008_app_meta
+Revises: 0007_jobs
+Create Date: 2026-10-19 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_app_meta'
+down_revision = '0007_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'app_meta',
+        sa.Column('key', sa.String(length=64), primary_key=True),
+        sa.Column('value', sa.String(length=255), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table('app_meta')
@@ -0,0 +1,31 @@
+"""analytics_rollup: time-bucketed query / rule-hit / zero-result counters
+
+Revision ID: 0009_analytics_rollup
+Revises: 0008_app_meta
+Create Date: 2026-10-19 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_analytics_rollup'
+down_revision = '0008_app_meta'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'analytics_rollup',
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), primary_key=True),
+        sa.Column('kind', sa.String(length=16), primary_key=True),
+        sa.Column('bucket_start', sa.DateTime(), primary_key=True),
+        sa.Column('key', sa.String(length=128), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('analytics_rollup')
@@ -0,0 +1,36 @@
+"""conversation_archive: retention target for deleted conversations
+
+Revision ID: 0010_conversation_archive
+Revises: 0009_analytics_rollup
+Create Date: 2026-10-20 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_conversation_archive'
+down_revision = '0009_analytics_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conversation_archive',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), nullable=False),
+        sa.Column('conversation_id', sa.Integer(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.Column('archived_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('payload', sa.LargeBinary(length=2**32 - 1), nullable=False),
+    )
+    op.create_index('idx_conv_archive_tenant', 'conversation_archive', ['tenant_id', 'conversation_id'])
+
+
+def downgrade():
+    op.drop_index('idx_conv_archive_tenant', table_name='conversation_archive')
+    op.drop_table('conversation_archive')
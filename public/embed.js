@@ -15,19 +15,25 @@
       </div></div>';
   document.body.appendChild(panel);
   var conversationId = localStorage.getItem('cb_conversation_id') || null;
+  // issued with the conversation; required to continue it or read its history
+  var conversationToken = localStorage.getItem('cb_conversation_token') || null;
+  function forgetConversation(){
+    try { localStorage.removeItem('cb_conversation_id'); localStorage.removeItem('cb_conversation_token'); } catch (e) {}
+    conversationId = null; conversationToken = null;
+  }
   var welcomed = false;
   var welcomeText = null;
   // Expose a reset helper for admin page
   window.ChatbotEmbedReset = async function(){
     try {
       if (conversationId){
-        await fetch(API_BASE.replace(/\/$/, '') + '/chat/reset', { method:'POST', headers: { 'Content-Type':'application/json','X-API-Key':API_KEY }, body: JSON.stringify({ conversation_id: conversationId }) });
+        await fetch(API_BASE.replace(/\/$/, '') + '/chat/reset', { method:'POST', headers: { 'Content-Type':'application/json','X-API-Key':API_KEY }, body: JSON.stringify({ conversation_id: conversationId, conversation_token: conversationToken }) });
       }
     } catch (e) {}
-    try { localStorage.removeItem('cb_conversation_id'); } catch (e) {}
-    conversationId = null;
+    forgetConversation();
     welcomed = false;
     welcomeText = null;
+    historyLoaded = true;
     var m = msgs(); if (m) m.innerHTML = '';
     if (panel && panel.style.display !== 'none') { ensureWelcome(); }
   };
@@ -42,12 +48,44 @@
     b.style.fontSize='14px'; b.textContent=text; wrap.appendChild(b); return wrap;
   }
   function addMsg(who, text){ msgs().appendChild(bubble(who, text)); msgs().scrollTop=msgs().scrollHeight; }
-  async function ensureWelcome(){
+  // Settings are revalidated on every open with If-None-Match; an unchanged
+  // version costs the server a 304 with no body.
+  var SETTINGS_CACHE_KEY = 'cb_settings:' + API_BASE + ':' + API_KEY;
+  var settingsCache = null;
+  try { settingsCache = JSON.parse(localStorage.getItem(SETTINGS_CACHE_KEY) || 'null'); } catch (e) {}
+  async function loadSettings(){
+    var headers = { 'X-API-Key': API_KEY };
+    if (settingsCache && settingsCache.etag) headers['If-None-Match'] = settingsCache.etag;
     try{
-      // Always refetch to reflect latest admin changes
-      const res = await fetch(API_BASE.replace(/\/$/, '') + '/settings', { headers: { 'X-API-Key': API_KEY }});
-      if(res.ok){ const data = await res.json(); welcomeText = (data && data.welcome_text) || null; }
+      const res = await fetch(API_BASE.replace(/\/$/, '') + '/settings', { headers: headers, cache: 'no-store' });
+      if(res.status === 304 && settingsCache) return settingsCache.data;
+      if(res.ok){
+        const data = await res.json();
+        settingsCache = { etag: res.headers.get('ETag'), data: data };
+        try { localStorage.setItem(SETTINGS_CACHE_KEY, JSON.stringify(settingsCache)); } catch (e) {}
+        return data;
+      }
     }catch(e){}
+    return settingsCache ? settingsCache.data : null;
+  }
+  // A page refresh keeps cb_conversation_id/_token; restore the transcript once per load
+  var historyLoaded = false;
+  async function loadHistory(){
+    if(historyLoaded || !conversationId) return;
+    if(!conversationToken){ forgetConversation(); historyLoaded = true; return; }
+    historyLoaded = true;
+    try{
+      const res = await fetch(API_BASE.replace(/\/$/, '') + '/conversations/' + encodeURIComponent(conversationId) + '/messages?limit=30', { headers: { 'X-API-Key': API_KEY, 'X-Conversation-Token': conversationToken } });
+      if(res.status === 404){ forgetConversation(); return; }
+      if(!res.ok) return;
+      const data = await res.json();
+      (data.items||[]).forEach(function(m){ if(m.type==='text') addMsg(m.role==='user'?'user':'assistant', m.content); });
+    }catch(e){}
+  }
+  async function ensureWelcome(){
+    await loadHistory();
+    var data = await loadSettings();
+    welcomeText = (data && data.welcome_text) || null;
     if(!conversationId && !welcomed){
       // 首次會話，同步以氣泡再提示一次
       addMsg('assistant', welcomeText || '嗨～我可以幫你快速找商品。試試輸入關鍵字：藍牙耳機、耳機、充電器…');
@@ -70,23 +108,113 @@
     var visible = panel.style.display !== 'none';
     panel.style.display = visible ? 'none' : 'block';
     if(!visible){ ensureWelcome().then(function(){
-      // load suggestions from settings
-      fetch(API_BASE.replace(/\/$/, '') + '/settings', { headers: { 'X-API-Key': API_KEY }}).then(function(r){ return r.json(); }).then(function(d){
-        if (d && Array.isArray(d.suggested_queries)) renderChips(d.suggested_queries);
-      }).catch(function(){});
+      // suggestions come from the settings loaded by ensureWelcome
+      var d = settingsCache && settingsCache.data;
+      if (d && Array.isArray(d.suggested_queries)) renderChips(d.suggested_queries);
     }); }
   };
+  function setConversation(id, token){
+    if(id && id!==conversationId){ conversationId = id; localStorage.setItem('cb_conversation_id', conversationId); }
+    if(token && token!==conversationToken){ conversationToken = token; localStorage.setItem('cb_conversation_token', conversationToken); }
+  }
+  function newKey(){
+    try { if (window.crypto && crypto.randomUUID) return crypto.randomUUID(); } catch (e) {}
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+  }
+  function sleep(ms){ return new Promise(function(r){ setTimeout(r, ms); }); }
+  // POST with an Idempotency-Key: retries (network errors, 409 while the first try still runs, 5xx) reuse the key, so the server replays instead of writing twice
+  async function postIdempotent(path, body, key){
+    var delay = 500;
+    for (var attempt = 0; ; attempt++){
+      try {
+        var res = await fetch(API_BASE + path, { method:'POST', headers:{ 'Content-Type':'application/json','X-API-Key':API_KEY,'Idempotency-Key':key }, body: body });
+        if ((res.status === 409 || res.status >= 500) && attempt < 2){ await sleep(delay); delay *= 2; continue; }
+        return res;
+      } catch (e) {
+        if (attempt >= 2) throw e;
+        await sleep(delay); delay *= 2;
+      }
+    }
+  }
+  function clearTyping(){ var tEl=document.getElementById('typing_ind'); if(tEl){ tEl.remove(); } }
+  function addProduct(p){
+    var c=document.createElement('div'); c.style='align-self:flex-start;border:1px solid #eee;padding:8px;border-radius:8px;margin:2px 0;display:flex;gap:8px;align-items:center;font-size:13px;background:#fff;'; c.innerHTML='<img src="'+(p.image_url||'')+'" style="width:48px;height:48px;object-fit:cover;border-radius:6px"/>\
+        <div style="flex:1">'+p.name+'<div style="color:#6b7280">￥'+(((p.price||{}).value)||'')+'</div></div>\
+        <button style="background:#10b981;color:#fff;border:0;border-radius:6px;padding:6px 10px;cursor:pointer">加入</button>'; var b=c.querySelector('button'); b.onclick=async function(){ try { await postIdempotent('/cart/items', JSON.stringify({conversation_id:conversationId,product_id:p.id,quantity:1}), newKey()); } catch (e) {} }; msgs().appendChild(c); msgs().scrollTop=msgs().scrollHeight;
+  }
+  function addAlsoBought(list){
+    if(!Array.isArray(list) || !list.length) return;
+    addMsg('assistant', '常一起購買：'); list.forEach(addProduct);
+  }
+  function showError(status){
+    clearTyping();
+    addMsg('assistant', status === 429 ? '訊息太頻繁，請稍後再試。' : '暫時無法回覆，請稍後再試。');
+  }
+  // conversation_id is only sent with its token; a token the server no longer accepts
+  // (403, e.g. after a SECRET_KEY rotation) drops the stored conversation and starts over
+  function messageBody(val){
+    return JSON.stringify({conversation_id: conversationToken ? conversationId : null, conversation_token: conversationToken, message:val, locale: navigator.language});
+  }
+  async function staleConversation(res){
+    if(res.status !== 400 && res.status !== 403) return false;
+    var code;
+    try { code = ((await res.clone().json()).error || {}).code; } catch (e) { return false; }
+    if(code !== 'conversation_token_required' && code !== 'invalid_conversation_token') return false;
+    forgetConversation(); return true;
+  }
+  // Opt-in streaming (window.CHATBOT_STREAM = true): render text and cards as SSE events arrive.
+  // Returns false only when the message certainly was not handled (network failure, or no stream
+  // endpoint: 404/405, or a stale conversation), so the caller may send it again; any other response is final.
+  async function sendStreaming(body){
+    var res;
+    try { res = await fetch(API_BASE + '/chat/message/stream', { method:'POST', headers:{ 'Content-Type':'application/json','X-API-Key':API_KEY,'Accept':'text/event-stream' }, body: body }); }
+    catch (e) { return false; }
+    if(res.status === 404 || res.status === 405) return false;
+    if(await staleConversation(res)) return false;
+    if(!res.ok || !res.body){ showError(res.status); return true; }
+    var reader = res.body.getReader(); var decoder = new TextDecoder(); var buf = '';
+    function handle(block){
+      var ev = 'message', data = '';
+      block.split('\n').forEach(function(line){
+        if(line.indexOf('event:')===0) ev = line.slice(6).trim();
+        else if(line.indexOf('data:')===0) data += line.slice(5).trim();
+      });
+      if(!data) return;
+      var d = JSON.parse(data);
+      if(ev==='conversation') setConversation(d.conversation_id, d.conversation_token);
+      else if(ev==='message'){ clearTyping(); if(d.type==='text') addMsg('assistant', d.content); }
+      else if(ev==='product'){ clearTyping(); addProduct(d); }
+      else if(ev==='also_bought'){ addAlsoBought(d); }
+      else if(ev==='error'){ showError(); }
+      else if(ev==='done'){ clearTyping(); }
+    }
+    while(true){
+      var chunk = await reader.read(); if(chunk.done) break;
+      buf += decoder.decode(chunk.value, {stream:true});
+      var idx; while((idx = buf.indexOf('\n\n')) >= 0){ handle(buf.slice(0, idx)); buf = buf.slice(idx+2); }
+    }
+    clearTyping();
+    return true;
+  }
   document.getElementById('send').onclick = async function(){
     var inp = document.getElementById('inp');
     var val = (inp.value||'').trim(); if(!val) return; addMsg('user', val); inp.value='';
     // typing indicator
     var typingEl = bubble('assistant','正在為你查找…'); typingEl.id='typing_ind'; msgs().appendChild(typingEl); msgs().scrollTop=msgs().scrollHeight;
-    var res = await fetch(API_BASE + '/chat/message', { method:'POST', headers:{ 'Content-Type':'application/json','X-API-Key':API_KEY }, body: JSON.stringify({conversation_id:conversationId, message:val, locale: navigator.language}) });
-    var data = await res.json(); if(data.conversation_id && data.conversation_id!==conversationId){ conversationId = data.conversation_id; localStorage.setItem('cb_conversation_id', conversationId); }
-    var tEl=document.getElementById('typing_ind'); if(tEl){ tEl.remove(); }
+    if(window.CHATBOT_STREAM && window.ReadableStream && window.TextDecoder){
+      // fall back to the buffered endpoint only if the stream endpoint is missing or unreachable
+      try { if(await sendStreaming(messageBody(val))) return; } catch(e) { showError(); return; }
+    }
+    var res;
+    try {
+      res = await postIdempotent('/chat/message', messageBody(val), newKey());
+      if(!res.ok && await staleConversation(res)) res = await postIdempotent('/chat/message', messageBody(val), newKey());
+    } catch (e) { showError(); return; }
+    if(!res.ok){ showError(res.status); return; }
+    var data = await res.json(); setConversation(data.conversation_id, data.conversation_token);
+    clearTyping();
     (data.messages||[]).forEach(function(m){ if(m.type==='text') addMsg('assistant', m.content); });
-    (data.products||[]).forEach(function(p){ var c=document.createElement('div'); c.style='align-self:flex-start;border:1px solid #eee;padding:8px;border-radius:8px;margin:2px 0;display:flex;gap:8px;align-items:center;font-size:13px;background:#fff;'; c.innerHTML='<img src="'+(p.image_url||'')+'" style="width:48px;height:48px;object-fit:cover;border-radius:6px"/>\
-        <div style="flex:1">'+p.name+'<div style="color:#6b7280">￥'+(((p.price||{}).value)||'')+'</div></div>\
-        <button style="background:#10b981;color:#fff;border:0;border-radius:6px;padding:6px 10px;cursor:pointer">加入</button>'; var b=c.querySelector('button'); b.onclick=async function(){ await fetch(API_BASE+'/cart/items',{method:'POST',headers:{'Content-Type':'application/json','X-API-Key':API_KEY},body:JSON.stringify({conversation_id:conversationId,product_id:p.id,quantity:1})}); }; msgs().appendChild(c); msgs().scrollTop=msgs().scrollHeight; });
+    (data.products||[]).forEach(addProduct);
+    addAlsoBought(data.also_bought);
   };
 })();
@@ -0,0 +1,36 @@
+"""Fold new cart items into the "also bought" co-occurrence tables.
+
+Usage:
+    python scripts/build_cooccurrence.py             # incremental, all tenants
+    python scripts/build_cooccurrence.py --tenant 1
+    python scripts/build_cooccurrence.py --rebuild   # drop counts and replay everything
+
+Incremental runs only read carts that gained items since the stored watermark
+(reco_state), so it is cheap to run from cron every few minutes.
+"""
+import argparse
+
+from app import create_app
+from app.services.cooccurrence import rebuild_tenant, update_all, update_tenant
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenant", type=int, help="only this tenant id")
+    parser.add_argument("--rebuild", action="store_true", help="recount from scratch")
+    parser.add_argument("--batch-size", type=int, default=5000, help="cart items per commit")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.tenant:
+            run = rebuild_tenant if args.rebuild else update_tenant
+            results = {args.tenant: run(args.tenant, batch_size=args.batch_size)}
+        else:
+            results = update_all(batch_size=args.batch_size, rebuild=args.rebuild)
+        for tid, n in sorted(results.items()):
+            print(f"tenant {tid}: {n} cart items folded")
+
+
+if __name__ == "__main__":
+    main()
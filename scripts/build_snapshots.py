@@ -0,0 +1,40 @@
+"""Prebuild the shared tenant snapshot files in SNAPSHOT_DIR.
+
+Usage:
+    SNAPSHOT_DIR=/var/tmp/chatbot-snapshots python scripts/build_snapshots.py
+    python scripts/build_snapshots.py --tenant 1
+
+Run at deploy (or from cron) so no worker pays the build on its first message;
+workers otherwise build a missing version themselves and publish it for the
+rest. Files are swapped in atomically and older versions are pruned.
+"""
+import argparse
+import os
+
+from app import create_app
+from app.extensions import db
+from app.models import Tenant
+from app.services.snapshot import build_snapshot
+from app.services.snapshot_store import write_snapshot
+from app.versions import get_tenant_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenant", type=int, help="only this tenant id")
+    args = parser.parse_args()
+
+    app = create_app()
+    directory = app.config.get("SNAPSHOT_DIR")
+    if not directory:
+        raise SystemExit("SNAPSHOT_DIR is not set")
+    with app.app_context():
+        tenant_ids = [args.tenant] if args.tenant else [tid for (tid,) in db.session.query(Tenant.id).order_by(Tenant.id)]
+        for tid in tenant_ids:
+            snap = build_snapshot(tid, version=get_tenant_version(tid))
+            path = write_snapshot(snap, directory)
+            print(f"tenant {tid}: v{snap.version}, {len(snap.rules)} rules, {len(snap.products)} products, {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
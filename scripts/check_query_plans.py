@@ -0,0 +1,137 @@
+"""EXPLAIN every hot query shape and fail if one falls back to a full scan.
+
+Usage:
+    DATABASE_URL=... python scripts/check_query_plans.py
+
+Runs against the configured database (SQLite, MySQL or PostgreSQL). Exit code
+is 1 when any query plan contains a full table/index scan of the queried table.
+"""
+import sys
+
+from sqlalchemy import and_, or_, select, text
+
+from app import create_app
+from app.extensions import db
+from app.models import ApiKey, Cart, CartItem, Conversation, KeywordRule, Message, Product, Setting, Synonym
+
+
+TENANT_ID = 1
+
+
+def hot_queries():
+    """(label, statement) pairs mirroring the queries in app/routes and app/services."""
+    return [
+        ("auth.find_api_key", select(ApiKey).where(ApiKey.is_active.is_(True))),
+        ("recommendation.expand_terms", select(Synonym).where(Synonym.tenant_id == TENANT_ID)),
+        ("recommendation.match_rules", select(KeywordRule)
+            .where(KeywordRule.tenant_id == TENANT_ID, KeywordRule.is_active.is_(True))
+            .order_by(KeywordRule.priority.desc())),
+        ("recommendation.fetch_products_by_ids", select(Product)
+            .where(Product.tenant_id == TENANT_ID, Product.is_active.is_(True), Product.id.in_([1, 2, 3]))
+            .limit(5)),
+        ("recommendation.fallback_search", select(Product)
+            .where(Product.tenant_id == TENANT_ID, Product.is_active.is_(True))
+            .where(or_(Product.name.ilike("%耳机%")))
+            .limit(5)),
+        ("products.get_product", select(Product)
+            .where(Product.id == 1, Product.tenant_id == TENANT_ID, Product.is_active.is_(True))),
+        ("cart.open_cart", select(Cart)
+            .where(Cart.tenant_id == TENANT_ID, Cart.status == 'open', Cart.conversation_id == 1)),
+        ("cart.line_item", select(CartItem).where(CartItem.cart_id == 1, CartItem.product_id == 1)),
+        ("cart.snapshot", select(CartItem).where(CartItem.cart_id == 1)),
+        ("chat.conversation", select(Conversation)
+            .where(Conversation.id == 1, Conversation.tenant_id == TENANT_ID)),
+        ("chat.transcript", select(Message)
+            .where(Message.conversation_id == 1)
+            .order_by(Message.created_at.desc())),
+        ("chat.history_page", select(Message)
+            .where(Message.conversation_id == 1)
+            .where(or_(Message.created_at < text("'2026-01-01'"),
+                       and_(Message.created_at == text("'2026-01-01'"), Message.id < 500)))
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(20)),
+        ("chat.default_reply", select(Setting)
+            .where(Setting.tenant_id == TENANT_ID, Setting.key == 'default_reply_text')),
+        ("admin.settings", select(Setting)
+            .where(Setting.tenant_id == TENANT_ID, Setting.key.in_(['welcome_text', 'default_reply_text']))),
+        ("admin.list_rules", select(KeywordRule)
+            .where(KeywordRule.tenant_id == TENANT_ID)
+            .order_by(KeywordRule.priority.desc(), KeywordRule.id.desc())
+            .limit(101)),
+        ("admin.list_rules_after_cursor", select(KeywordRule)
+            .where(KeywordRule.tenant_id == TENANT_ID)
+            .where(or_(KeywordRule.priority < 10, and_(KeywordRule.priority == 10, KeywordRule.id < 500)))
+            .order_by(KeywordRule.priority.desc(), KeywordRule.id.desc())
+            .limit(101)),
+        ("admin.import_rule_by_trigger", select(KeywordRule)
+            .where(KeywordRule.tenant_id == TENANT_ID, KeywordRule.trigger_text == '耳机')),
+        ("admin.list_products", select(Product)
+            .where(Product.tenant_id == TENANT_ID)
+            .order_by(Product.id.desc())
+            .limit(101)),
+        ("admin.list_products_after_cursor", select(Product)
+            .where(Product.tenant_id == TENANT_ID, Product.is_active.is_(True), Product.id < 5000)
+            .order_by(Product.id.desc())
+            .limit(101)),
+        ("admin.list_products_sku_prefix", select(Product)
+            .where(Product.tenant_id == TENANT_ID, Product.sku.like('SKU-1%'))
+            .order_by(Product.id.desc())
+            .limit(101)),
+        ("admin.import_by_sku", select(Product)
+            .where(Product.tenant_id == TENANT_ID, Product.sku == 'SKU-1')),
+        ("admin.import_by_name", select(Product)
+            .where(Product.tenant_id == TENANT_ID, Product.name == '真无线蓝牙耳机')),
+    ]
+
+
+def _full_scans_sqlite(rows):
+    # detail column: "SCAN products" is a full scan, "SEARCH products USING ..." is not
+    return [r[-1] for r in rows if str(r[-1]).startswith("SCAN ") and "CONSTANT ROW" not in str(r[-1])]
+
+
+def _full_scans_mysql(rows, keys):
+    idx_type = keys.index("type")
+    idx_table = keys.index("table")
+    return [f"{r[idx_table]}: type={r[idx_type]}" for r in rows if r[idx_type] in ("ALL", "index")]
+
+
+def _full_scans_postgres(rows):
+    return [r[0].strip() for r in rows if "Seq Scan" in r[0]]
+
+
+def explain(conn, dialect: str, sql: str):
+    if dialect == "sqlite":
+        return _full_scans_sqlite(conn.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall())
+    if dialect == "mysql":
+        res = conn.execute(text("EXPLAIN " + sql))
+        return _full_scans_mysql(res.fetchall(), list(res.keys()))
+    if dialect == "postgresql":
+        # tiny tables make the planner prefer seq scans; ask whether an index path exists
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        return _full_scans_postgres(conn.execute(text("EXPLAIN " + sql)).fetchall())
+    raise SystemExit(f"unsupported dialect: {dialect}")
+
+
+def main():
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            db.create_all()
+        dialect = db.engine.dialect.name
+        with db.engine.begin() as conn:
+            for label, stmt in hot_queries():
+                sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+                scans = explain(conn, dialect, sql)
+                if scans:
+                    failures += 1
+                    print(f"FULL SCAN  {label}: {'; '.join(scans)}")
+                else:
+                    print(f"ok         {label}")
+    if failures:
+        print(f"{failures} hot query shape(s) fall back to a full scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
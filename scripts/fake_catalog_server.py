@@ -0,0 +1,124 @@
+"""Local paginated product catalog for exercising the external catalog sync.
+
+Usage:
+    python scripts/fake_catalog_server.py --count 100000 --per-page 500 --port 8765
+    # admin page: 外部商品 API URL = http://127.0.0.1:8765/products
+
+Behaves like a typical shop API:
+- GET /products?page=N returns a JSON array with `Link: <...>; rel="next"`,
+  plus `ETag` and `Last-Modified` per page.
+- Conditional requests get 304 when the page is unchanged.
+- POST /mutate?n=K changes K random products (price/stock). Only their pages
+  get new validators, so a re-sync should touch exactly those rows.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class Catalog:
+    def __init__(self, count: int, per_page: int):
+        self.per_page = per_page
+        self.lock = threading.Lock()
+        self.items = [
+            {
+                "sku": f"FAKE-{i:06d}",
+                "name": f"测试商品 {i}",
+                "description": f"fake product #{i}",
+                "price": round(10 + (i % 500) * 1.5, 2),
+                "currency": "CNY",
+                "image_url": f"https://via.placeholder.com/96?text={i}",
+                "stock": i % 100,
+                "is_active": True,
+                "tags": ["fake", f"group{i % 20}"],
+            }
+            for i in range(1, count + 1)
+        ]
+        pages = (count + per_page - 1) // per_page
+        self.modified = [formatdate(usegmt=True)] * max(pages, 1)
+
+    def page(self, n: int):
+        with self.lock:
+            start = (n - 1) * self.per_page
+            body = json.dumps(self.items[start:start + self.per_page], ensure_ascii=False).encode("utf-8")
+            last_modified = self.modified[n - 1] if 0 < n <= len(self.modified) else formatdate(usegmt=True)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        return body, etag, last_modified, n < len(self.modified)
+
+    def mutate(self, k: int) -> int:
+        with self.lock:
+            now = formatdate(usegmt=True)
+            for idx in random.sample(range(len(self.items)), min(k, len(self.items))):
+                item = self.items[idx]
+                item["price"] = round(item["price"] + 1, 2)
+                item["stock"] = (item["stock"] + 1) % 100
+                self.modified[idx // self.per_page] = now
+        return k
+
+
+def make_handler(catalog: Catalog):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: bytes = b"", headers=None):
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/products":
+                return self._send(404, b'{"error":"not found"}', {"Content-Type": "application/json"})
+            try:
+                n = max(1, int(parse_qs(url.query).get("page", ["1"])[0]))
+            except ValueError:
+                n = 1
+            body, etag, last_modified, has_next = catalog.page(n)
+            headers = {"ETag": etag, "Last-Modified": last_modified, "Content-Type": "application/json; charset=utf-8"}
+            if has_next:
+                headers["Link"] = f'</products?page={n + 1}>; rel="next"'
+            inm = self.headers.get("If-None-Match")
+            ims = self.headers.get("If-Modified-Since")
+            if (inm and inm == etag) or (not inm and ims and ims == last_modified):
+                return self._send(304, b"", headers)
+            self._send(200, body, headers)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/mutate":
+                return self._send(404)
+            k = int(parse_qs(url.query).get("n", ["10"])[0])
+            body = json.dumps({"mutated": catalog.mutate(k)}).encode("utf-8")
+            self._send(200, body, {"Content-Type": "application/json"})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fake paginated catalog upstream")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--per-page", type=int, default=500)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    catalog = Catalog(args.count, args.per_page)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(catalog))
+    print(f"fake catalog: {args.count} products, {args.per_page}/page on http://{args.host}:{args.port}/products")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Archive and prune old conversations, abandon idle carts.
+
+Usage:
+    python scripts/retention.py              # all tenants
+    python scripts/retention.py --tenant 1
+    python scripts/retention.py --dry-run    # only count what would go
+
+Meant for cron (render.yaml has a daily job). Conversations are only deleted
+once RETENTION_ARCHIVE is set (table | file | none). Work is done in batches of
+RETENTION_BATCH_SIZE with RETENTION_PAUSE_SECONDS between them, so it can run
+next to live traffic; see app/services/retention.py.
+"""
+import argparse
+
+from app import create_app
+from app.extensions import db
+from app.models import Tenant
+from app.services.retention import archive_mode, expired_conversation_ids, run_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenant", type=int, help="only this tenant id")
+    parser.add_argument("--dry-run", action="store_true", help="report counts without changing anything")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        tenant_ids = [args.tenant] if args.tenant else [tid for (tid,) in db.session.query(Tenant.id).order_by(Tenant.id)]
+        for tid in tenant_ids:
+            if args.dry_run:
+                n = len(expired_conversation_ids(tid, limit=10**9))
+                print(f"tenant {tid}: {n} conversations past retention (archive: {archive_mode() or 'disabled, kept'})")
+                continue
+            r = run_retention(tid)
+            if r.skipped:
+                print(f"tenant {tid}: {r.skipped}")
+            print(f"tenant {tid}: {r.conversations} conversations / {r.messages} messages archived"
+                  f"{' to ' + r.archive if r.archive else ''}, {r.carts_abandoned} carts abandoned")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Background job worker.
+
+Usage:
+    JOBS_BACKEND=worker python scripts/worker.py [--once]
+
+Claims queued jobs from the `jobs` table one at a time. With Redis configured
+it blocks on the queue list for new ids; otherwise it polls the table every
+JOBS_POLL_SECONDS. Jobs whose worker stopped heartbeating for
+JOBS_STALE_SECONDS are requeued, or marked cancelled if a cancel was
+requested. Run as many workers as you like; claiming is
+an atomic conditional UPDATE.
+"""
+import argparse
+import signal
+import time
+
+from app import create_app
+from app import extensions
+from app.extensions import db
+from app.jobs import QUEUE_KEY, claim, next_queued_ids, requeue_stale, run_job, worker_name
+
+_stop = False
+
+
+def _request_stop(signum, frame):
+    global _stop
+    _stop = True
+
+
+def _wait_for_work(poll: float) -> None:
+    r = extensions.redis_client
+    if r is not None:
+        try:
+            r.brpop(QUEUE_KEY, timeout=max(1, int(poll)))
+            return
+        except Exception:
+            pass
+    time.sleep(poll)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run background jobs")
+    parser.add_argument("--once", action="store_true", help="drain the queue and exit")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    app = create_app()
+    with app.app_context():
+        poll = app.config.get("JOBS_POLL_SECONDS", 2)
+        stale = app.config.get("JOBS_STALE_SECONDS", 300)
+        app.logger.info("worker %s started", worker_name())
+        last_sweep = 0.0
+        while not _stop:
+            if time.time() - last_sweep > stale / 2:
+                requeue_stale(stale)
+                last_sweep = time.time()
+            ran = False
+            for job_id in next_queued_ids():
+                if _stop:
+                    break
+                if claim(job_id):
+                    run_job(job_id)
+                    db.session.remove()
+                    ran = True
+            if args.once and not ran:
+                break
+            if not ran:
+                _wait_for_work(poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 import os
 from app import create_app
 
+# warm-up runs from gunicorn's post_worker_init (gunicorn.conf.py), not at
+# import: `flask --app wsgi deploy` and other CLI commands import this too
 app = create_app()
 
 if __name__ == "__main__":
+    from app.jobs import start_local_sweeper
+    from app.warmup import warm_up
+
+    if app.config.get("WARMUP_ON_BOOT"):
+        warm_up(app)
+    start_local_sweeper(app)
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "5001"))
     app.run(host=host, port=port)